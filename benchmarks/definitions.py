@@ -0,0 +1,41 @@
+"""
+Micro-benchmark of the construction of OAS3 definitions.
+
+    python benchmarks/definitions.py
+"""
+import timeit
+
+from sanic_openapi.openapi3.definitions import MediaType, Parameter, Response
+from sanic_openapi.openapi3.types import Integer, Object, Schema, String
+
+
+class Name:
+    first_name: str
+    last_name: str
+
+
+class User:
+    id: int
+    name: Name
+    email: str
+
+
+CASES = {
+    "String()": lambda: String(),
+    "Integer(minimum=0)": lambda: Integer(minimum=0),
+    "Parameter.make()": lambda: Parameter.make("id", int, "path"),
+    "MediaType.make()": lambda: MediaType.make(str),
+    "Response.make()": lambda: Response.make({"application/json": str}),
+    "Object.make(User)": lambda: Object.make(User, description="A user"),
+    "Schema.make(dict)": lambda: Schema.make({"id": int, "name": str}),
+}
+
+
+def main(number: int = 5000):
+    for name, case in CASES.items():
+        seconds = min(timeit.repeat(case, number=number, repeat=5))
+        print("{:<22} {:>8.2f} us".format(name, seconds / number * 1000000))
+
+
+if __name__ == "__main__":
+    main()
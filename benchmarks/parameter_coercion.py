@@ -0,0 +1,175 @@
+"""
+Benchmark of the parameters parsed from their documentation and passed to
+handlers (`API_INJECT_PARAMETERS`), against the same parsing written by hand
+in the handler.
+
+    python benchmarks/parameter_coercion.py
+    python benchmarks/parameter_coercion.py --requests 200000
+
+Both handlers take a typed path parameter, an integer with a default, a
+string from an enum and a comma separated array of integers. Each request is
+dispatched the way Sanic does it: a `Request` is created from the raw URL,
+routed, run through the request middleware and passed to the handler. The
+cost of creating and routing the request is measured on its own as the
+`baseline`, so that the cost of the parsing itself can be compared:
+
+* `baseline_us`: creating and routing a request, per request
+* `hand_written_us` and `compiled_us`: the same, then parsing the query
+  string and calling the handler
+* `overhead`: the time spent parsing by the compiled parsers, relative to
+  the handler doing it by hand
+
+The results are written as JSON. The sanic-openapi being measured is the one
+that is importable, so install the checkout with `pip install -e .` first.
+"""
+import argparse
+import json
+import platform
+from time import perf_counter
+
+from sanic import Sanic
+from sanic import __version__ as sanic_version
+from sanic.compat import Header
+from sanic.exceptions import InvalidUsage
+from sanic.request import Request
+
+from sanic_openapi import __version__, openapi
+from sanic_openapi.openapi3.validation import (
+    ParameterParser,
+    compile_validators,
+    inject_parameters,
+)
+from sanic_openapi.utils import finalized_routes
+
+QUERY = b"/items/3?limit=25&order=desc&tags=1,2,3"
+ORDERS = ("asc", "desc")
+
+
+def make_app() -> Sanic:
+    app = Sanic("parameter_coercion")
+
+    @app.get("/items/<shop:int>")
+    @openapi.parameter("limit", openapi.Integer(default=10))
+    @openapi.parameter("order", openapi.String(enum=list(ORDERS)))
+    @openapi.parameter("tags", [int], explode=False)
+    def compiled(request, shop, limit, order="asc", tags=()):
+        return shop, limit, order, tags
+
+    @app.get("/hand/<shop:int>")
+    def hand_written(request, shop):
+        args = request.args
+        try:
+            limit = int(args.get("limit", 10))
+            tags = [int(tag) for tag in args.get("tags", "").split(",") if tag]
+        except ValueError:
+            raise InvalidUsage("limit and tags must be integers")
+
+        order = args.get("order", "asc")
+        if order not in ORDERS:
+            raise InvalidUsage("order must be one of asc, desc")
+
+        return shop, limit, order, tags
+
+    return app
+
+
+def route(app: Sanic, url: bytes) -> Request:
+    """
+    A request, routed the way `Sanic.handle_request` does it.
+    """
+    request = Request(url, Header(), "1.1", "GET", None, app)
+    route, handler, kwargs = app.router.get(request.path, "GET", None)
+    request._match_info = {**kwargs}
+    request.route = route
+    return request
+
+
+def dispatch(app: Sanic, url: bytes, middleware):
+    request = route(app, url)
+    for run in middleware:
+        response = run(request)
+        if response is not None:
+            return response
+
+    return request.route.handler(request, **request.match_info)
+
+
+def measure(app: Sanic, url: bytes, requests: int, middleware=None) -> float:
+    """
+    The time of a request in microseconds, only routing it when no
+    middleware is given.
+    """
+    start = perf_counter()
+    if middleware is None:
+        for _ in range(requests):
+            route(app, url)
+    else:
+        for _ in range(requests):
+            dispatch(app, url, middleware)
+
+    return (perf_counter() - start) / requests * 1e6
+
+
+def run(requests: int, repeat: int) -> dict:
+    app = make_app()
+    hand_url = QUERY.replace(b"/items/", b"/hand/")
+
+    with finalized_routes(app):
+        compile_validators(
+            app, "parameter_parsers", ParameterParser.for_handler
+        )
+
+        # Both handlers return the same values
+        assert dispatch(app, QUERY, [inject_parameters]) == dispatch(
+            app, hand_url, []
+        )
+
+        best = {}
+        for _ in range(repeat):
+            for name, timing in (
+                ("baseline_us", measure(app, QUERY, requests)),
+                ("hand_written_us", measure(app, hand_url, requests, [])),
+                (
+                    "compiled_us",
+                    measure(app, QUERY, requests, [inject_parameters]),
+                ),
+            ):
+                best[name] = min(best.get(name, timing), timing)
+
+    hand_written = best["hand_written_us"] - best["baseline_us"]
+    compiled = best["compiled_us"] - best["baseline_us"]
+
+    return {
+        **{name: round(value, 3) for name, value in best.items()},
+        "overhead": round(compiled / hand_written, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--requests", type=int, default=50000, help="Requests per run"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs, of which the best counts"
+    )
+    args = parser.parse_args(argv)
+
+    print(
+        json.dumps(
+            {
+                "environment": {
+                    "sanic_openapi": __version__,
+                    "sanic": sanic_version,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                },
+                "results": run(args.requests, args.repeat),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
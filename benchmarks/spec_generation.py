@@ -0,0 +1,403 @@
+"""
+Benchmark of the generation of the specification of synthetic apps, with
+many blueprints, class-based views, path parameters and nested models.
+
+    python benchmarks/spec_generation.py
+    python benchmarks/spec_generation.py --routes 100 1000 --openapi 3 \
+        --out results.json
+
+For each size and version of OpenAPI, an app is generated as a package of
+decorated modules, one for each blueprint, and measured in a process of its
+own, so that the global state of sanic-openapi starts out empty:
+
+* `import_s`: importing the decorated modules
+* `build_spec_s`: a first call of `build_spec`, with its profile
+* `first_request_s` and `request_*_s`: fetching `/swagger/swagger.json`
+  from a running server, the first time and then repeatedly
+* `size_bytes`: the size of the served specification
+* `peak_rss_kb`: the peak resident memory of the process, next to
+  `baseline_rss_kb` measured before the app was imported
+
+The results are written as JSON, to compare them across versions. The
+sanic-openapi being measured is the one that is importable, so install the
+checkout with `pip install -e .` first.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+SIZES = (100, 1000, 10000)
+ROUTES_PER_BLUEPRINT = 20
+
+# Every fourth route is a class-based view with three methods
+VIEW_EVERY = 4
+
+HEADERS = {
+    2: """from typing import List
+
+from sanic import Blueprint
+from sanic.response import json
+from sanic.views import HTTPMethodView
+
+from sanic_openapi import doc
+""",
+    3: """from typing import List
+
+from sanic import Blueprint
+from sanic.response import json
+from sanic.views import HTTPMethodView
+
+from sanic_openapi import openapi
+""",
+}
+
+MODELS = """
+
+class Owner{b}:
+    id: int
+    name: str
+    tags: List[str]
+
+
+class Item{b}:
+    id: int
+    title: str
+    price: float
+    owner: Owner{b}
+
+
+bp = Blueprint("bp{b}", url_prefix="/bp{b}")
+"""
+
+DOCSTRING = '''"""
+        {action} item {i}.
+
+        openapi:
+        ---
+        responses:
+          '404':
+            description: Item {i} was not found
+        """'''
+
+ROUTES = {
+    2: """
+
+@bp.get("/items{i}/<item_id:int>")
+@doc.summary("Get item {i}")
+@doc.consumes(doc.String(name="fields"), location="query")
+@doc.produces(Item{b})
+async def get_item{i}(request, item_id):
+    {get_doc}
+    return json({{}})
+""",
+    3: """
+
+@bp.get("/items{i}/<item_id:int>")
+@openapi.summary("Get item {i}")
+@openapi.parameter("fields", str)
+@openapi.response(200, {{"application/json": Item{b}}})
+async def get_item{i}(request, item_id):
+    {get_doc}
+    return json({{}})
+""",
+}
+
+VIEWS = {
+    2: """
+
+class ItemView{i}(HTTPMethodView):
+    @doc.summary("Get item {i}")
+    @doc.produces(Item{b})
+    async def get(self, request, item_id):
+        {get_doc}
+        return json({{}})
+
+    @doc.summary("Replace item {i}")
+    @doc.consumes(Item{b}, location="body")
+    @doc.produces(Item{b})
+    async def put(self, request, item_id):
+        {put_doc}
+        return json({{}})
+
+    @doc.summary("Delete item {i}")
+    async def delete(self, request, item_id):
+        return json({{}})
+
+
+bp.add_route(ItemView{i}.as_view(), "/views{i}/<item_id:int>")
+""",
+    3: """
+
+class ItemView{i}(HTTPMethodView):
+    @openapi.summary("Get item {i}")
+    @openapi.response(200, {{"application/json": Item{b}}})
+    async def get(self, request, item_id):
+        {get_doc}
+        return json({{}})
+
+    @openapi.summary("Replace item {i}")
+    @openapi.body({{"application/json": Item{b}}})
+    @openapi.response(200, {{"application/json": Item{b}}})
+    async def put(self, request, item_id):
+        {put_doc}
+        return json({{}})
+
+    @openapi.summary("Delete item {i}")
+    async def delete(self, request, item_id):
+        return json({{}})
+
+
+bp.add_route(ItemView{i}.as_view(), "/views{i}/<item_id:int>")
+""",
+}
+
+
+def generate_app(directory: str, name: str, routes: int, version: int):
+    """
+    Writes a package with one module for each blueprint, along with an
+    `__init__.py` listing them in `blueprints`.
+    """
+    package = os.path.join(directory, name)
+    os.makedirs(package)
+
+    modules = []
+    for b, start in enumerate(range(0, routes, ROUTES_PER_BLUEPRINT)):
+        source = [HEADERS[version], MODELS.format(b=b)]
+
+        for i in range(start, min(start + ROUTES_PER_BLUEPRINT, routes)):
+            template = VIEWS if i % VIEW_EVERY == VIEW_EVERY - 1 else ROUTES
+            indent = " " * 4 if template is VIEWS else ""
+            source.append(
+                template[version].format(
+                    b=b,
+                    i=i,
+                    get_doc=DOCSTRING.format(action="Fetches", i=i).replace(
+                        "\n", "\n" + indent
+                    ),
+                    put_doc=DOCSTRING.format(action="Replaces", i=i).replace(
+                        "\n", "\n" + indent
+                    ),
+                )
+            )
+
+        module = "bp{}".format(b)
+        with open(os.path.join(package, module + ".py"), "w") as f:
+            f.write("".join(source))
+        modules.append(module)
+
+    with open(os.path.join(package, "__init__.py"), "w") as f:
+        for module in modules:
+            f.write("from .{} import bp as {}\n".format(module, module))
+        f.write("\nblueprints = [{}]\n".format(", ".join(modules)))
+
+
+def peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+async def fetch(port: int, path: str) -> bytes:
+    """
+    A bare HTTP/1.1 GET, so that the client adds as little as possible to
+    the measured latency.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        "GET {} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        "Accept-Encoding: identity\r\n\r\n".format(path).encode()
+    )
+    response = await reader.read()
+    writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    if not head.startswith(b"HTTP/1.1 200"):
+        raise RuntimeError(head.decode(errors="replace"))
+
+    return body
+
+
+async def measure_requests(app, requests: int) -> dict:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = await app.create_server(
+        host="127.0.0.1",
+        port=port,
+        access_log=False,
+        return_asyncio_server=True,
+    )
+    await server.startup()
+    await server.before_start()
+    await server.after_start()
+
+    try:
+        start = perf_counter()
+        body = await fetch(port, "/swagger/swagger.json")
+        first = perf_counter() - start
+
+        durations = []
+        for _ in range(requests):
+            start = perf_counter()
+            await fetch(port, "/swagger/swagger.json")
+            durations.append(perf_counter() - start)
+    finally:
+        await server.before_stop()
+        await server.close()
+        await server.after_stop()
+
+    durations.sort()
+    return {
+        "first_request_s": first,
+        "request_median_s": statistics.median(durations),
+        "request_p95_s": durations[int(len(durations) * 0.95) - 1],
+        "size_bytes": len(body),
+    }
+
+
+def run(routes: int, version: int, requests: int) -> dict:
+    """
+    Measures one app, in the current process.
+    """
+    from sanic import Sanic
+
+    from sanic_openapi import openapi2_blueprint, openapi3_blueprint
+    from sanic_openapi.profiler import get_profile
+    from sanic_openapi.utils import finalized_routes
+
+    if version == 2:
+        from sanic_openapi.openapi2.blueprint import build_spec
+
+        blueprint = openapi2_blueprint
+    else:
+        from sanic_openapi.openapi3.blueprint import build_spec
+
+        blueprint = openapi3_blueprint
+
+    result = {
+        "openapi": version,
+        "routes": routes,
+        "baseline_rss_kb": peak_rss_kb(),
+    }
+
+    directory = tempfile.mkdtemp(prefix="sanic-openapi-bench-")
+    name = "bench_app_{}_{}".format(version, routes)
+    try:
+        generate_app(directory, name, routes, version)
+        sys.path.insert(0, directory)
+        sys.dont_write_bytecode = True
+
+        start = perf_counter()
+        module = importlib.import_module(name)
+        result["import_s"] = perf_counter() - start
+    finally:
+        shutil.rmtree(directory)
+
+    app = Sanic("bench_{}_{}".format(version, routes))
+    app.blueprint(module.blueprints)
+    app.blueprint(blueprint)
+
+    with finalized_routes(app):
+        start = perf_counter()
+        build_spec(app, blueprint.url_prefix)
+        result["build_spec_s"] = perf_counter() - start
+        result["profile"] = get_profile(app).as_dict()
+
+    result.update(asyncio.run(measure_requests(app, requests)))
+    result["peak_rss_kb"] = peak_rss_kb()
+
+    return result
+
+
+def environment() -> dict:
+    from sanic import __version__ as sanic_version
+
+    from sanic_openapi import __version__
+
+    try:
+        import orjson  # noqa: F401
+
+        encoder = "orjson"
+    except ImportError:
+        encoder = "ujson or json"
+
+    return {
+        "sanic_openapi": __version__,
+        "sanic": sanic_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_encoder": encoder,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--routes", type=int, nargs="+", default=SIZES, help="App sizes"
+    )
+    parser.add_argument(
+        "--openapi", type=int, nargs="+", choices=(2, 3), default=(2, 3)
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=20,
+        help="Requests for /swagger.json after the first one",
+    )
+    parser.add_argument("--out", help="File to write to, rather than stdout")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run(args.routes[0], args.openapi[0], args.requests)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for version in args.openapi:
+        for routes in args.routes:
+            print(
+                "OpenAPI {}, {} routes".format(version, routes),
+                file=sys.stderr,
+            )
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--child",
+                    "--routes",
+                    str(routes),
+                    "--openapi",
+                    str(version),
+                    "--requests",
+                    str(args.requests),
+                ],
+                check=True,
+                stdout=subprocess.PIPE,
+            ).stdout
+            results.append(json.loads(output.decode().splitlines()[-1]))
+
+    document = json.dumps(
+        {"environment": environment(), "results": results}, indent=2
+    )
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Command line tools for sanic-openapi.
+
+    python -m sanic_openapi build myapp:app --out openapi.json
+    python -m sanic_openapi assets --out ./swagger-ui
+"""
+import argparse
+import json
+import os
+import sys
+from importlib import import_module
+
+import yaml
+
+from .assets import UIAssets, default_assets_dir
+from .encoding import json_dumps
+from .utils import finalized_routes
+
+
+def load_app(target: str):
+    """
+    Imports an application from a `module:attribute` (or
+    `module.attribute`) string.
+    """
+    if ":" in target:
+        module_name, _, attribute = target.partition(":")
+    else:
+        module_name, _, attribute = target.rpartition(".")
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    return getattr(import_module(module_name), attribute)
+
+
+def detect_version(app) -> int:
+    from .openapi2 import openapi2_blueprint
+
+    if openapi2_blueprint.name in app.blueprints:
+        return 2
+
+    return 3
+
+
+def build_document(app, version: int) -> dict:
+    """
+    Runs the same route walk as the blueprint does when the server starts,
+    and returns the serialized specification.
+    """
+    if version == 2:
+        from .openapi2 import openapi2_blueprint
+        from .openapi2.blueprint import build_spec
+
+        with finalized_routes(app):
+            return build_spec(app, openapi2_blueprint.url_prefix).as_dict
+
+    from .openapi3 import get_specification, openapi3_blueprint
+    from .openapi3.blueprint import build_spec
+
+    with finalized_routes(app):
+        build_spec(app, openapi3_blueprint.url_prefix)
+
+    return get_specification(app).build().serialize()
+
+
+def build(args):
+    app = load_app(args.app)
+    document = build_document(app, args.openapi or detect_version(app))
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "yaml" if args.out.endswith((".yaml", ".yml")) else "json"
+
+    body = json_dumps(document)
+    if fmt == "yaml":
+        body = yaml.safe_dump(json.loads(body), sort_keys=False).encode()
+
+    with open(args.out, "wb") as f:
+        f.write(body)
+
+
+def assets(args):
+    built = UIAssets(
+        args.out or default_assets_dir(), source_maps=not args.no_source_maps
+    ).build()
+    for name in sorted(built.assets):
+        print(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sanic_openapi")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    build_parser = commands.add_parser(
+        "build",
+        help="Write the specification of an app to a file, see API_SPEC_FILE",
+    )
+    build_parser.add_argument(
+        "app", help="The application to document, as module:attribute"
+    )
+    build_parser.add_argument(
+        "--out", default="openapi.json", help="File to write to"
+    )
+    build_parser.add_argument(
+        "--format",
+        choices=("json", "yaml"),
+        help="Defaults to the extension of --out",
+    )
+    build_parser.add_argument(
+        "--openapi",
+        type=int,
+        choices=(2, 3),
+        help="OpenAPI version, defaults to that of the registered blueprint",
+    )
+    build_parser.set_defaults(func=build)
+
+    assets_parser = commands.add_parser(
+        "assets",
+        help="Pre-build the fingerprinted and compressed Swagger UI assets",
+    )
+    assets_parser.add_argument(
+        "--out",
+        help="Directory to write to, see SWAGGER_UI_ASSETS_DIR, defaults to "
+        "a directory of the current user in the temporary directory",
+    )
+    assets_parser.add_argument(
+        "--no-source-maps",
+        action="store_true",
+        help="Leave out the source maps, see SWAGGER_UI_SOURCE_MAPS",
+    )
+    assets_parser.set_defaults(func=assets)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Serving of the bundled Swagger UI.
+
+By default the files in `sanic_openapi/ui` are served as they are. With
+`SWAGGER_UI_PRODUCTION_ASSETS` enabled, they are instead copied once into an
+assets directory under content-hashed names, along with pre-compressed
+siblings, and `index.html` is rewritten to reference them. Since the names
+change whenever the contents do, those files can be cached forever.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import tempfile
+from functools import lru_cache
+from os.path import abspath, basename, dirname, isfile, join, realpath
+from typing import Dict, NamedTuple, Optional
+
+from sanic.exceptions import NotFound
+from sanic.response import file, html
+
+from .encoding import COMPRESSORS, negotiate
+from .utils import write_once
+
+UI_DIR = abspath(join(dirname(realpath(__file__)), "ui"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+EXTENSIONS = {"gzip": ".gz", "br": ".br"}
+
+# Files which are referenced by name, and so are served as they are
+UNVERSIONED = ("README.md", "index.html", "oauth2-redirect.html")
+
+SOURCE_MAP_PATTERN = re.compile(
+    rb"(//# sourceMappingURL=|/\*# sourceMappingURL=)([^\s*]+)(\s*\*/)?"
+)
+
+
+class Asset(NamedTuple):
+    name: str
+    content_type: str
+    paths: Dict[str, str]
+
+
+class UIAssets:
+    """
+    The fingerprinted Swagger UI assets in a directory.
+
+    Arguments:
+        target: Directory to write the assets to.
+        source_maps: Whether to keep serving the `.map` files, and the
+                     comments which reference them.
+        source: Directory with the original Swagger UI files.
+    """
+
+    def __init__(
+        self, target: str, source_maps: bool = True, source: str = UI_DIR
+    ):
+        self.target = target
+        self.source = source
+        self.source_maps = source_maps
+        self.assets: Dict[str, Asset] = {}
+        self.index = ""
+
+    def build(self) -> "UIAssets":
+        """
+        Writes every asset, and its compressed variants, to the target
+        directory, skipping those which already exist there.
+        """
+        os.makedirs(self.target, exist_ok=True)
+
+        names = sorted(
+            name
+            for name in os.listdir(self.source)
+            if name not in UNVERSIONED and isfile(join(self.source, name))
+        )
+
+        # Maps go first, so that the files which reference them can be
+        # rewritten to their fingerprinted names
+        renamed: Dict[str, str] = {}
+        for name in sorted(names, key=lambda x: not x.endswith(".map")):
+            if name.endswith(".map") and not self.source_maps:
+                continue
+
+            with open(join(self.source, name), "rb") as f:
+                body = f.read()
+
+            body = SOURCE_MAP_PATTERN.sub(
+                lambda match: self._source_map(match, renamed), body
+            )
+            renamed[name] = self._write(name, body)
+
+        with open(join(self.source, "index.html"), "r") as f:
+            index = f.read()
+
+        for name, fingerprinted in renamed.items():
+            index = index.replace(
+                '"./{}"'.format(name), '"./_assets/{}"'.format(fingerprinted)
+            )
+
+        self.index = index
+        return self
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name)
+
+    def _source_map(self, match, renamed: Dict[str, str]) -> bytes:
+        name = match.group(2).decode()
+        if not self.source_maps or name not in renamed:
+            return b""
+
+        return (
+            match.group(1) + renamed[name].encode() + (match.group(3) or b"")
+        )
+
+    def _write(self, name: str, body: bytes) -> str:
+        stem, _, suffix = name.partition(".")
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        fingerprinted = "{}.{}.{}".format(stem, digest, suffix)
+
+        paths = {"identity": join(self.target, fingerprinted)}
+        write_once(paths["identity"], lambda: body)
+
+        for encoding, compress in COMPRESSORS.items():
+            path = paths["identity"] + EXTENSIONS[encoding]
+            write_once(path, lambda: compress(body))
+            paths[encoding] = path
+
+        content_type = (
+            mimetypes.guess_type(name)[0] or "application/octet-stream"
+        )
+        self.assets[fingerprinted] = Asset(fingerprinted, content_type, paths)
+
+        return fingerprinted
+
+
+@lru_cache(maxsize=None)
+def load_assets(target: str, source_maps: bool = True) -> UIAssets:
+    return UIAssets(target, source_maps).build()
+
+
+def default_assets_dir() -> str:
+    """
+    A directory of the current user in the system temporary directory,
+    created if need be, which other users cannot write to.
+
+    Raises:
+        RuntimeError: When the directory exists but is not private.
+    """
+    from . import __version__
+
+    name = "sanic-openapi-{}-ui".format(__version__)
+    if hasattr(os, "getuid"):
+        name += "-{}".format(os.getuid())
+
+    path = join(tempfile.gettempdir(), name)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    check_private_dir(path)
+
+    return path
+
+
+def check_private_dir(path: str):
+    """
+    Checks that a directory belongs to the current user and that nobody else
+    can write to it, since the files found there are served as they are.
+
+    Raises:
+        RuntimeError: When the directory is not private.
+    """
+    if not hasattr(os, "getuid"):
+        # The temporary directory is already private to each user on Windows
+        return
+
+    info = os.lstat(path)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    ):
+        raise RuntimeError(
+            "The Swagger UI assets directory {} is not a directory owned "
+            "by the current user and writable only by them, set "
+            "SWAGGER_UI_ASSETS_DIR to another directory".format(path)
+        )
+
+
+def get_ui_assets(app) -> Optional[UIAssets]:
+    """
+    Returns the production assets to serve for an app, or `None` when the
+    Swagger UI files should be served as they are.
+    """
+    if not getattr(app.config, "SWAGGER_UI_PRODUCTION_ASSETS", False):
+        return None
+
+    return load_assets(
+        getattr(app.config, "SWAGGER_UI_ASSETS_DIR", None)
+        or default_assets_dir(),
+        getattr(app.config, "SWAGGER_UI_SOURCE_MAPS", True),
+    )
+
+
+def add_ui_routes(blueprint):
+    """
+    Adds the routes which serve the Swagger UI to a blueprint.
+    """
+    blueprint.static("", UI_DIR)
+
+    @blueprint.route("/", strict_slashes=True)
+    async def ui_index(request):
+        assets = get_ui_assets(request.app)
+        if assets is None:
+            return await file(join(UI_DIR, "index.html"))
+
+        return html(assets.index, headers={"Cache-Control": "no-cache"})
+
+    @blueprint.route("/_assets/<name>")
+    async def ui_asset(request, name):
+        assets = get_ui_assets(request.app)
+        asset = assets.get(name) if assets else None
+        if asset is None:
+            raise NotFound("Requested URL {} not found".format(request.path))
+
+        encoding = negotiate(
+            request.headers.get("accept-encoding", ""), asset.paths.keys()
+        )
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        return await file(
+            asset.paths[encoding],
+            mime_type=asset.content_type,
+            headers=headers,
+        )
+
+    @blueprint.middleware("request")
+    def ui_source_maps(request):
+        # The original .map files stay reachable through the static route,
+        # so hide them too when they are turned off
+        if (
+            request.path.startswith(blueprint.url_prefix)
+            and basename(request.path).endswith(".map")
+            and not getattr(request.app.config, "SWAGGER_UI_SOURCE_MAPS", True)
+        ):
+            raise NotFound("Requested URL {} not found".format(request.path))
+
+    @blueprint.listener("before_server_start")
+    def build_ui_assets(app, loop):
+        get_ui_assets(app)
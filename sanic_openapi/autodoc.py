@@ -1,8 +1,109 @@
+import hashlib
 import inspect
+import json
+import os
 import warnings
+from collections import namedtuple
+from copy import deepcopy
+from typing import Callable, Dict, Optional
 
 import yaml
 
+from .utils import write_once
+
+# libyaml's loader is many times faster than the pure Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CacheInfo = namedtuple("CacheInfo", ["parsed", "cached"])
+
+
+class DocstringCache:
+    """
+    Parsed docstrings, keyed on a hash of the docstring, so that each one is
+    only parsed once however many times the specification is built. With a
+    directory, they are also kept there, for other workers and the next
+    start of the server.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._parsed: Dict[str, dict] = {}
+        self._misses = 0
+        self._hits = 0
+
+    def get(self, docstring: str, parse: Callable[[str], dict]) -> dict:
+        key = self._key(docstring)
+
+        if key not in self._parsed:
+            parsed = self._load(key)
+            if parsed is None:
+                parsed = parse(docstring)
+                self._misses += 1
+                self._save(key, parsed)
+            else:
+                self._hits += 1
+
+            self._parsed[key] = parsed
+        else:
+            self._hits += 1
+
+        # Callers are free to change what they get
+        return deepcopy(self._parsed[key])
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self._misses, self._hits)
+
+    def clear(self):
+        self._parsed.clear()
+        self._misses = 0
+        self._hits = 0
+
+    def _key(self, docstring: str) -> str:
+        from . import __version__
+
+        # The version is part of the key, since the parser may change
+        value = "{}\0{}".format(__version__, docstring)
+        return hashlib.sha256(value.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, "{}.json".format(key))
+
+    def _load(self, key: str) -> Optional[dict]:
+        if not self.directory:
+            return None
+
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key: str, parsed: dict):
+        if not self.directory:
+            return
+
+        try:
+            body = json.dumps(parsed).encode()
+        except (TypeError, ValueError):
+            # Such as dates, which YAML has but JSON does not
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        write_once(self._path(key), lambda: body)
+
+
+docstring_cache = DocstringCache()
+
+
+def configure_cache(app):
+    """
+    Points the docstring cache at the directory set with
+    `API_AUTODOC_CACHE_DIR`, if any.
+    """
+    docstring_cache.directory = getattr(
+        app.config, "API_AUTODOC_CACHE_DIR", None
+    )
+
 
 class OpenAPIDocstringParser:
     def __init__(self, docstring: str):
@@ -71,7 +172,7 @@ class YamlStyleParametersParser(OpenAPIDocstringParser):
             UserWarning if the yaml couldn't be parsed
         """
         try:
-            return yaml.safe_load(doc)
+            return yaml.load(doc, Loader=SafeLoader)
         except Exception as e:
             warnings.warn(
                 "error parsing openAPI yaml, ignoring it. ({})".format(e)
@@ -79,10 +180,13 @@ class YamlStyleParametersParser(OpenAPIDocstringParser):
             return {}
 
     def _parse_all(self) -> dict:
-        if "openapi:\n" not in self.docstring:
-            return self._parse_no_yaml(self.docstring)
+        return docstring_cache.get(self.docstring, self._parse)
+
+    def _parse(self, docstring: str) -> dict:
+        if "openapi:\n" not in docstring:
+            return self._parse_no_yaml(docstring)
 
-        predoc, yamldoc = self.docstring.split("openapi:\n", 1)
+        predoc, yamldoc = docstring.split("openapi:\n", 1)
 
         conf = self._parse_no_yaml(predoc)
         conf.update(self._parse_yaml(yamldoc))
@@ -0,0 +1,314 @@
+"""
+Helpers for serving documents, like the generated specification, which are
+encoded once and then sent many times.
+"""
+import gzip
+import hashlib
+import mmap
+import os
+import tempfile
+import zlib
+from functools import lru_cache, partial
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+import yaml
+from sanic.response import HTTPResponse, raw, stream
+
+try:
+    import orjson
+except ImportError:  # no cov
+    orjson = None
+
+try:
+    from ujson import dumps as _dumps
+except ImportError:  # no cov
+    from json import dumps
+
+    _dumps = partial(dumps, separators=(",", ":"))
+
+try:
+    import brotli
+except ImportError:  # no cov
+    brotli = None
+
+
+def json_dumps(value) -> bytes:
+    """
+    Encodes a value into compact JSON bytes, with orjson or ujson when one of
+    them is installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Such as integers too large for orjson
+            pass
+
+    return _dumps(value).encode()
+
+
+def json_key(key) -> bytes:
+    return json_dumps(key if isinstance(key, str) else str(key))
+
+
+def iter_json_object(
+    items: Iterable, encode: Callable[..., bytes] = json_dumps
+) -> Iterator[bytes]:
+    """
+    Yields the JSON encoding of an object in fragments: one for each of its
+    entries, and for entries holding a dict, like the paths of a
+    specification, one for each of theirs.
+
+    Arguments:
+        items: The (key, value) pairs of the object.
+        encode: Encodes each value into JSON bytes.
+    """
+    yield b"{"
+    for i, (key, value) in enumerate(items):
+        prefix = (b"," if i else b"") + json_key(key) + b":"
+        if isinstance(value, dict):
+            yield prefix + b"{"
+            for j, (k, v) in enumerate(value.items()):
+                yield (b"," if j else b"") + json_key(k) + b":" + encode(v)
+            yield b"}"
+        else:
+            yield prefix + encode(value)
+    yield b"}"
+
+
+COMPRESSORS = {"gzip": partial(gzip.compress, compresslevel=9)}
+
+if brotli is not None:
+    COMPRESSORS["br"] = partial(brotli.compress, quality=9)
+
+# Preferred order when the client accepts several encodings equally
+PREFERENCE = ("br", "gzip", "identity")
+
+
+def negotiate(accept_encoding: str, available: Sequence[str]) -> str:
+    """
+    Picks the content coding to respond with from an Accept-Encoding header.
+
+    Arguments:
+        accept_encoding: The raw value of the request's Accept-Encoding
+                         header.
+        available: The codings that the response can be sent with.
+
+    Returns:
+        The chosen coding, falling back to `identity` when nothing better is
+        acceptable.
+    """
+    weights: Dict[str, float] = {}
+
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+
+        weights[coding] = weight
+
+    best, best_weight = "identity", 0.0
+    for coding in PREFERENCE:
+        if coding not in available:
+            continue
+
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if coding == "identity" and "identity" not in weights:
+            weight = max(weight, 0.001)
+
+        if weight > best_weight:
+            best, best_weight = coding, weight
+
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an entity tag, using the weak
+    comparison that RFC 7232 requires for this header.
+    """
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+
+        if candidate == etag:
+            return True
+
+    return False
+
+
+class EncodedDocument:
+    """
+    An encoded document, along with its compressed variants which are each
+    produced the first time they are asked for.
+    """
+
+    def __init__(self, body: bytes, content_type: str = "application/json"):
+        self.body = body
+        self.content_type = content_type
+        self._variants = {"identity": body}
+        self._digest = None
+
+    @property
+    def encodings(self):
+        return ("identity", *COMPRESSORS.keys())
+
+    def encode(self, encoding: str) -> bytes:
+        if encoding not in self._variants:
+            self._variants[encoding] = COMPRESSORS[encoding](self.body)
+
+        return self._variants[encoding]
+
+    def etag(self, encoding: str = "identity") -> str:
+        """
+        A strong entity tag for one variant of the document. Each coding is
+        a different representation, so gets its own tag.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.body).hexdigest()[:32]
+
+        if encoding == "identity":
+            return '"{}"'.format(self._digest)
+
+        return '"{}-{}"'.format(self._digest, encoding)
+
+    def respond(self, request, cache_control: Optional[str] = None):
+        """
+        Builds the response for a request, picking the variant according to
+        its Accept-Encoding header, and answering a matching If-None-Match
+        header with a 304 Not Modified.
+        """
+        encoding = negotiate(
+            request.headers.get("accept-encoding", ""), self.encodings
+        )
+        etag = self.etag(encoding)
+        headers = {"Vary": "Accept-Encoding", "ETag": etag}
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return HTTPResponse(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        return raw(
+            self.encode(encoding),
+            headers=headers,
+            content_type=self.content_type,
+        )
+
+
+# Size of the chunks sent by send_chunked
+CHUNK_SIZE = 64 * 1024
+
+
+async def send_chunked(
+    request,
+    fragments: Iterable[bytes],
+    cache_control: Optional[str] = None,
+    content_type: str = "application/json",
+):
+    """
+    Sends a document as it is being encoded, in chunks, compressing it on
+    the fly with gzip when the client accepts it. Neither the document nor
+    its compressed form is ever held in memory as a whole.
+
+    Before Sanic 21.3, which added `request.respond`, the document is sent
+    by a streaming response instead, which is returned and which the
+    handler must return in turn. Otherwise `None` is returned.
+    """
+    encoding = negotiate(
+        request.headers.get("accept-encoding", ""), ("identity", "gzip")
+    )
+    headers = {"Vary": "Accept-Encoding"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    compressor = None
+    if encoding == "gzip":
+        headers["Content-Encoding"] = "gzip"
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    if not hasattr(request, "respond"):
+        return stream(
+            lambda response: _send_chunks(
+                fragments, compressor, response.write
+            ),
+            headers=headers,
+            content_type=content_type,
+        )
+
+    response = await request.respond(
+        headers=headers, content_type=content_type
+    )
+    await _send_chunks(fragments, compressor, response.send)
+    return None
+
+
+async def _send_chunks(fragments: Iterable[bytes], compressor, send):
+    buffer = bytearray()
+    for fragment in fragments:
+        buffer += compressor.compress(fragment) if compressor else fragment
+        if len(buffer) >= CHUNK_SIZE:
+            await send(bytes(buffer))
+            buffer.clear()
+
+    if compressor:
+        buffer += compressor.flush()
+
+    if buffer:
+        await send(bytes(buffer))
+
+
+@lru_cache(maxsize=None)
+def load_spec_file(path: str) -> EncodedDocument:
+    """
+    Loads a specification written ahead of time, for example with
+    `python -m sanic_openapi build`. JSON files are memory mapped, so that
+    every worker shares the same pages; YAML files are converted to JSON.
+    """
+    if path.endswith((".yaml", ".yml")):
+        with open(path, "r") as f:
+            return EncodedDocument(json_dumps(yaml.safe_load(f)))
+
+    with open(path, "rb") as f:
+        return EncodedDocument(
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        )
+
+
+def share_spec(app, body: bytes):
+    """
+    Writes a specification built in the main process to a temporary file,
+    and points the workers at it through `API_SPEC_FILE`. Workers which are
+    forked inherit the config; spawned ones pick it up from the environment.
+    """
+    fd, path = tempfile.mkstemp(prefix="sanic-openapi-", suffix=".json")
+    with os.fdopen(fd, "wb") as f:
+        f.write(body)
+
+    app.config.API_SPEC_FILE = path
+    os.environ["SANIC_API_SPEC_FILE"] = path
+
+
+def unshare_spec(app):
+    path = getattr(app.config, "API_SPEC_FILE", None)
+    if path and os.environ.get("SANIC_API_SPEC_FILE") == path:
+        del os.environ["SANIC_API_SPEC_FILE"]
+        app.config.API_SPEC_FILE = None
+        load_spec_file.cache_clear()
+        os.remove(path)
@@ -1,30 +1,97 @@
 import inspect
-from distutils.version import LooseVersion
-from os.path import abspath, dirname, realpath
+import json
+from typing import Dict, Optional
 
-from sanic import __version__ as sanic_version
 from sanic.blueprints import Blueprint
-from sanic.response import json, redirect
-
-from ..autodoc import YamlStyleParametersParser
-from ..utils import get_all_routes, get_blueprinted_routes, remove_nulls
-from .doc import RouteSpec, definitions, route_specs, serialize_schema
+from sanic.exceptions import NotFound
+from sanic.log import logger
+from sanic.response import redirect
+
+from ..assets import add_ui_routes
+from ..autodoc import (
+    YamlStyleParametersParser,
+    configure_cache,
+    docstring_cache,
+)
+from ..encoding import (
+    EncodedDocument,
+    iter_json_object,
+    json_dumps,
+    load_spec_file,
+    send_chunked,
+    share_spec,
+    unshare_spec,
+)
+from ..profiler import add_stats_route, get_profile, start_profile
+from ..slices import TagSlices, load_spec_file_slices, tag_urls
+from ..utils import (
+    LazyBuild,
+    app_state,
+    finalized_routes,
+    get_all_routes,
+    get_blueprinted_routes,
+    remove_nulls,
+)
+from .doc import (
+    RouteSpec,
+    referenced_definitions,
+    route_specs,
+    serialize_schema,
+)
 from .spec import Spec as Swagger2Spec
 
-SANIC_VERSION = LooseVersion(sanic_version)
-SANIC_21_3_0 = LooseVersion("21.3.0")
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+class AppState:
+    """
+    The specification of one app, as last built, along with the endpoints
+    it was built from, to be reused by the next build.
+    """
+
+    def __init__(self):
+        self.endpoints: Dict = {}
+        self.spec: Optional[Swagger2Spec] = None
+        self.document: Optional[EncodedDocument] = None
+        self.slices: Optional[TagSlices] = None
+
+
+def get_state(app) -> AppState:
+    return app_state(app, "openapi2", AppState)
 
 
 def blueprint_factory():
     swagger_blueprint = Blueprint("swagger", url_prefix="/swagger")
 
-    dir_path = dirname(dirname(realpath(__file__)))
-    dir_path = abspath(dir_path + "/ui")
+    add_ui_routes(swagger_blueprint)
+    add_stats_route(swagger_blueprint)
+    lazy = LazyBuild()
 
-    swagger_blueprint.static(
-        "/", dir_path + "/index.html", strict_slashes=True
-    )
-    swagger_blueprint.static("", dir_path)
+    def build_document(app):
+        state = get_state(app)
+        _spec = build_spec(app, swagger_blueprint.url_prefix, state.endpoints)
+
+        # Encode once here; compressed variants are then produced on demand
+        _document = None
+        if not getattr(app.config, "API_SPEC_STREAM", False):
+            profile = get_profile(app)
+            with profile.phase("serialization"):
+                _document = EncodedDocument(json_dumps(_spec.as_dict))
+            profile.counts["bytes"] = len(_document.body)
+
+        state.spec = _spec
+        state.document = _document
+        state.slices = TagSlices(lambda: json.loads(json_dumps(_spec.as_dict)))
+
+    async def get_slices(app) -> TagSlices:
+        spec_file = getattr(app.config, "API_SPEC_FILE", None)
+        if spec_file:
+            return load_spec_file_slices(spec_file)
+
+        in_executor = getattr(app.config, "API_SPEC_BUILD_IN_EXECUTOR", False)
+        await lazy.ensure(app, build_document, in_executor)
+
+        return get_state(app).slices
 
     # Redirect "/swagger" to "/swagger/"
     @swagger_blueprint.route("", strict_slashes=True)
@@ -32,205 +99,328 @@ def blueprint_factory():
         return redirect("{}/".format(swagger_blueprint.url_prefix))
 
     @swagger_blueprint.route("/swagger.json")
-    def spec(request):
+    async def spec(request):
+        cache_control = getattr(
+            request.app.config, "API_SPEC_CACHE_CONTROL", DEFAULT_CACHE_CONTROL
+        )
+
+        tag = request.args.get("tag")
+        if tag is not None:
+            _slices = await get_slices(request.app)
+            _document = _slices.get(tag)
+            if _document is None:
+                raise NotFound("No operation is tagged {}".format(tag))
+
+            return _document.respond(request, cache_control)
+
+        spec_file = getattr(request.app.config, "API_SPEC_FILE", None)
+        if spec_file:
+            _document = load_spec_file(spec_file)
+            return _document.respond(request, cache_control)
+
+        in_executor = getattr(
+            request.app.config, "API_SPEC_BUILD_IN_EXECUTOR", False
+        )
+        await lazy.ensure(request.app, build_document, in_executor)
 
-        if SANIC_VERSION >= SANIC_21_3_0:
-            return json(swagger_blueprint.ctx._spec.as_dict)
-        else:
-            return json(swagger_blueprint._spec.as_dict)
+        state = get_state(request.app)
+        if state.document is None:
+            return await send_chunked(
+                request,
+                iter_json_object(state.spec.as_dict.items()),
+                cache_control,
+            )
+
+        return state.document.respond(request, cache_control)
 
     @swagger_blueprint.route("/swagger-config")
-    def config(request):
-        return json(
-            getattr(request.app.config, "SWAGGER_UI_CONFIGURATION", {})
+    async def config(request):
+        cache_control = getattr(
+            request.app.config, "API_SPEC_CACHE_CONTROL", DEFAULT_CACHE_CONTROL
+        )
+        configuration = getattr(
+            request.app.config, "SWAGGER_UI_CONFIGURATION", {}
         )
+        if getattr(request.app.config, "SWAGGER_UI_TAG_URLS", False):
+            _slices = await get_slices(request.app)
+            configuration = {**configuration, **tag_urls(_slices)}
+
+        _document = EncodedDocument(json_dumps(configuration))
+        return _document.respond(request, cache_control)
 
     @swagger_blueprint.listener("after_server_start")
-    def build_spec(app, loop):
-        # --------------------------------------------------------------- #
-        # Blueprint Tags
-        # --------------------------------------------------------------- #
+    def build(app, loop):
+        if getattr(app.config, "API_SPEC_FILE", None):
+            return
+
+        if getattr(app.config, "API_SPEC_LAZY", False):
+            lazy.defer(app)
+            return
+
+        build_document(app)
+
+    @swagger_blueprint.listener("main_process_start")
+    def build_in_main_process(app, loop):
+        if not getattr(app.config, "API_SPEC_MAIN_PROCESS", False):
+            return
+
+        if getattr(app.config, "API_SPEC_FILE", None):
+            return
 
+        with finalized_routes(app):
+            _spec = build_spec(app, swagger_blueprint.url_prefix)
+
+        share_spec(app, json_dumps(_spec.as_dict))
+
+    @swagger_blueprint.listener("main_process_stop")
+    def remove_shared_spec(app, loop):
+        unshare_spec(app)
+
+    return swagger_blueprint
+
+
+def build_spec(
+    app, skip_prefix: str = "/swagger", endpoints: Optional[Dict] = None
+) -> Swagger2Spec:
+    """
+    Walks the routes of an app and builds the specification documenting
+    them.
+
+    Arguments:
+        app: The application to document.
+        skip_prefix: URL prefix of the routes serving the documentation,
+                     which are left out.
+        endpoints: Endpoints built by a previous call, which is updated in
+                   place. When given, the routes which were already
+                   documented, with the same handler and documentation, are
+                   not built again, so that rebuilding after routes or
+                   blueprints are added only processes the new or changed
+                   ones.
+    """
+    if endpoints is None:
+        endpoints = {}
+
+    configure_cache(app)
+    profile = start_profile(app)
+    docstrings = docstring_cache.info()
+    serialize = profile.timed("schemas", serialize_schema)
+
+    # --------------------------------------------------------------- #
+    # Blueprint Tags
+    # --------------------------------------------------------------- #
+
+    # Blueprints of the handlers which were not decorated
+    blueprints = {}
+
+    with profile.phase("blueprint_tags"):
         for blueprint_name, handler in get_blueprinted_routes(app):
-            route_spec = route_specs[handler]
+            route_spec = route_specs.get(handler)
+            if route_spec is None:
+                blueprints.setdefault(handler, blueprint_name)
+                continue
             route_spec.blueprint = blueprint_name
             if route_spec.exclude:
                 continue
             if not route_spec.tags:
                 route_spec.tags.append(blueprint_name)
+                route_spec.changed()
 
-        paths = {}
+    paths = {}
 
-        for (
-            uri,
-            route_name,
-            route_parameters,
-            method_handlers,
-        ) in get_all_routes(app, swagger_blueprint.url_prefix):
+    for (
+        uri,
+        route_name,
+        route_parameters,
+        method_handlers,
+    ) in profile.iterate("routes", get_all_routes(app, skip_prefix)):
+        profile.count("routes")
 
-            # --------------------------------------------------------------- #
-            # Methods
-            # --------------------------------------------------------------- #
+        # --------------------------------------------------------------- #
+        # Methods
+        # --------------------------------------------------------------- #
 
-            methods = {}
-            for _method, _handler in method_handlers:
+        methods = {}
+        for _method, _handler in method_handlers:
 
-                if hasattr(_handler, "view_class"):
-                    _handler = getattr(_handler.view_class, _method.lower())
+            if hasattr(_handler, "view_class"):
+                _handler = getattr(_handler.view_class, _method.lower())
 
-                route_spec = route_specs.get(_handler) or RouteSpec()
+            route_spec = route_specs.get(_handler)
+            if route_spec is None:
+                # Handlers which were not decorated get a spec for this
+                # build only, rather than an entry in the registry
+                route_spec = RouteSpec()
+                if _handler in blueprints:
+                    route_spec.blueprint = blueprints[_handler]
+                    route_spec.tags.append(route_spec.blueprint)
 
-                if route_spec.exclude:
-                    continue
+            if route_spec.exclude:
+                continue
 
-                api_consumes_content_types = getattr(
-                    app.config,
-                    "API_CONSUMES_CONTENT_TYPES",
-                    ["application/json"],
-                )
-                consumes_content_types = (
-                    route_spec.consumes_content_type
-                    or api_consumes_content_types
-                )
+            profile.count("operations")
+            key = (uri, _method, route_name)
+            built = endpoints.get(key)
+            if (
+                built is not None
+                and built[0] is _handler
+                and built[1] == route_spec._version
+            ):
+                methods[_method.lower()] = built[2]
+                continue
 
-                api_produces_content_types = getattr(
-                    app.config,
-                    "API_PRODUCES_CONTENT_TYPES",
-                    ["application/json"],
-                )
-                produces_content_types = (
-                    route_spec.produces_content_type
-                    or api_produces_content_types
+            api_consumes_content_types = getattr(
+                app.config,
+                "API_CONSUMES_CONTENT_TYPES",
+                ["application/json"],
+            )
+            consumes_content_types = (
+                route_spec.consumes_content_type
+                or api_consumes_content_types
+            )
+
+            api_produces_content_types = getattr(
+                app.config,
+                "API_PRODUCES_CONTENT_TYPES",
+                ["application/json"],
+            )
+            produces_content_types = (
+                route_spec.produces_content_type
+                or api_produces_content_types
+            )
+
+            # Parameters - Path & Query String
+            route_parameters = []
+            for parameter in route_parameters:
+                route_parameters.append(
+                    {
+                        **serialize(parameter.cast),
+                        "required": True,
+                        "in": "path",
+                        "name": parameter.name,
+                    }
                 )
 
-                # Parameters - Path & Query String
-                route_parameters = []
-                for parameter in route_parameters:
-                    route_parameters.append(
-                        {
-                            **serialize_schema(parameter.cast),
-                            "required": True,
-                            "in": "path",
-                            "name": parameter.name,
-                        }
-                    )
-
-                for consumer in route_spec.consumes:
-                    spec = serialize_schema(consumer.field)
-                    if "properties" in spec:
-                        for name, prop_spec in spec["properties"].items():
-                            route_param = {
-                                **prop_spec,
-                                "required": consumer.required,
-                                "in": consumer.location,
-                                "name": name,
-                            }
-                    else:
+            for consumer in route_spec.consumes:
+                spec = serialize(consumer.field)
+                if "properties" in spec:
+                    for name, prop_spec in spec["properties"].items():
                         route_param = {
-                            **spec,
+                            **prop_spec,
                             "required": consumer.required,
                             "in": consumer.location,
-                            "name": consumer.field.name
-                            if not isinstance(consumer.field, type)
-                            and hasattr(consumer.field, "name")
-                            else "body",
+                            "name": name,
                         }
+                else:
+                    route_param = {
+                        **spec,
+                        "required": consumer.required,
+                        "in": consumer.location,
+                        "name": consumer.field.name
+                        if not isinstance(consumer.field, type)
+                        and hasattr(consumer.field, "name")
+                        else "body",
+                    }
 
-                    if "$ref" in route_param:
-                        route_param["schema"] = {"$ref": route_param["$ref"]}
-                        del route_param["$ref"]
+                if "$ref" in route_param:
+                    route_param["schema"] = {"$ref": route_param["$ref"]}
+                    del route_param["$ref"]
 
-                    if route_param["in"] == "path":
-                        route_param["required"] = True
-                        for i, parameter in enumerate(route_parameters):
-                            if parameter["name"] == route_param["name"]:
-                                route_parameters.pop(i)
-                                break
+                if route_param["in"] == "path":
+                    route_param["required"] = True
+                    for i, parameter in enumerate(route_parameters):
+                        if parameter["name"] == route_param["name"]:
+                            route_parameters.pop(i)
+                            break
 
-                    route_parameters.append(route_param)
+                route_parameters.append(route_param)
 
-                responses = {}
+            responses = {}
 
-                for (status_code, routefield) in route_spec.response:
-                    responses["{}".format(status_code)] = {
-                        "schema": serialize_schema(routefield.field),
-                        "description": routefield.description,
-                    }
+            for (status_code, routefield) in route_spec.response:
+                responses["{}".format(status_code)] = {
+                    "schema": serialize(routefield.field),
+                    "description": routefield.description,
+                }
 
-                if route_spec.produces:
-                    responses["200"] = {
-                        "schema": serialize_schema(route_spec.produces.field),
-                        "description": route_spec.produces.description,
-                    }
-                elif not responses:
-                    responses["200"] = {"description": "OK"}
+            if route_spec.produces:
+                responses["200"] = {
+                    "schema": serialize(route_spec.produces.field),
+                    "description": route_spec.produces.description,
+                }
+            elif not responses:
+                responses["200"] = {"description": "OK"}
 
+            with profile.phase("autodoc"):
                 y = YamlStyleParametersParser(inspect.getdoc(_handler))
                 autodoc_endpoint = y.to_openAPI_2()
 
-                # if the user has manualy added a description or summary via
-                # the decorator, then use theirs
-
-                if route_spec.summary:
-                    autodoc_endpoint["summary"] = route_spec.summary
-
-                if route_spec.description:
-                    autodoc_endpoint["description"] = route_spec.description
-
-                endpoint = remove_nulls(
-                    {
-                        "operationId": route_spec.operation
-                        or "%s_%s" % (_method.lower(), route_name),
-                        "summary": route_spec.summary,
-                        "description": route_spec.description,
-                        "consumes": consumes_content_types,
-                        "produces": produces_content_types,
-                        "tags": route_spec.tags or None,
-                        "parameters": route_parameters,
-                        "responses": responses,
-                    }
-                )
-
-                # otherwise, update with anything parsed from the
-                # docstrings yaml
-                endpoint.update(autodoc_endpoint)
-
-                methods[_method.lower()] = endpoint
-
-            if methods:
-                if uri not in paths:
-                    paths[uri] = {}
-                paths[uri].update(methods)
-
-        # --------------------------------------------------------------- #
-        # Definitions
-        # --------------------------------------------------------------- #
-
+            # if the user has manualy added a description or summary via
+            # the decorator, then use theirs
+
+            if route_spec.summary:
+                autodoc_endpoint["summary"] = route_spec.summary
+
+            if route_spec.description:
+                autodoc_endpoint["description"] = route_spec.description
+
+            endpoint = remove_nulls(
+                {
+                    "operationId": route_spec.operation
+                    or "%s_%s" % (_method.lower(), route_name),
+                    "summary": route_spec.summary,
+                    "description": route_spec.description,
+                    "consumes": consumes_content_types,
+                    "produces": produces_content_types,
+                    "tags": route_spec.tags or None,
+                    "parameters": route_parameters,
+                    "responses": responses,
+                }
+            )
+
+            # otherwise, update with anything parsed from the
+            # docstrings yaml
+            endpoint.update(autodoc_endpoint)
+
+            methods[_method.lower()] = endpoint
+            endpoints[key] = (_handler, route_spec._version, endpoint)
+
+        if methods:
+            if uri not in paths:
+                paths[uri] = {}
+            paths[uri].update(methods)
+
+    # --------------------------------------------------------------- #
+    # Definitions
+    # --------------------------------------------------------------- #
+
+    with profile.phase("build"):
         _spec = Swagger2Spec(app=app)
 
-        _spec.add_definitions(
-            definitions={
-                obj.object_name: definition
-                for obj, definition in definitions.values()
-            }
-        )
+        # Only the models and tags of this app's endpoints are documented
+        _definitions = referenced_definitions(paths)
+        _spec.add_definitions(definitions=_definitions)
 
-        # --------------------------------------------------------------- #
+        # ----------------------------------------------------------- #
         # Tags
-        # --------------------------------------------------------------- #
-
-        tags = set()
-        for route_spec in route_specs.values():
-            if route_spec.blueprint != "swagger":
-                tags.update(route_spec.tags)
-
+        # ----------------------------------------------------------- #
+
+        tags = {
+            tag: None
+            for methods in paths.values()
+            for endpoint in methods.values()
+            for tag in endpoint.get("tags") or ()
+        }
         _spec.add_tags(tags=[{"name": name} for name in tags])
 
         _spec.add_paths(paths)
 
-        if SANIC_VERSION >= SANIC_21_3_0:
-            swagger_blueprint.ctx._spec = _spec
-        else:
-            swagger_blueprint._spec = _spec
+    profile.count("schemas", len(_definitions))
 
-    return swagger_blueprint
+    parsed, cached = (
+        now - before for now, before in zip(docstring_cache.info(), docstrings)
+    )
+    profile.count("docstrings_parsed", parsed)
+    profile.count("docstrings_cached", cached)
+    logger.debug("Docstrings: %d parsed, %d from cache", parsed, cached)
+
+    return _spec
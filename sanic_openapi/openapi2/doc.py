@@ -1,10 +1,11 @@
 import collections.abc
 import typing
 import uuid
-from collections import defaultdict
 from datetime import date, datetime
 from itertools import chain
 
+from ..utils import HandlerRegistry
+
 
 class Field:
     def __init__(
@@ -165,6 +166,35 @@ class Object(Field):
         }
 
 
+def referenced_definitions(value) -> typing.Dict[str, dict]:
+    """
+    The definitions which a serialized value references, directly or through
+    other definitions, by name, so that a specification only carries those
+    of the models it uses.
+    """
+    by_name = {
+        obj.object_name: definition for obj, definition in definitions.values()
+    }
+    referenced = {}
+    pending = [value]
+
+    while pending:
+        value = pending.pop()
+        if isinstance(value, list):
+            pending.extend(value)
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+
+            ref = value.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/definitions/"):
+                name = ref.split("/", 2)[2]
+                if name in by_name and name not in referenced:
+                    referenced[name] = by_name[name]
+                    pending.append(by_name[name])
+
+    return referenced
+
+
 def serialize_schema(schema):
     schema_type = type(schema)
 
@@ -232,6 +262,8 @@ class RouteSpec(object):
     tags = None
     exclude = None
     response = None
+    # Incremented whenever the spec changes, so that its endpoint is rebuilt
+    _version = 0
 
     def __init__(self):
         self.tags = []
@@ -239,6 +271,18 @@ class RouteSpec(object):
         self.response = []
         super().__init__()
 
+    def __setattr__(self, name, value):
+        if getattr(self, name, None) != value:
+            self.changed()
+        super().__setattr__(name, value)
+
+    def changed(self):
+        """
+        Marks the spec as changed, which setting its attributes does, but
+        adding to its lists in place does not.
+        """
+        super().__setattr__("_version", self._version + 1)
+
 
 class RouteField(object):
     field = None
@@ -253,7 +297,7 @@ class RouteField(object):
         self.description = description
 
 
-route_specs = defaultdict(RouteSpec)
+route_specs = HandlerRegistry(RouteSpec)
 
 
 def route(
@@ -323,6 +367,7 @@ def consumes(
             for arg in args:
                 field = RouteField(arg, location, required)
                 route_specs[func].consumes.append(field)
+            route_specs[func].changed()
             route_specs[func].consumes_content_type = [content_type]
         return func
 
@@ -346,6 +391,7 @@ def response(*args, description=None):
             status_code = args[0]
             routefield = RouteField(args[1], description=description)
             route_specs[func].response.append((status_code, routefield))
+            route_specs[func].changed()
         return func
 
     return inner
@@ -354,6 +400,7 @@ def response(*args, description=None):
 def tag(name):
     def inner(func):
         route_specs[func].tags.append(name)
+        route_specs[func].changed()
         return func
 
     return inner
@@ -2,24 +2,30 @@
    isort:skip_file
 """
 
-from collections import defaultdict
-from typing import Dict, TypeVar
+from ..utils import HandlerRegistry, app_state
 from .builders import OperationBuilder, SpecificationBuilder
 
-try:
-    from sanic.models.handler_types import RouteHandler
-except ImportError:
-    RouteHandler = TypeVar("RouteHandler")  # type: ignore
-
 # Static datastores, which get added to via the oas3.openapi decorators,
 # and then read from in the blueprint generation
 
-operations: Dict[RouteHandler, OperationBuilder] = defaultdict(
-    OperationBuilder
-)
+operations = HandlerRegistry(OperationBuilder)
+
+# What is set here is shared by the specification of every app
 specification = SpecificationBuilder()
 
 
+def get_specification(app) -> SpecificationBuilder:
+    """
+    The specification of an app, which documents its routes only, and
+    inherits what was set on the module level `specification`.
+    """
+    return app_state(
+        app,
+        "openapi3_specification",
+        lambda: SpecificationBuilder(specification),
+    )
+
+
 from .blueprint import blueprint_factory  # noqa
 
 
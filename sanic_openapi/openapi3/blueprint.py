@@ -1,115 +1,254 @@
 import inspect
-from os.path import abspath, dirname, realpath
 
 from sanic.blueprints import Blueprint
-from sanic.response import json, redirect
-
-from ..utils import get_all_routes, get_blueprinted_routes
-from . import operations, specification
+from sanic.exceptions import NotFound
+from sanic.log import logger
+from sanic.response import redirect
+
+from ..assets import add_ui_routes
+from ..autodoc import configure_cache, docstring_cache
+from ..encoding import (
+    EncodedDocument,
+    json_dumps,
+    load_spec_file,
+    send_chunked,
+    share_spec,
+    unshare_spec,
+)
+from ..profiler import add_stats_route, get_profile, start_profile
+from ..slices import TagSlices, load_spec_file_slices, tag_urls
+from ..utils import (
+    LazyBuild,
+    finalized_routes,
+    get_all_routes,
+    get_blueprinted_routes,
+)
+from . import get_specification, operations
+from .builders import OperationBuilder
+from .cache import add_response_cache
+from .validation import add_validation
 
 DEFAULT_SWAGGER_UI_CONFIG = {
     "apisSorter": "alpha",
     "operationsSorter": "alpha",
 }
 
+DEFAULT_CACHE_CONTROL = "no-cache"
+
 
 def blueprint_factory():
     oas3_blueprint = Blueprint("openapi", url_prefix="/swagger")
 
-    dir_path = dirname(dirname(realpath(__file__)))
-    dir_path = abspath(dir_path + "/ui")
+    add_ui_routes(oas3_blueprint)
+    add_stats_route(oas3_blueprint)
+    lazy = LazyBuild()
 
-    oas3_blueprint.static("/", dir_path + "/index.html", strict_slashes=True)
-    oas3_blueprint.static("", dir_path)
+    def build_document(app):
+        build_spec(app, oas3_blueprint.url_prefix)
+        if not getattr(app.config, "API_SPEC_STREAM", False):
+            get_specification(app).document(get_profile(app))
 
     # Redirect "/swagger" to "/swagger/"
     @oas3_blueprint.route("", strict_slashes=True)
     def index(request):
         return redirect("{}/".format(oas3_blueprint.url_prefix))
 
+    async def ensure_built(app):
+        in_executor = getattr(app.config, "API_SPEC_BUILD_IN_EXECUTOR", False)
+        await lazy.ensure(app, build_document, in_executor)
+
+    async def get_slices(app) -> TagSlices:
+        spec_file = getattr(app.config, "API_SPEC_FILE", None)
+        if spec_file:
+            return load_spec_file_slices(spec_file)
+
+        await ensure_built(app)
+        return get_specification(app).tag_slices()
+
     @oas3_blueprint.route("/swagger.json")
-    def spec(request):
-        return json(specification.build().serialize())
+    async def spec(request):
+        tag = request.args.get("tag")
+        spec_file = getattr(request.app.config, "API_SPEC_FILE", None)
+        if tag is not None:
+            slices = await get_slices(request.app)
+            document = slices.get(tag)
+            if document is None:
+                raise NotFound("No operation is tagged {}".format(tag))
+        elif spec_file:
+            document = load_spec_file(spec_file)
+        else:
+            await ensure_built(request.app)
+
+            if getattr(request.app.config, "API_SPEC_STREAM", False):
+                return await send_chunked(
+                    request,
+                    get_specification(request.app).build().iter_json(),
+                    get_cache_control(request.app),
+                )
+
+            document = get_specification(request.app).document(
+                get_profile(request.app)
+            )
+
+        return document.respond(request, get_cache_control(request.app))
 
     @oas3_blueprint.route("/swagger-config")
-    def config(request):
-        return json(
-            getattr(
-                request.app.config,
-                "SWAGGER_UI_CONFIGURATION",
-                DEFAULT_SWAGGER_UI_CONFIG,
-            )
+    async def config(request):
+        configuration = getattr(
+            request.app.config,
+            "SWAGGER_UI_CONFIGURATION",
+            DEFAULT_SWAGGER_UI_CONFIG,
         )
+        if getattr(request.app.config, "SWAGGER_UI_TAG_URLS", False):
+            slices = await get_slices(request.app)
+            configuration = {**configuration, **tag_urls(slices)}
+
+        document = EncodedDocument(json_dumps(configuration))
+        return document.respond(request, get_cache_control(request.app))
 
     @oas3_blueprint.listener("before_server_start")
-    def build_spec(app, loop):
-        # --------------------------------------------------------------- #
-        # Blueprint Tags
-        # --------------------------------------------------------------- #
+    def build(app, loop):
+        if getattr(app.config, "API_SPEC_FILE", None):
+            return
+
+        if getattr(app.config, "API_SPEC_LAZY", False):
+            lazy.defer(app)
+            return
+
+        build_spec(app, oas3_blueprint.url_prefix)
+
+    # Their listeners run after the build, so that the operations they
+    # compile are complete, with their docstrings
+    add_validation(oas3_blueprint)
+    add_response_cache(oas3_blueprint)
+
+    @oas3_blueprint.listener("main_process_start")
+    def build_in_main_process(app, loop):
+        if not getattr(app.config, "API_SPEC_MAIN_PROCESS", False):
+            return
+
+        if getattr(app.config, "API_SPEC_FILE", None):
+            return
+
+        with finalized_routes(app):
+            build_spec(app, oas3_blueprint.url_prefix)
+
+        share_spec(app, get_specification(app).serialized())
 
+    @oas3_blueprint.listener("main_process_stop")
+    def remove_shared_spec(app, loop):
+        unshare_spec(app)
+
+    return oas3_blueprint
+
+
+def build_spec(app, skip_prefix: str = "/swagger"):
+    """
+    Walks the routes of an app and adds an operation to its specification,
+    see `get_specification`, for each of them.
+
+    It can be called again after routes or blueprints are added: operations
+    which are already documented, and have not changed since, are skipped,
+    and the specification only builds the paths which did change.
+
+    Arguments:
+        app: The application to document.
+        skip_prefix: URL prefix of the routes serving the documentation,
+                     which are left out.
+    """
+    configure_cache(app)
+    specification = get_specification(app)
+    profile = start_profile(app)
+    docstrings = docstring_cache.info()
+
+    # --------------------------------------------------------------- #
+    # Blueprint Tags
+    # --------------------------------------------------------------- #
+
+    # Blueprints of the handlers which were not decorated
+    blueprints = {}
+
+    with profile.phase("blueprint_tags"):
         for blueprint_name, handler in get_blueprinted_routes(app):
-            operation = operations[handler]
-            if not operation.tags:
+            operation = operations.get(handler)
+            if operation is None:
+                blueprints.setdefault(handler, blueprint_name)
+            elif not operation.tags:
                 operation.tag(blueprint_name)
 
+    # --------------------------------------------------------------- #
+    # Operations
+    # --------------------------------------------------------------- #
+    for (
+        uri,
+        route_name,
+        route_parameters,
+        method_handlers,
+    ) in profile.iterate("routes", get_all_routes(app, skip_prefix)):
+        profile.count("routes")
+
         # --------------------------------------------------------------- #
-        # Operations
+        # Methods
         # --------------------------------------------------------------- #
-        for (
-            uri,
-            route_name,
-            route_parameters,
-            method_handlers,
-        ) in get_all_routes(app, oas3_blueprint.url_prefix):
 
-            # --------------------------------------------------------------- #
-            # Methods
-            # --------------------------------------------------------------- #
+        uri = uri if uri == "/" else uri.rstrip("/")
 
-            uri = uri if uri == "/" else uri.rstrip("/")
+        for method, _handler in method_handlers:
 
-            for method, _handler in method_handlers:
+            if method == "OPTIONS":
+                continue
 
-                if method == "OPTIONS":
-                    continue
+            if hasattr(_handler, "view_class"):
+                _handler = getattr(_handler.view_class, method.lower())
 
-                if hasattr(_handler, "view_class"):
-                    _handler = getattr(_handler.view_class, method.lower())
-                operation = operations[_handler]
+            operation = operations.get(_handler)
+            if operation is None:
+                # Handlers which were not decorated get an operation which
+                # only the specification keeps, rather than an entry in
+                # the registry
+                operation = specification.handled_by(uri, method, _handler)
+            if operation is None:
+                operation = OperationBuilder()
+                if _handler in blueprints:
+                    operation.tag(blueprints[_handler])
 
-                if operation._exclude:
-                    continue
+            if operation._exclude:
+                continue
 
-                docstring = inspect.getdoc(_handler)
+            profile.count("operations")
+            if specification.documents(uri, method, operation):
+                continue
 
-                if docstring:
+            docstring = inspect.getdoc(_handler)
+
+            if docstring:
+                with profile.phase("autodoc"):
                     operation.autodoc(docstring)
 
-                # operation ID must be unique, and it isnt currently used for
-                # anything in UI, so dont add something meaningless
-                # if not hasattr(operation, "operationId"):
-                #     operation.operationId = "%s_%s" % (
-                #       method.lower(), route.name
-                #     )
+            # operation ID must be unique, and it isnt currently used for
+            # anything in UI, so dont add something meaningless
+            # if not hasattr(operation, "operationId"):
+            #     operation.operationId = "%s_%s" % (
+            #       method.lower(), route.name
+            #     )
 
-                for _parameter in route_parameters:
-                    if any(
-                        (
-                            param.fields["name"] == _parameter.name
-                            for param in operation.parameters
-                        )
-                    ):
-                        continue
+            with profile.phase("schemas"):
+                operation.path_parameters(route_parameters)
 
-                    operation.parameter(
-                        _parameter.name, _parameter.cast, "path"
-                    )
+            specification.operation(uri, method, operation, _handler)
 
-                specification.operation(uri, method, operation)
+    add_static_info_to_spec_from_config(app, specification)
 
-        add_static_info_to_spec_from_config(app, specification)
+    parsed, cached = (
+        now - before for now, before in zip(docstring_cache.info(), docstrings)
+    )
+    profile.count("docstrings_parsed", parsed)
+    profile.count("docstrings_cached", cached)
+    logger.debug("Docstrings: %d parsed, %d from cache", parsed, cached)
 
-    return oas3_blueprint
+
+def get_cache_control(app):
+    return getattr(app.config, "API_SPEC_CACHE_CONTROL", DEFAULT_CACHE_CONTROL)
 
 
 def add_static_info_to_spec_from_config(app, specification):
@@ -137,6 +276,10 @@ def add_static_info_to_spec_from_config(app, specification):
         getattr(app.config, "API_CONTACT_EMAIL", None),
     )
 
+    specification.model_components(
+        getattr(app.config, "API_SCHEMA_COMPONENTS", False)
+    )
+
     for scheme in getattr(app.config, "API_SCHEMES", ["http"]):
         host = getattr(app.config, "API_HOST", None)
         basePath = getattr(app.config, "API_BASEPATH", "")
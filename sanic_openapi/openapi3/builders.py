@@ -4,11 +4,17 @@ Builders for the oas3 object types
 These are completely internal, so can be refactored if desired without concern
 for breaking user experience
 """
-from collections import defaultdict
-from typing import Optional
+import re
+from collections import defaultdict, namedtuple
+from typing import Callable, Iterable, Optional, Sequence, Set, Tuple
+
+from sanic.exceptions import InvalidUsage, SanicException
 
 from ..autodoc import YamlStyleParametersParser
-from ..utils import remove_nulls, remove_nulls_from_kwargs
+from ..encoding import EncodedDocument
+from ..profiler import BuildProfile
+from ..slices import TagSlices
+from ..utils import remove_nulls, remove_nulls_from_kwargs, weak_ref
 from .definitions import (
     Any,
     Components,
@@ -22,11 +28,16 @@ from .definitions import (
     Operation,
     Parameter,
     PathItem,
+    Reference,
     RequestBody,
     Response,
     Server,
     Tag,
 )
+from .serializers import Serializer, response_properties, response_schema
+from .types import Array, Object, Schema, String, extract_models
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "size"])
 
 
 class OperationBuilder:
@@ -49,9 +60,20 @@ class OperationBuilder:
         self.responses = {}
         self._autodoc = None
         self._exclude = False
+        # Bumped by every change, so that specifications know when the
+        # operation has to be built again
+        self._version = 0
+        self._serializers: Dict[Any, Serializer] = {}
+        # The name of the parameter selecting the fields of the response with
+        # each status, and the fields it allows when not all of them
+        self._fieldsets: Dict[Any, Tuple[str, Optional[Tuple[str, ...]]]] = {}
+        self._selectable: Dict[Any, Tuple[str, Tuple[str, ...]]] = {}
+        # How long responses are cached, and the parameters they vary on
+        self._cache: Optional[Tuple[float, Optional[Tuple[str, ...]]]] = None
 
     def name(self, value: str):
         self.operationId = value
+        self._version += 1
 
     def describe(self, summary: str = None, description: str = None):
         if summary:
@@ -60,18 +82,25 @@ class OperationBuilder:
         if description:
             self.description = description
 
+        self._version += 1
+
     def document(self, url: str, description: str = None):
         self.externalDocs = ExternalDocumentation.make(url, description)
+        self._version += 1
 
     def tag(self, *args: str):
         for arg in args:
             self.tags.append(arg)
 
+        self._version += 1
+
     def deprecate(self):
         self.deprecated = True
+        self._version += 1
 
     def body(self, content: Any, **kwargs):
         self.requestBody = RequestBody.make(content, **kwargs)
+        self._version += 1
 
     def parameter(
         self, name: str, schema: Any, location: str = "query", **kwargs
@@ -79,11 +108,163 @@ class OperationBuilder:
         self.parameters.append(
             Parameter.make(name, schema, location, **kwargs)
         )
+        self._version += 1
 
     def response(
         self, status, content: Any = None, description: str = None, **kwargs
     ):
         self.responses[status] = Response.make(content, description, **kwargs)
+        self._serializers.clear()
+        self._selectable.clear()
+        self._version += 1
+
+    def fieldset(
+        self,
+        status=200,
+        fields: Optional[Sequence[str]] = None,
+        name: str = "fields",
+    ):
+        self._fieldsets[status] = (name, tuple(fields) if fields else None)
+        self._selectable.clear()
+        self._version += 1
+
+    def fieldset_fields(self, status=200) -> Optional[Tuple[str, tuple]]:
+        """
+        The name of the parameter selecting the fields of the response with
+        a status, along with the fields it allows, or `None` when the
+        response has no such parameter.
+
+        Raises:
+            SanicException: When the response has no object schema, or the
+                            fields are not among its properties.
+        """
+        if status not in self._fieldsets:
+            return None
+
+        if status not in self._selectable:
+            name, fields = self._fieldsets[status]
+            properties = response_properties(self, status)
+            if properties is None:
+                raise SanicException(
+                    "The {} response has no object schema to select fields "
+                    "of with '{}'".format(status, name)
+                )
+
+            unknown = [x for x in fields or () if x not in properties]
+            if unknown:
+                raise SanicException(
+                    "The {} response has no fields {} to select with "
+                    "'{}'".format(status, ", ".join(unknown), name)
+                )
+
+            self._selectable[status] = (name, fields or tuple(properties))
+
+        return self._selectable[status]
+
+    def cache(self, ttl: float, vary: Optional[Sequence[str]] = None):
+        self._cache = (ttl, tuple(vary) if vary is not None else None)
+        self._version += 1
+
+    def caching(self) -> Optional[Tuple[float, Tuple[str, ...]]]:
+        """
+        How long the responses of the operation are cached, along with the
+        names of the parameters they vary on, or `None` when they are not.
+
+        Raises:
+            SanicException: When the responses vary on parameters which are
+                            not documented.
+        """
+        if self._cache is None:
+            return None
+
+        ttl, vary = self._cache
+        names = [
+            parameter.fields["name"]
+            for parameter in self.documented_parameters()
+        ]
+        if vary is None:
+            return ttl, tuple(names)
+
+        unknown = [x for x in vary if x not in names]
+        if unknown:
+            raise SanicException(
+                "Responses cannot vary on {}, which are not documented "
+                "parameters".format(", ".join(unknown))
+            )
+
+        return ttl, vary
+
+    def path_parameters(self, route_parameters: Iterable):
+        """
+        Documents the parameters of the path of a route, typed as the route
+        casts them, unless the operation already documents them.
+        """
+        names = {parameter.fields["name"] for parameter in self.parameters}
+        for parameter in route_parameters:
+            if parameter.name not in names:
+                self.parameter(parameter.name, parameter.cast, "path")
+
+    def documented_parameters(self) -> List[Parameter]:
+        """
+        The parameters of the operation, followed by those selecting the
+        fields of its responses.
+        """
+        parameters = list(self.parameters)
+        names = {parameter.fields["name"] for parameter in parameters}
+
+        for status in self._fieldsets:
+            name, fields = self.fieldset_fields(status)
+            if name in names:
+                continue
+
+            names.add(name)
+            parameters.append(
+                Parameter.make(
+                    name,
+                    Array(String(enum=list(fields))),
+                    "query",
+                    explode=False,
+                    description="Comma separated fields of the response "
+                    "to return, instead of all of them",
+                )
+            )
+
+        return parameters
+
+    def serializer(
+        self, status=200, fields: Optional[str] = None
+    ) -> Serializer:
+        """
+        The serializer of the JSON content of the response with a status,
+        compiled from its schema the first time it is asked for.
+
+        Arguments:
+            status: The status of the response.
+            fields: The value of the parameter selecting the fields of the
+                    response, to only serialize those.
+
+        Raises:
+            InvalidUsage: When fields are selected which are not allowed.
+        """
+        serializer = self._serializers.get(status)
+        if serializer is None:
+            serializer = self._serializers[status] = Serializer(
+                response_schema(self, status)
+            )
+
+        selectable = fields and self.fieldset_fields(status)
+        if not selectable:
+            return serializer
+
+        name, allowed = selectable
+        selected = frozenset(x.strip() for x in fields.split(",") if x.strip())
+        unknown = selected.difference(allowed)
+        if unknown:
+            raise InvalidUsage(
+                "Unknown {}: {}".format(name, ", ".join(sorted(unknown)))
+            )
+
+        return serializer.only(selected) if selected else serializer
 
     def secured(self, *args, **kwargs):
         items = {**{v: [] for v in args}, **kwargs}
@@ -94,12 +275,19 @@ class OperationBuilder:
             gates[gate] = params
 
         self.security.append(gates)
+        self._version += 1
 
     def build(self):
         operation_dict = self.__dict__.copy()
+        operation_dict["parameters"] = self.documented_parameters()
+
+        caching = self.caching()
+        if caching:
+            ttl, vary = caching
+            operation_dict["x-cache"] = {"ttl": ttl, "vary": list(vary)}
         if not self.responses:
             # todo -- look into more consistent default response format
-            operation_dict["responses"]["default"] = {"description": "OK"}
+            operation_dict["responses"] = {"default": {"description": "OK"}}
 
         if self._autodoc:
             operation_dict.update(self._autodoc)
@@ -109,12 +297,21 @@ class OperationBuilder:
     def autodoc(self, docstring: str):
         y = YamlStyleParametersParser(docstring)
         self._autodoc = y.to_openAPI_3()
+        self._version += 1
 
     def exclude(self, flag: bool = True):
         self._exclude = flag
+        self._version += 1
 
 
 class SpecificationBuilder:
+    """
+    Arguments:
+        base: A specification whose info, servers, tags, components and raw
+              paths are inherited, as the specification of each app does
+              with the module level `specification`.
+    """
+
     _urls: List[str]
     _title: str
     _version: str
@@ -129,7 +326,8 @@ class SpecificationBuilder:
     # _components: ComponentsBuilder
     # deliberately not included
 
-    def __init__(self):
+    def __init__(self, base: Optional["SpecificationBuilder"] = None):
+        self._base = base
         self._components = defaultdict(dict)
         self._contact = None
         self._description = None
@@ -142,9 +340,110 @@ class SpecificationBuilder:
         self._title = None
         self._urls = []
         self._version = None
+        self._models: Optional[ModelComponents] = None
+
+        self._cache = None
+        # The number of model schemas in the cached document
+        self._cache_models = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._slices = None
+        # Bumped by every change, so that specifications inheriting from
+        # this one know when to drop their cache
+        self._revision = 0
+        self._base_revision = None
+
+        # Built path items, along with the versions of the operations they
+        # were built from, so that only changed paths are built again
+        self._built_paths: Dict[str, PathItem] = {}
+        self._versions: Dict[str, Dict[str, int]] = defaultdict(dict)
+        # The handlers documented by each operation
+        self._handlers: Dict[str, Dict[str, Callable]] = defaultdict(dict)
+
+    def invalidate(self):
+        """
+        Drop the cached serialized specification, so that it is rebuilt the
+        next time it is requested. Every method that mutates the builder
+        calls this.
+        """
+        self._cache = None
+        self._slices = None
+        self._revision += 1
+
+    def _check_base(self):
+        if self._base is None:
+            return
+
+        self._base._check_base()
+        if self._base._revision != self._base_revision:
+            self._base_revision = self._base._revision
+            self.invalidate()
+
+    def _get(self, name: str) -> Any:
+        # An info field, falling back to the base's
+        value = getattr(self, name)
+        if value is None and self._base is not None:
+            return self._base._get(name)
+
+        return value
+
+    def document(
+        self, profile: Optional[BuildProfile] = None
+    ) -> EncodedDocument:
+        """
+        Returns the JSON encoded specification, building it only if the
+        builder has changed since the last call.
+
+        Arguments:
+            profile: Where to record the time spent building and encoding,
+                     when it has to be done.
+        """
+        profile = profile or BuildProfile()
+        self._check_base()
+
+        if self._cache is None:
+            self._cache_misses += 1
+
+            with profile.phase("build"):
+                document = self.build()
+
+            # The model schemas are counted as the document is encoded
+            models: Set[str] = set()
+            with profile.phase("serialization"):
+                self._cache = EncodedDocument(document.to_json_bytes(models))
+
+            self._cache_models = len(models)
+        else:
+            self._cache_hits += 1
+
+        profile.counts["bytes"] = len(self._cache.body)
+        profile.counts["schemas"] = self._cache_models
+
+        return self._cache
+
+    def serialized(self) -> bytes:
+        return self.document().body
+
+    def tag_slices(self) -> TagSlices:
+        """
+        The partial specifications of each tag, cut from the document.
+        """
+        self._check_base()
+        if self._slices is None:
+            self._slices = TagSlices.of(self.document())
+
+        return self._slices
+
+    def cache_info(self) -> CacheInfo:
+        size = len(self._cache.body) if self._cache is not None else 0
+        return CacheInfo(self._cache_hits, self._cache_misses, size)
 
     def url(self, value: str):
+        if value in self._urls:
+            return
+
         self._urls.append(value)
+        self.invalidate()
 
     def describe(
         self,
@@ -157,6 +456,7 @@ class SpecificationBuilder:
         self._version = version
         self._description = description
         self._terms = terms
+        self.invalidate()
 
     def _do_describe(
         self,
@@ -165,24 +465,30 @@ class SpecificationBuilder:
         description: Optional[str] = None,
         terms: Optional[str] = None,
     ):
-        if any([self._title, self._version, self._description, self._terms]):
+        if any(
+            self._get(name)
+            for name in ("_title", "_version", "_description", "_terms")
+        ):
             return
         self.describe(title, version, description, terms)
 
     def tag(self, name: str, description: Optional[str] = None, **kwargs):
         self._tags[name] = Tag(name, description=description, **kwargs)
+        self.invalidate()
 
     def external(self, url: str, description: Optional[str] = None, **kwargs):
         self._external = ExternalDocumentation(url, description=description)
+        self.invalidate()
 
     def contact(self, name: str = None, url: str = None, email: str = None):
         kwargs = remove_nulls_from_kwargs(name=name, url=url, email=email)
         self._contact = Contact(**kwargs)
+        self.invalidate()
 
     def _do_contact(
         self, name: str = None, url: str = None, email: str = None
     ):
-        if self._contact:
+        if self._get("_contact"):
             return
 
         self.contact(name, url, email)
@@ -190,14 +496,51 @@ class SpecificationBuilder:
     def license(self, name: str = None, url: str = None):
         if name is not None:
             self._license = License(name, url=url)
+            self.invalidate()
 
     def _do_license(self, name: str = None, url: str = None):
-        if self._license:
+        if self._get("_license"):
             return
 
         self.license(name, url)
 
-    def operation(self, path: str, method: str, operation: OperationBuilder):
+    def documents(
+        self, path: str, method: str, operation: OperationBuilder
+    ) -> bool:
+        """
+        Whether the operation is already in the specification, unchanged
+        since it was added.
+        """
+        method = method.lower()
+        return (
+            self._paths.get(path, {}).get(method) is operation
+            and self._versions[path].get(method) == operation._version
+        )
+
+    def handled_by(
+        self, path: str, method: str, handler
+    ) -> Optional[OperationBuilder]:
+        """
+        The operation which documents a handler, when it was added along
+        with it.
+        """
+        method = method.lower()
+        handled = self._handlers.get(path, {}).get(method)
+        if handled is None or handled() is not handler:
+            return None
+
+        return self._paths[path].get(method)
+
+    def operation(
+        self,
+        path: str,
+        method: str,
+        operation: OperationBuilder,
+        handler=None,
+    ):
+        if self.documents(path, method, operation):
+            return
+
         for _tag in operation.tags:
             if _tag in self._tags.keys():
                 continue
@@ -205,9 +548,27 @@ class SpecificationBuilder:
             self._tags[_tag] = Tag(_tag)
 
         self._paths[path][method.lower()] = operation
+        self._versions[path][method.lower()] = operation._version
+        if handler is not None:
+            self._handlers[path][method.lower()] = weak_ref(handler)
+        self._built_paths.pop(path, None)
+        self.invalidate()
+
+    def model_components(self, flag: bool = True):
+        """
+        Whether to add each model class once to `components/schemas`, and
+        reference it wherever it is used, rather than repeating its schema.
+        """
+        if flag == (self._models is not None):
+            return
+
+        self._models = ModelComponents() if flag else None
+        self._built_paths.clear()
+        self.invalidate()
 
     def add_component(self, location: str, name: str, obj: Any):
         self._components[location].update({name: obj})
+        self.invalidate()
 
     def raw(self, data):
         if "info" in data:
@@ -224,6 +585,10 @@ class SpecificationBuilder:
 
         if "paths" in data:
             self._paths.update(data["paths"])
+            for path in data["paths"]:
+                self._built_paths.pop(path, None)
+                self._versions.pop(path, None)
+                self._handlers.pop(path, None)
 
         if "components" in data:
             for location, component in data["components"].items():
@@ -239,20 +604,44 @@ class SpecificationBuilder:
         if "externalDocs" in data:
             self.external(**data["externalDocs"])
 
+        self.invalidate()
+
     def build(self) -> OpenAPI:
         info = self._build_info()
         paths = self._build_paths()
         tags = self._build_tags()
 
-        url_servers = getattr(self, "_urls", None)
-        servers = self._servers
-        if url_servers is not None:
-            for url_server in url_servers:
-                servers.append(Server(url=url_server))
+        servers = list(self._servers)
+        url_servers = list(self._urls)
+        _components = self._components
+
+        if self._base is not None:
+            paths = {**self._base._build_paths(), **paths}
+            servers = list(self._base._servers) + servers
+            url_servers = self._base._urls + [
+                url for url in url_servers if url not in self._base._urls
+            ]
+            _components = {
+                location: {
+                    **self._base._components.get(location, {}),
+                    **self._components.get(location, {}),
+                }
+                for location in {**self._base._components, **_components}
+            }
 
-        components = (
-            Components(**self._components) if self._components else None
-        )
+        for url_server in url_servers:
+            servers.append(Server(url=url_server))
+
+        if self._models is not None and self._models.schemas:
+            _components = {
+                **_components,
+                "schemas": {
+                    **self._models.schemas,
+                    **_components.get("schemas", {}),
+                },
+            }
+
+        components = Components(**_components) if _components else None
 
         return OpenAPI(
             info,
@@ -260,34 +649,109 @@ class SpecificationBuilder:
             tags=tags,
             servers=servers,
             components=components,
-            externalDocs=self._external,
+            externalDocs=self._get("_external"),
         )
 
     def _build_info(self) -> Info:
         kwargs = remove_nulls(
             {
-                "description": self._description,
-                "termsOfService": self._terms,
-                "license": self._license,
-                "contact": self._contact,
+                "description": self._get("_description"),
+                "termsOfService": self._get("_terms"),
+                "license": self._get("_license"),
+                "contact": self._get("_contact"),
             },
             deep=False,
         )
 
-        return Info(self._title, self._version, **kwargs)
+        return Info(self._get("_title"), self._get("_version"), **kwargs)
 
     def _build_tags(self):
-        return [self._tags[k] for k in self._tags]
+        return list(self._all_tags().values())
+
+    def _all_tags(self) -> Dict[str, Tag]:
+        if self._base is None:
+            return self._tags
+
+        # The tags of the base, with their descriptions, come first
+        tags = dict(self._base._all_tags())
+        for name, tag in self._tags.items():
+            tags.setdefault(name, tag)
+
+        return tags
 
     def _build_paths(self) -> Dict:
         paths = {}
 
         for path, operations in self._paths.items():
+            if path in self._built_paths and self._is_current(path):
+                paths[path] = self._built_paths[path]
+                continue
+
             paths[path] = PathItem(
                 **{
                     k: v if isinstance(v, dict) else v.build()
                     for k, v in operations.items()
                 }
             )
+            if self._models is not None:
+                paths[path] = self._models.extract(paths[path])
+
+            self._built_paths[path] = paths[path]
+            self._versions[path] = {
+                k: v._version
+                for k, v in operations.items()
+                if isinstance(v, OperationBuilder)
+            }
 
         return paths
+
+    def _is_current(self, path: str) -> bool:
+        versions = self._versions[path]
+        return all(
+            versions.get(k) == v._version
+            for k, v in self._paths[path].items()
+            if isinstance(v, OperationBuilder)
+        )
+
+
+class ModelComponents:
+    """
+    The schemas of the model classes used in a specification, each kept
+    once, by name, for `components/schemas`.
+    """
+
+    def __init__(self):
+        self.schemas: Dict[str, Schema] = {}
+        self._references: Dict[Object, Reference] = {}
+        self._names: Dict[str, str] = {}
+
+    def extract(self, value: Any) -> Any:
+        """
+        Replaces the model schemas in a built definition with references.
+        """
+        return extract_models(value, self.reference)
+
+    def reference(self, schema: Object) -> Reference:
+        if schema not in self._references:
+            name = self._name(schema._model)
+            self._references[schema] = Reference(
+                "#/components/schemas/{}".format(name)
+            )
+            # The reference is registered first, so that models which refer
+            # back to each other do not recurse
+            self.schemas[name] = extract_models(
+                schema, self.reference, inline=True
+            )
+
+        return self._references[schema]
+
+    def _name(self, qualified: str) -> str:
+        if qualified not in self._names:
+            name = qualified.rsplit(".", 1)[-1]
+            if name in self._names.values():
+                # Another model has the same name, so use the full one
+                name = re.sub(r"[^a-zA-Z0-9.\-_]", "_", qualified)
+
+            self._names[qualified] = name
+
+        return self._names[qualified]
@@ -0,0 +1,254 @@
+"""
+Caching of the responses of the operations declared with `openapi.cache`.
+
+The key of a response is made of its route and of the values of the
+documented parameters it varies on, parsed with the same compiled parsers as
+validation, so that `?page=01` and `?page=1`, or a parameter left to its
+default and the same value sent explicitly, share an entry, while query
+strings with parameters which are not documented do not fragment the cache.
+
+Since a cached response is sent to every client, responses setting cookies
+or marked `private` or `no-store` are not cached, and requests with
+credentials bypass the cache unless the responses vary on them.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from inspect import isawaitable
+from time import monotonic
+from typing import Any, Optional, Tuple
+from urllib.parse import urlencode
+
+from sanic.response import HTTPResponse
+
+from ..utils import app_state
+from .builders import OperationBuilder
+from .validation import (
+    ParameterParser,
+    _handler,
+    compile_validators,
+    require_routed_requests,
+)
+
+# What is kept of a response: its status, content type, headers and body
+Entry = Tuple[int, Optional[str], tuple, bytes]
+
+# Cache-Control directives of responses which must not be shared
+PRIVATE_DIRECTIVES = frozenset(("private", "no-store"))
+
+
+class CacheBackend(ABC):
+    """
+    Where cached responses are kept. Both methods can also be coroutines,
+    for backends like Redis or Memcached.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Entry]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, entry: Entry, ttl: float):
+        ...
+
+
+class LRUCache(CacheBackend):
+    """
+    An in-process cache, which keeps the responses used the most recently.
+
+    Arguments:
+        maxsize: How many responses to keep.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, Entry]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Entry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        expires, entry = item
+        if expires <= monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: Entry, ttl: float):
+        self._entries[key] = (monotonic() + ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class OperationCache:
+    """
+    The compiled parsers of the parameters which the responses of one
+    operation vary on.
+
+    Arguments:
+        operation: The operation, as documented by the decorators.
+    """
+
+    def __init__(self, operation: OperationBuilder):
+        self.version = operation._version
+        self.ttl, vary = operation.caching()
+        varies_on = {
+            (parameter.fields["in"], parameter.fields["name"])
+            for parameter in operation.documented_parameters()
+            if parameter.fields["name"] in vary
+        }
+
+        # Path parameters are taken as the router matched them, since it
+        # already validated them, and the path is part of every key anyway
+        self.parameters = ParameterParser(
+            operation,
+            [name for location, name in varies_on if location != "path"],
+        )
+
+        # The headers with credentials which responses do not vary on, so
+        # that requests sending them are not answered with the response of
+        # someone else
+        varies_on = {(location, name.lower()) for location, name in varies_on}
+        credentials = []
+        if ("header", "authorization") not in varies_on:
+            credentials.append("authorization")
+        if ("header", "cookie") not in varies_on and not any(
+            location == "cookie" for location, _ in varies_on
+        ):
+            credentials.append("cookie")
+        self.credentials = tuple(credentials)
+
+    @classmethod
+    def for_handler(
+        cls, operation: OperationBuilder, handler
+    ) -> Optional["OperationCache"]:
+        return cls(operation) if operation.caching() else None
+
+    def key(self, request) -> Optional[str]:
+        """
+        The key of the response to a request, made of its path parameters
+        and of the other parameters it varies on, or `None` when those are
+        not valid, so that it is not cached.
+        """
+        values, errors = self.parameters.parse(request)
+        if errors:
+            return None
+
+        values = {**request.match_info, **values}
+        return "{} {}?{}".format(
+            request.method,
+            request.route.name,
+            urlencode(sorted(values.items()), doseq=True),
+        )
+
+
+def get_backend(app) -> CacheBackend:
+    """
+    The backend keeping the cached responses of an app, which is set with
+    `API_CACHE_BACKEND`, or else kept in process.
+    """
+    return app_state(
+        app,
+        "cache_backend",
+        lambda: getattr(app.config, "API_CACHE_BACKEND", None)
+        or LRUCache(getattr(app.config, "API_CACHE_SIZE", 1024)),
+    )
+
+
+async def serve_cached(request):
+    """
+    Request middleware answering requests with their cached response.
+    """
+    if request.method != "GET":
+        return None
+
+    caches = app_state(request.app, "response_caches")
+    cache = caches.get((_handler(request), "GET")) if caches else None
+    if cache is None:
+        return None
+
+    headers = request.headers
+    if any(header in headers for header in cache.credentials):
+        return None
+
+    key = cache.key(request)
+    if key is None:
+        return None
+
+    entry = get_backend(request.app).get(key)
+    if isawaitable(entry):
+        entry = await entry
+
+    if entry is None:
+        # The response is cached once it is made
+        request.ctx._sanic_openapi_cache = (cache, key)
+        return None
+
+    status, content_type, headers, body = entry
+    return HTTPResponse(
+        body, status=status, headers=headers, content_type=content_type
+    )
+
+
+async def store_response(request, response):
+    """
+    Response middleware caching the responses of the requests which missed
+    the cache, when they are successful.
+    """
+    pending: Any = getattr(request.ctx, "_sanic_openapi_cache", None)
+    if pending is None:
+        return
+
+    request.ctx._sanic_openapi_cache = None
+    body = getattr(response, "body", None)
+    if response.status != 200 or body is None or _private(response):
+        return
+
+    cache, key = pending
+    entry = (
+        response.status,
+        response.content_type,
+        tuple(response.headers.items()),
+        body,
+    )
+    stored = get_backend(request.app).set(key, entry, cache.ttl)
+    if isawaitable(stored):
+        await stored
+
+
+def _private(response) -> bool:
+    # Whether a response is meant for its client only
+    if "set-cookie" in response.headers:
+        return True
+
+    directives = {
+        directive.split("=", 1)[0].strip().lower()
+        for directive in response.headers.get("cache-control", "").split(",")
+    }
+    return not PRIVATE_DIRECTIVES.isdisjoint(directives)
+
+
+def add_response_cache(blueprint):
+    """
+    Adds the listener which compiles the keys of the operations of an app
+    declared with `openapi.cache`, and has their responses cached.
+    """
+
+    @blueprint.listener("before_server_start")
+    def compile_response_caches(app, loop):
+        compile_validators(
+            app,
+            "response_caches",
+            OperationCache.for_handler,
+            blueprint.url_prefix,
+        )
+        if app_state(app, "response_caches"):
+            require_routed_requests("openapi.cache")
+            app.register_middleware(serve_cached, "request")
+            app.register_middleware(store_response, "response")
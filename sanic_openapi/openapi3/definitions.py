@@ -10,6 +10,8 @@ from .types import Definition, Schema
 
 
 class Reference(Schema):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(**{"$ref": value})
 
@@ -18,12 +20,16 @@ class Reference(Schema):
 
 
 class Contact(Definition):
+    __slots__ = ()
+
     name: str
     url: str
     email: str
 
 
 class License(Definition):
+    __slots__ = ()
+
     name: str
     url: str
 
@@ -32,6 +38,8 @@ class License(Definition):
 
 
 class Info(Definition):
+    __slots__ = ()
+
     title: str
     description: str
     termsOfService: str
@@ -44,6 +52,8 @@ class Info(Definition):
 
 
 class Example(Definition):
+    __slots__ = ()
+
     summary: str
     description: str
     value: Any
@@ -62,6 +72,8 @@ class Example(Definition):
 
 
 class MediaType(Definition):
+    __slots__ = ()
+
     schema: Schema
     example: Any
 
@@ -82,6 +94,8 @@ class MediaType(Definition):
 
 
 class Response(Definition):
+    __slots__ = ()
+
     content: Union[Any, Dict[str, Union[Any, MediaType]]]
     description: Optional[str]
     status: str
@@ -108,6 +122,8 @@ class Response(Definition):
 
 
 class RequestBody(Definition):
+    __slots__ = ()
+
     description: Optional[str]
     required: Optional[bool]
     content: Union[Any, Dict[str, Union[Any, MediaType]]]
@@ -138,6 +154,8 @@ class RequestBody(Definition):
 
 
 class ExternalDocumentation(Definition):
+    __slots__ = ()
+
     url: str
     description: str
 
@@ -150,6 +168,8 @@ class ExternalDocumentation(Definition):
 
 
 class Header(Definition):
+    __slots__ = ()
+
     name: str
     description: str
     externalDocs: ExternalDocumentation
@@ -163,6 +183,8 @@ class Header(Definition):
 
 
 class Parameter(Definition):
+    __slots__ = ()
+
     name: str
     schema: Union[Type, Schema]
     location: str
@@ -170,8 +192,12 @@ class Parameter(Definition):
     required: Optional[bool]
     deprecated: Optional[bool]
     allowEmptyValue: Optional[bool]
+    style: Optional[str]
+    explode: Optional[bool]
 
-    __nullable__ = None
+    # Arrays are exploded by default with the form style, so a false
+    # `explode` is kept; it is only there when it was given
+    __nullable__ = ["explode"]
 
     def __init__(
         self,
@@ -213,6 +239,8 @@ class Parameter(Definition):
 
 
 class Operation(Definition):
+    __slots__ = ()
+
     tags: List[str]
     summary: str
     description: str
@@ -227,6 +255,8 @@ class Operation(Definition):
 
 
 class PathItem(Definition):
+    __slots__ = ()
+
     summary: str
     description: str
     get: Operation
@@ -240,6 +270,8 @@ class PathItem(Definition):
 
 
 class SecurityScheme(Definition):
+    __slots__ = ()
+
     type: str
     description: str
     scheme: str
@@ -268,6 +300,8 @@ class SecurityScheme(Definition):
 
 
 class ServerVariable(Definition):
+    __slots__ = ()
+
     default: str
     description: str
     enum: List[str]
@@ -277,6 +311,8 @@ class ServerVariable(Definition):
 
 
 class Server(Definition):
+    __slots__ = ()
+
     url: str
     description: str
     variables: Dict[str, ServerVariable]
@@ -290,6 +326,8 @@ class Server(Definition):
 
 
 class Tag(Definition):
+    __slots__ = ()
+
     name: str
     description: str
     externalDocs: ExternalDocumentation
@@ -299,6 +337,8 @@ class Tag(Definition):
 
 
 class Components(Definition):
+    __slots__ = ()
+
     # This class is not being used in sanic-openapi right now, but the
     # definition is kept here to keep in close accordance with the openapi
     # spec, in case it is desired to be added later.
@@ -314,6 +354,8 @@ class Components(Definition):
 
 
 class OpenAPI(Definition):
+    __slots__ = ()
+
     openapi: str
     info: Info
     servers: List[Server]
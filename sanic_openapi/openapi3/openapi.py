@@ -7,6 +7,7 @@ from typing import Any, Dict, List, Optional, Sequence, Union
 
 from sanic.blueprints import Blueprint
 from sanic.exceptions import SanicException
+from sanic.response import HTTPResponse
 
 from sanic_openapi.openapi3.definitions import (
     ExternalDocumentation,
@@ -17,6 +18,8 @@ from sanic_openapi.openapi3.definitions import (
 )
 
 from . import operations
+from .serializers import Serializer
+from .types import UUID  # noqa
 from .types import Array  # noqa
 from .types import Binary  # noqa
 from .types import Boolean  # noqa
@@ -119,6 +122,89 @@ def response(status, content: Any = None, description: str = None, **kwargs):
     return inner
 
 
+def cache(ttl: float, vary: Optional[Sequence[str]] = None):
+    """
+    Caches the successful responses to GET requests for `ttl` seconds, with
+    a key made of the values of the documented parameters they vary on,
+    along with the path. Their values are normalized, so that `?page=01`
+    and `?page=1` share a response, and undocumented parameters are
+    ignored. The specification documents it as an `x-cache` extension.
+
+    Arguments:
+        ttl: How long a response is cached, in seconds.
+        vary: The parameters which responses depend on, all of those which
+              are documented by default.
+    """
+
+    def inner(func):
+        operations[func].cache(ttl, vary)
+        return func
+
+    return inner
+
+
+def fieldset(
+    status=200, fields: Optional[Sequence[str]] = None, name: str = "fields"
+):
+    """
+    Documents a query parameter selecting which fields of the objects of a
+    response are returned, as a comma separated list, and has `serialize`
+    only encode those when given the request.
+
+    Arguments:
+        status: The status of the response.
+        fields: The fields which can be selected, all of the properties of
+                the response schema by default.
+        name: The name of the parameter.
+    """
+
+    def inner(func):
+        operations[func].fieldset(status, fields, name)
+        return func
+
+    return inner
+
+
+def serialize(
+    handler, obj: Any, status: int = 200, request=None, **kwargs
+) -> HTTPResponse:
+    """
+    A JSON response with an object, encoded by the serializer compiled from
+    the schema of the response documented for a handler with the status.
+    The object is encoded as it is when there is no such schema. Given the
+    request, only the fields it selects are encoded, when the response has
+    a `fieldset`.
+
+        @app.get("/orders/<order_id:int>")
+        @openapi.response(200, {"application/json": Order})
+        async def get_order(request, order_id):
+            return openapi.serialize(get_order, await load(order_id))
+
+    Arguments:
+        handler: The documented handler, or method of a class based view.
+        obj: The object to encode.
+        status: The status of the response.
+        request: The request, to select fields with.
+        kwargs: Passed on to the response, such as `headers`.
+    """
+    operation = operations.get(getattr(handler, "__func__", handler))
+    if operation is None:
+        serializer = Serializer()
+    else:
+        selectable = request is not None and operation.fieldset_fields(status)
+        selected = request.args.getlist(selectable[0]) if selectable else None
+        serializer = operation.serializer(
+            status, ",".join(selected) if selected else None
+        )
+
+    return HTTPResponse(
+        serializer(obj),
+        status=status,
+        content_type="application/json",
+        **kwargs,
+    )
+
+
 def secured(*args, **kwargs):
     raise NotImplementedError(
         "SecuritySchemas are not yet implemented in sanic-openapi 0.6.3, "
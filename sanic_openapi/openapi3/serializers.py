@@ -0,0 +1,220 @@
+"""
+Encoding of response bodies with serializers compiled from the schema of
+their documented response.
+
+Rather than walking every attribute of a value reflectively, a serializer
+reads the fixed list of properties of the schema, and only converts the
+fields which need it: nested models, arrays of them, and dates, times and
+UUIDs when orjson, which encodes those itself, is not installed.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from ..encoding import json_dumps, orjson
+from .types import Array, Definition, Object
+
+Converter = Callable[[Any], Any]
+
+# Marks a field which the value does not have
+MISSING = object()
+
+JSON_MEDIA_TYPES = ("application/json", "*/*")
+
+
+def _isoformat(value):
+    if value is None or isinstance(value, str):
+        return value
+
+    return value.isoformat()
+
+
+def _string(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+# Conversions of the values of string formats which JSON encoders other
+# than orjson cannot encode
+FORMATS = {
+    "date": _isoformat,
+    "date-time": _isoformat,
+    "time": _isoformat,
+    "uuid": _string,
+}
+
+
+def compile_converter(
+    schema: Optional[Definition], formats: Optional[bool] = None
+) -> Optional[Converter]:
+    """
+    Compiles a schema into a function converting values into what JSON
+    encoders take, or `None` when values can be encoded as they are.
+
+    Arguments:
+        schema: The schema of the values.
+        formats: Whether to convert dates, times and UUIDs, which only
+                 orjson encodes itself. By default, when it is not
+                 installed.
+    """
+    if not isinstance(schema, Definition):
+        return None
+
+    if formats is None:
+        formats = orjson is None
+
+    fields = schema.fields
+    schema_type = fields.get("type")
+
+    if schema_type == "object" and fields.get("properties"):
+        return _object(fields["properties"], formats)
+
+    if schema_type == "array":
+        items = compile_converter(fields.get("items"), formats)
+        if items is None:
+            return None
+
+        def convert_array(value):
+            if value is None:
+                return None
+
+            return [items(item) for item in value]
+
+        return convert_array
+
+    if schema_type == "string" and formats:
+        return FORMATS.get(fields.get("format"))
+
+    return None
+
+
+def _object(properties: Dict[str, Definition], formats: bool) -> Converter:
+    # Fields are split into those which are copied as they are and those
+    # which are converted, so that the first only cost a lookup
+    converters = [
+        (name, compile_converter(schema, formats))
+        for name, schema in properties.items()
+    ]
+    plain = tuple(name for name, convert in converters if convert is None)
+    converted = tuple(
+        (name, convert) for name, convert in converters if convert is not None
+    )
+
+    def convert_object(value):
+        if value is None:
+            return None
+
+        if isinstance(value, dict):
+            result = {name: value[name] for name in plain if name in value}
+            for name, convert in converted:
+                if name in value:
+                    result[name] = convert(value[name])
+
+            return result
+
+        result = {}
+        for name in plain:
+            field = getattr(value, name, MISSING)
+            if field is not MISSING:
+                result[name] = field
+
+        for name, convert in converted:
+            field = getattr(value, name, MISSING)
+            if field is not MISSING:
+                result[name] = convert(field)
+
+        return result
+
+    return convert_object
+
+
+def response_schema(operation, status) -> Optional[Definition]:
+    """
+    The schema of the JSON content of the response to an operation with a
+    status, falling back on the default response.
+    """
+    responses = operation.responses
+    response = (
+        responses.get(status)
+        or responses.get(str(status))
+        or responses.get("default")
+    )
+    if response is None:
+        return None
+
+    content = response.fields.get("content") or {}
+    for media_type in (
+        *JSON_MEDIA_TYPES,
+        *(x for x in content if x.endswith("+json")),
+    ):
+        if media_type in content:
+            return content[media_type].fields.get("schema")
+
+    return None
+
+
+def response_properties(operation, status) -> Optional[Dict[str, Definition]]:
+    """
+    The properties of the objects in the JSON content of a response, which
+    is either an object or an array of them.
+    """
+    schema = response_schema(operation, status)
+    if isinstance(schema, Array):
+        schema = schema.fields.get("items")
+
+    if not isinstance(schema, Object):
+        return None
+
+    return schema.fields.get("properties") or None
+
+
+def _project(schema: Definition, fields: FrozenSet[str]) -> Definition:
+    # The schema with only some of the properties of its objects
+    if isinstance(schema, Array):
+        return Array(_project(schema.fields["items"], fields))
+
+    properties = schema.fields["properties"]
+    return Object({k: v for k, v in properties.items() if k in fields})
+
+
+class Serializer:
+    """
+    Encodes values into JSON, converted with the converter compiled from a
+    schema first.
+
+    Arguments:
+        schema: The schema of the values, if any is documented.
+    """
+
+    def __init__(self, schema: Optional[Definition] = None):
+        self.schema = schema
+        self.convert = compile_converter(schema)
+        # When orjson cannot encode a value, such as an integer too large for
+        # it, the encoder json_dumps falls back on needs dates, times and
+        # UUIDs converted as well
+        self.convert_all = (
+            compile_converter(schema, formats=True)
+            if orjson is not None
+            else self.convert
+        )
+        # The projections are compiled once for each set of fields, keeping
+        # those used the most recently
+        self.only = lru_cache(maxsize=128)(self._only)
+
+    def __call__(self, value: Any) -> bytes:
+        if orjson is not None:
+            converted = value if self.convert is None else self.convert(value)
+            try:
+                return orjson.dumps(converted, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass
+
+        if self.convert_all is not None:
+            value = self.convert_all(value)
+
+        return json_dumps(value)
+
+    def _only(self, fields: FrozenSet[str]) -> "Serializer":
+        """
+        The serializer of only some of the fields of the objects, which are
+        known to be properties of their schema.
+        """
+        return Serializer(_project(self.schema, fields))
@@ -1,27 +1,61 @@
 import json
 import typing as t
+import uuid
+from copy import copy
 from datetime import date, datetime, time
 from enum import Enum
-from inspect import isclass
-from typing import Any, Dict, List, Optional, Union, get_type_hints
+from inspect import isclass, isroutine
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+    get_type_hints,
+)
+from weakref import WeakKeyDictionary
+
+from ..encoding import iter_json_object, json_dumps, json_key
 
 
 class Definition:
-    __fields: dict
+    # Definitions are created in large numbers, so they are kept compact:
+    # no instance dict, and the fields as a flat tuple of keys and values
+    __slots__ = ("__fields",)
+
+    __fields: tuple
     __nullable__: Optional[List[str]] = []
+    __allowed__: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Only the names of the annotations matter, so they are read as they
+        # are rather than resolved with get_type_hints for every instance
+        cls.__allowed__ = frozenset(
+            name
+            for klass in cls.__mro__
+            for name in klass.__dict__.get("__annotations__", {})
+            if not name.startswith("_")
+        )
 
     def __init__(self, **kwargs):
-        self.__fields = self.guard(kwargs)
+        self.__fields = _freeze(self.guard(kwargs))
 
     @property
     def fields(self):
-        return self.__fields
+        fields = self.__fields
+        return dict(zip(fields[::2], fields[1::2]))
 
     def guard(self, fields):
+        allowed = self.__allowed__
         return {
             k: v
             for k, v in fields.items()
-            if k in _properties(self).keys() or k.startswith("x-")
+            if k in allowed or k.startswith("x-")
         }
 
     def serialize(self):
@@ -40,6 +74,42 @@ class Definition:
     def __str__(self):
         return json.dumps(self.serialize())
 
+    def to_json_bytes(self, models: Optional[Set[str]] = None) -> bytes:
+        """
+        The same document as `serialize`, but encoded into JSON directly,
+        walking the tree of definitions once without building the nested
+        serialized dicts. Definitions used in several places, like model
+        schemas, are only encoded once.
+
+        Arguments:
+            models: Where to add the qualified names of the model classes
+                    whose schema the document uses, inline or in its
+                    components, as they are encoded.
+        """
+        out = bytearray()
+        _write_json(self, out, {}, models)
+        return bytes(out)
+
+    def iter_json(self) -> Iterator[bytes]:
+        """
+        Yields the same JSON as `to_json_bytes` in fragments, one for each
+        field, and for fields holding a dict, like the paths of a
+        specification, one for each of its entries.
+        """
+        memo: Dict[int, bytes] = {}
+
+        def encode(value) -> bytes:
+            out = bytearray()
+            _write_json(value, out, memo)
+            return bytes(out)
+
+        return iter_json_object(_kept_fields(self), encode)
+
+    def _copy_with(self, fields):
+        clone = copy(self)
+        clone.__fields = _freeze(fields)
+        return clone
+
     def apply(self, func, operations, *args, **kwargs):
         op = operations[func]
         method_name = getattr(
@@ -47,11 +117,13 @@ class Definition:
         )
         method = getattr(op, method_name)
         if not args and not kwargs:
-            kwargs = self.__dict__
+            kwargs = self.fields
         method(*args, **kwargs)
 
 
 class Schema(Definition):
+    __slots__ = ()
+
     title: str
     description: str
     type: str
@@ -78,6 +150,8 @@ class Schema(Definition):
     def make(value, **kwargs):
         if isinstance(value, Schema):
             return value
+        if not kwargs and isinstance(value, type) and value in _primitives:
+            return _primitives[value]
         if value == bool:
             return Boolean(**kwargs)
         elif value == int:
@@ -96,6 +170,8 @@ class Schema(Definition):
             return Time(**kwargs)
         elif value == datetime:
             return DateTime(**kwargs)
+        elif value == uuid.UUID:
+            return UUID(**kwargs)
 
         _type = type(value)
 
@@ -117,6 +193,8 @@ class Schema(Definition):
             return Time(**kwargs)
         elif _type == datetime:
             return DateTime(**kwargs)
+        elif _type == uuid.UUID:
+            return UUID(**kwargs)
         elif _type == list:
             if len(value) == 0:
                 schema = Schema(nullable=True)
@@ -135,87 +213,141 @@ class Schema(Definition):
 
 
 class Boolean(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="boolean", **kwargs)
 
 
 class Integer(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="integer", format="int32", **kwargs)
 
 
 class Long(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="integer", format="int64", **kwargs)
 
 
 class Float(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="number", format="float", **kwargs)
 
 
 class Double(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="number", format="double", **kwargs)
 
 
 class String(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", **kwargs)
 
 
 class Byte(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="byte", **kwargs)
 
 
 class Binary(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="binary", **kwargs)
 
 
 class Date(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="date", **kwargs)
 
 
 class Time(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="time", **kwargs)
 
 
 class DateTime(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="date-time", **kwargs)
 
 
+class UUID(Schema):
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        super().__init__(type="string", format="uuid", **kwargs)
+
+
 class Password(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="password", **kwargs)
 
 
 class Email(Schema):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(type="string", format="email", **kwargs)
 
 
 class Object(Schema):
+    # Qualified name of the class this schema was made from, when it stands
+    # for every use of it, see extract_models
+    __slots__ = ("_model",)
+
     properties: Dict[str, Schema]
     maxProperties: int
     minProperties: int
 
     def __init__(self, properties: Dict[str, Schema] = None, **kwargs):
         super().__init__(type="object", properties=properties or {}, **kwargs)
+        self._model: Optional[str] = None
 
     @classmethod
     def make(cls, value: Any, **kwargs):
-        return cls(
-            {k: Schema.make(v) for k, v in _properties(value).items()},
-            **kwargs,
-        )
+        if cls is not Object or not isclass(value):
+            return cls(
+                {k: Schema.make(v) for k, v in _properties(value).items()},
+                **kwargs,
+            )
+
+        # Classes are only looked into once, however many times they are used
+        if value not in _models:
+            model = cls(
+                {k: Schema.make(v) for k, v in _properties(value).items()}
+            )
+            model._model = "{}.{}".format(value.__module__, value.__qualname__)
+            _models[value] = model
+
+        if not kwargs:
+            return _models[value]
+
+        return cls(_models[value].fields["properties"], **kwargs)
 
 
 class Array(Schema):
+    __slots__ = ()
+
     items: Any
     maxItems: int
     minItems: int
@@ -225,6 +357,122 @@ class Array(Schema):
         super().__init__(type="array", items=Schema.make(items), **kwargs)
 
 
+_models: "WeakKeyDictionary[type, Object]" = WeakKeyDictionary()
+
+
+def extract_models(
+    value: Any, reference: Callable[[Object], Any], inline: bool = False
+) -> Any:
+    """
+    Replaces the schemas made from model classes in a tree of definitions
+    with whatever `reference` returns for them. Parts of the tree which do
+    not contain any are shared rather than copied.
+
+    Arguments:
+        value: The definition, or list or dict of them, to look into.
+        reference: Called with each model schema which is found.
+        inline: Whether to keep the value itself, when it is a model
+                schema, only replacing the models it contains.
+    """
+    if isinstance(value, Object) and value._model is not None and not inline:
+        return reference(value)
+
+    if isinstance(value, Definition):
+        fields = value.fields
+        extracted = extract_models(fields, reference)
+        return value if extracted is fields else value._copy_with(extracted)
+
+    if isinstance(value, dict):
+        extracted = {k: extract_models(v, reference) for k, v in value.items()}
+        if all(extracted[k] is v for k, v in value.items()):
+            return value
+        return extracted
+
+    if isinstance(value, list):
+        extracted = [extract_models(v, reference) for v in value]
+        if all(x is y for x, y in zip(extracted, value)):
+            return value
+        return extracted
+
+    return value
+
+
+def _freeze(fields: Dict[str, Any]) -> tuple:
+    return tuple(x for item in fields.items() for x in item)
+
+
+def _kept_fields(definition: Definition):
+    # The fields which serialize keeps
+    nullable = definition.__nullable__
+    keep_all = isinstance(nullable, list) and not nullable
+    for k, v in definition.fields.items():
+        if keep_all or (nullable and k in nullable) or _is_truthy(v):
+            yield k, v
+
+
+def _is_truthy(value) -> bool:
+    # Whether the serialized value would be truthy
+    if isinstance(value, Definition):
+        return any(True for _ in _kept_fields(value))
+
+    if isinstance(value, type) and issubclass(value, Enum):
+        return bool(value.__members__)
+
+    return bool(value)
+
+
+def _write_json(
+    value,
+    out: bytearray,
+    memo: Dict[int, bytes],
+    models: Optional[Set[str]] = None,
+):
+    if isinstance(value, Schema):
+        # Schemas are the definitions which get shared, like those of models
+        # and primitives, so they are only encoded once
+        encoded = memo.get(id(value))
+        if encoded is None:
+            if models is not None and getattr(value, "_model", None):
+                models.add(value._model)
+
+            start = len(out)
+            _write_json_object(_kept_fields(value), out, memo, models)
+            memo[id(value)] = bytes(out[start:])
+        else:
+            out += encoded
+    elif isinstance(value, Definition):
+        _write_json_object(_kept_fields(value), out, memo, models)
+    elif isinstance(value, dict):
+        _write_json_object(value.items(), out, memo, models)
+    elif isinstance(value, (list, tuple)):
+        out += b"["
+        for i, item in enumerate(value):
+            if i:
+                out += b","
+            _write_json(item, out, memo, models)
+        out += b"]"
+    elif isinstance(value, type) and issubclass(value, Enum):
+        out += json_dumps([item.value for item in value.__members__.values()])
+    else:
+        out += json_dumps(value)
+
+
+def _write_json_object(
+    items,
+    out: bytearray,
+    memo: Dict[int, bytes],
+    models: Optional[Set[str]] = None,
+):
+    out += b"{"
+    for i, (k, v) in enumerate(items):
+        if i:
+            out += b","
+        out += json_key(k)
+        out += b":"
+        _write_json(v, out, memo, models)
+    out += b"}"
+
+
 def _serialize(value) -> Any:
     if isinstance(value, Definition):
         return value.serialize()
@@ -241,6 +489,9 @@ def _serialize(value) -> Any:
     return value
 
 
+_type_hints: "WeakKeyDictionary[type, Dict[str, Any]]" = WeakKeyDictionary()
+
+
 def _properties(value: object) -> Dict:
     try:
         fields = {x: v for x, v in value.__dict__.items()}
@@ -248,8 +499,40 @@ def _properties(value: object) -> Dict:
         fields = {}
 
     cls = value if isclass(value) else value.__class__
+    try:
+        hints = _type_hints[cls]
+    except KeyError:
+        hints = _type_hints[cls] = get_type_hints(cls)
+    except TypeError:
+        # Not every type can be weakly referenced
+        hints = get_type_hints(cls)
+
     return {
         k: v
-        for k, v in {**get_type_hints(cls), **fields}.items()
-        if not k.startswith("_")
+        for k, v in {**hints, **fields}.items()
+        if not k.startswith("_") and not _is_method(v)
     }
+
+
+def _is_method(value: Any) -> bool:
+    # Methods and properties of a model class are not fields of its values,
+    # unlike the classes and definitions its attributes may be set to
+    return isroutine(value) or isinstance(
+        value, (property, staticmethod, classmethod)
+    )
+
+
+# Schemas without any parameters are the same wherever they are used, and
+# since definitions cannot be changed, a single one of each is shared
+_primitives: Dict[type, Schema] = {
+    bool: Boolean(),
+    int: Integer(),
+    float: Float(),
+    str: String(),
+    bytes: Byte(),
+    bytearray: Binary(),
+    date: Date(),
+    time: Time(),
+    datetime: DateTime(),
+    uuid.UUID: UUID(),
+}
@@ -0,0 +1,982 @@
+"""
+Validation of requests, and samples of responses, against their documented
+operation, and parsing of the documented parameters into typed arguments of
+the handlers.
+
+The parameters and request body of each operation are compiled once, into
+closures which only do the checks that their schema asks for, so that
+validating a request does not interpret the schema again. Validators return
+`None` when the value is valid, or else a list of `(path, message)` errors,
+the path being the keys leading to the invalid value; nothing is allocated
+unless a value is invalid.
+"""
+import re
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time
+from inspect import Parameter, signature
+from json import loads
+from random import random
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+from sanic.exceptions import InvalidUsage, SanicException
+from sanic.log import logger
+from sanic.request import Request
+from sanic.response import json
+
+from ..utils import app_state, get_all_routes
+from . import operations
+from .builders import OperationBuilder
+
+Errors = List[Tuple[tuple, str]]
+Validator = Callable[[Any], Optional[Errors]]
+
+# Marks a parameter which was not sent, and has no default
+MISSING = object()
+
+# Whether requests know their route, which is how the operation of a request
+# is found, since sanic 21.3
+ROUTED_REQUESTS = hasattr(Request, "route")
+
+TYPES = {
+    "integer": (
+        lambda value: isinstance(value, int) and not isinstance(value, bool),
+        "must be an integer",
+    ),
+    "number": (
+        lambda value: isinstance(value, (int, float))
+        and not isinstance(value, bool),
+        "must be a number",
+    ),
+    "string": (lambda value: isinstance(value, str), "must be a string"),
+    "boolean": (lambda value: isinstance(value, bool), "must be a boolean"),
+    "array": (lambda value: isinstance(value, list), "must be an array"),
+    "object": (lambda value: isinstance(value, dict), "must be an object"),
+}
+
+
+def _parse_datetime(value: str):
+    # fromisoformat only takes a "Z" suffix from Python 3.11
+    return datetime.fromisoformat(
+        value[:-1] + "+00:00" if value.endswith("Z") else value
+    )
+
+
+FORMATS = {
+    "date": date.fromisoformat,
+    "date-time": _parse_datetime,
+    "time": time.fromisoformat,
+    "uuid": uuid.UUID,
+}
+
+
+def _valid(value) -> None:
+    return None
+
+
+def _all(checks: List[Validator]) -> Validator:
+    if not checks:
+        return _valid
+
+    if len(checks) == 1:
+        return checks[0]
+
+    checks = tuple(checks)
+
+    def validate(value):
+        for check in checks:
+            errors = check(value)
+            if errors:
+                return errors
+
+        return None
+
+    return validate
+
+
+def _check(test: Callable[[Any], bool], message: str) -> Validator:
+    errors = [((), message)]
+
+    def validate(value):
+        return None if test(value) else errors
+
+    return validate
+
+
+def compile_schema(
+    schema: Dict[str, Any], check_type: bool = True
+) -> Validator:
+    """
+    Compiles a serialized schema, as found in the specification, into a
+    validator.
+
+    Arguments:
+        schema: The serialized schema.
+        check_type: Whether to check the type of the value, which can be
+                    left out when it is known already.
+    """
+    if not isinstance(schema, dict) or "$ref" in schema:
+        # References are resolved when the specification is built, so what
+        # they stand for is not known here
+        return _valid
+
+    checks: List[Validator] = []
+
+    schema_type = schema.get("type")
+    if check_type and schema_type in TYPES:
+        test, message = TYPES[schema_type]
+        checks.append(_check(test, message))
+
+    if "enum" in schema:
+        enum = list(schema["enum"])
+        checks.append(
+            _check(
+                lambda value: value in enum,
+                "must be one of {}".format(", ".join(map(str, enum))),
+            )
+        )
+
+    if schema_type in ("integer", "number"):
+        checks.extend(_number_checks(schema))
+    elif schema_type == "string":
+        checks.extend(_string_checks(schema))
+    elif schema_type == "array":
+        checks.extend(_array_checks(schema))
+    elif schema_type == "object":
+        checks.extend(_object_checks(schema))
+
+    for key, combine in (
+        ("allOf", _all_of),
+        ("anyOf", _any_of),
+        ("oneOf", _one_of),
+    ):
+        if schema.get(key):
+            checks.append(combine([compile_schema(x) for x in schema[key]]))
+
+    validate = _all(checks)
+    if not schema.get("nullable") or validate is _valid:
+        return validate
+
+    def nullable(value):
+        return None if value is None else validate(value)
+
+    return nullable
+
+
+def _number_checks(schema) -> List[Validator]:
+    checks = []
+
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        if schema.get("exclusiveMinimum"):
+            checks.append(
+                _check(
+                    lambda value: value > minimum,
+                    "must be greater than {}".format(minimum),
+                )
+            )
+        else:
+            checks.append(
+                _check(
+                    lambda value: value >= minimum,
+                    "must be at least {}".format(minimum),
+                )
+            )
+
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+        if schema.get("exclusiveMaximum"):
+            checks.append(
+                _check(
+                    lambda value: value < maximum,
+                    "must be less than {}".format(maximum),
+                )
+            )
+        else:
+            checks.append(
+                _check(
+                    lambda value: value <= maximum,
+                    "must be at most {}".format(maximum),
+                )
+            )
+
+    if schema.get("multipleOf"):
+        multiple = schema["multipleOf"]
+        checks.append(
+            _check(
+                lambda value: value % multiple == 0,
+                "must be a multiple of {}".format(multiple),
+            )
+        )
+
+    return checks
+
+
+def _string_checks(schema) -> List[Validator]:
+    checks = []
+
+    if "minLength" in schema:
+        length = schema["minLength"]
+        checks.append(
+            _check(
+                lambda value: len(value) >= length,
+                "must be at least {} characters long".format(length),
+            )
+        )
+
+    if "maxLength" in schema:
+        length = schema["maxLength"]
+        checks.append(
+            _check(
+                lambda value: len(value) <= length,
+                "must be at most {} characters long".format(length),
+            )
+        )
+
+    if "pattern" in schema:
+        search = re.compile(schema["pattern"]).search
+        checks.append(
+            _check(
+                lambda value: search(value) is not None,
+                "must match {}".format(schema["pattern"]),
+            )
+        )
+
+    if schema.get("format") in FORMATS:
+        parse = FORMATS[schema["format"]]
+        errors = [((), "must be a valid {}".format(schema["format"]))]
+
+        def validate_format(value):
+            try:
+                parse(value)
+            except ValueError:
+                return errors
+
+            return None
+
+        checks.append(validate_format)
+
+    return checks
+
+
+def _array_checks(schema) -> List[Validator]:
+    checks = []
+
+    if "minItems" in schema:
+        count = schema["minItems"]
+        checks.append(
+            _check(
+                lambda value: len(value) >= count,
+                "must have at least {} items".format(count),
+            )
+        )
+
+    if "maxItems" in schema:
+        count = schema["maxItems"]
+        checks.append(
+            _check(
+                lambda value: len(value) <= count,
+                "must have at most {} items".format(count),
+            )
+        )
+
+    if schema.get("uniqueItems"):
+        checks.append(
+            _check(
+                lambda value: len({repr(x) for x in value}) == len(value),
+                "must not have duplicate items",
+            )
+        )
+
+    items = compile_schema(schema.get("items"))
+    if items is not _valid:
+
+        def validate_items(value):
+            errors = None
+            for i, item in enumerate(value):
+                found = items(item)
+                if found:
+                    errors = errors or []
+                    errors.extend(((i, *path), msg) for path, msg in found)
+
+            return errors
+
+        checks.append(validate_items)
+
+    return checks
+
+
+def _object_checks(schema) -> List[Validator]:
+    properties = schema.get("properties") or {}
+    required = schema.get("required")
+    required = list(required) if isinstance(required, list) else []
+    # Properties can also be marked as required on their own schema
+    required += [
+        name
+        for name, prop in properties.items()
+        if isinstance(prop, dict) and prop.get("required") is True
+    ]
+
+    compiled = tuple(
+        (name, validate)
+        for name, validate in (
+            (name, compile_schema(prop)) for name, prop in properties.items()
+        )
+        if validate is not _valid
+    )
+    required = tuple(dict.fromkeys(required))
+
+    if not compiled and not required:
+        return []
+
+    def validate_object(value):
+        errors = None
+        for name in required:
+            if name not in value:
+                errors = errors or []
+                errors.append(((name,), "is required"))
+
+        for name, validate in compiled:
+            if name in value:
+                found = validate(value[name])
+                if found:
+                    errors = errors or []
+                    errors.extend(((name, *path), msg) for path, msg in found)
+
+        return errors
+
+    return [validate_object]
+
+
+def _all_of(validators: List[Validator]) -> Validator:
+    return _all(validators)
+
+
+def _any_of(validators: List[Validator]) -> Validator:
+    errors = [((), "must match at least one of the schemas")]
+
+    def validate(value):
+        for validator in validators:
+            if not validator(value):
+                return None
+
+        return errors
+
+    return validate
+
+
+def _one_of(validators: List[Validator]) -> Validator:
+    errors = [((), "must match exactly one of the schemas")]
+
+    def validate(value):
+        matches = sum(1 for validator in validators if not validator(value))
+        return None if matches == 1 else errors
+
+    return validate
+
+
+def _boolean(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in ("true", "1"):
+        return True
+    if lowered in ("false", "0"):
+        return False
+
+    raise ValueError(value)
+
+
+CONVERSIONS = {"integer": int, "number": float, "boolean": _boolean}
+
+# Separators of the values of array parameters which are not exploded
+DELIMITERS = {"form": ",", "spaceDelimited": " ", "pipeDelimited": "|"}
+
+Parser = Callable[[Optional[list]], Tuple[Any, Optional[Errors]]]
+
+
+def compile_parameter(parameter: Dict[str, Any]) -> Parser:
+    """
+    Compiles a serialized parameter into a parser, which takes the values
+    sent for it, as strings (or as typed and validated by the router, for
+    path parameters), and returns its typed value along with its errors. The
+    value is the default of its schema when it was not sent, or `MISSING`
+    when there is none.
+    """
+    schema = parameter.get("schema") or {}
+    if parameter.get("required"):
+        not_sent = (MISSING, [((), "is required")])
+    else:
+        not_sent = (schema.get("default", MISSING), None)
+
+    if schema.get("type") == "array":
+        return _compile_array(parameter, schema, not_sent)
+
+    # Strings which were converted, or which are meant to be strings, are
+    # known to be of the right type, so only the rest of the schema is
+    # checked for them
+    convert = CONVERSIONS.get(schema.get("type"))
+    check = compile_schema(schema)
+    check_sent = (
+        compile_schema(schema, check_type=False)
+        if convert is not None or schema.get("type") == "string"
+        else check
+    )
+    is_type, message = TYPES.get(schema.get("type"), (None, ""))
+    invalid = [((), message)]
+
+    def parse(values):
+        if not values:
+            return not_sent
+
+        value = values[-1]
+        if value.__class__ is not str:
+            # Typed by the router, which already validated it, so it is only
+            # checked against a schema of the same type, rather than against
+            # the string a UUID or a date is written as in the path
+            if is_type is None or is_type(value):
+                return value, check(value)
+
+            return value, None
+
+        if convert is not None:
+            try:
+                value = convert(value)
+            except ValueError:
+                return value, invalid
+
+        return value, check_sent(value)
+
+    return parse
+
+
+def _compile_array(
+    parameter: Dict[str, Any], schema: Dict[str, Any], not_sent: tuple
+) -> Parser:
+    # The values of arrays are always strings, so items are converted
+    # without checking their type first
+    items = schema.get("items") or {}
+    convert = CONVERSIONS.get(items.get("type"))
+    message = TYPES.get(items.get("type"), (None, ""))[1]
+    check = compile_schema(
+        {k: v for k, v in schema.items() if k != "items"}, check_type=False
+    )
+    check_items = compile_schema(items, check_type=convert is None)
+
+    style = parameter.get("style", "form")
+    delimiter = (
+        None
+        if parameter.get("explode", style == "form")
+        else DELIMITERS.get(style, ",")
+    )
+
+    def parse(values):
+        if not values:
+            return not_sent
+
+        if delimiter is not None:
+            values = (
+                values[0].split(delimiter)
+                if len(values) == 1
+                else [
+                    part for value in values for part in value.split(delimiter)
+                ]
+            )
+
+        if convert is None:
+            value = list(values)
+        else:
+            try:
+                value = list(map(convert, values))
+            except ValueError:
+                return values, _conversion_errors(convert, values, message)
+
+        errors = check(value)
+        if check_items is _valid:
+            return value, errors
+
+        for i, item in enumerate(value):
+            found = check_items(item)
+            if found:
+                errors = errors or []
+                errors.extend(((i, *path), msg) for path, msg in found)
+
+        return value, errors
+
+    return parse
+
+
+def _conversion_errors(convert, values: list, message: str) -> Errors:
+    errors = []
+    for i, value in enumerate(values):
+        try:
+            convert(value)
+        except ValueError:
+            errors.append(((i,), message))
+
+    return errors
+
+
+def _path(*keys) -> str:
+    return ".".join(str(key) for key in keys)
+
+
+def _one(values, name):
+    # For the locations which only hold one value for each name
+    return [values[name]] if name in values else None
+
+
+# Where the values of each location of parameters are found in a request,
+# and how to get those of one parameter from there
+SOURCES = {
+    "query": (lambda request: request.args, dict.get),
+    "header": (
+        lambda request: request.headers,
+        lambda headers, name: headers.getall(name, None),
+    ),
+    "cookie": (lambda request: request.cookies, _one),
+    "path": (lambda request: request.match_info, _one),
+}
+
+JSON_MEDIA_TYPES = ("application/json", "*/*")
+
+
+def _is_json(media_type: str) -> bool:
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+def compile_content(
+    content: Dict[str, Any], unknown: str = "is not documented"
+) -> Callable[[str, Callable[[], Any]], Optional[Errors]]:
+    """
+    Compiles the content of a request body or a response into a validator,
+    which takes the content type of a body along with a function loading
+    it. JSON bodies are checked against the schema of their media type,
+    others only against the media types which are documented.
+    """
+    schemas = {
+        media_type: compile_schema((media or {}).get("schema"))
+        for media_type, media in content.items()
+        if media_type in JSON_MEDIA_TYPES or _is_json(media_type)
+    }
+    accepts_any = not content or "*/*" in content
+
+    def validate_content(content_type, load):
+        media_type = (content_type or "").split(";")[0].strip().lower()
+        validate = schemas.get(media_type)
+        if validate is None and _is_json(media_type):
+            validate = schemas.get("*/*")
+
+        if validate is None:
+            if accepts_any or media_type in content:
+                return None
+
+            return [((), "content type {} {}".format(media_type, unknown))]
+
+        try:
+            value = load()
+        except (InvalidUsage, ValueError):
+            return [((), "is not valid JSON")]
+
+        return validate(value)
+
+    return validate_content
+
+
+class ParameterParser:
+    """
+    The compiled parsers of the parameters of one operation.
+
+    Arguments:
+        operation: The operation, as documented by the decorators.
+        names: When given, only the parameters with one of these names are
+               parsed.
+    """
+
+    def __init__(
+        self,
+        operation: OperationBuilder,
+        names: Optional[Collection[str]] = None,
+    ):
+        self.version = operation._version
+
+        parameters = defaultdict(list)
+        for parameter in operation.documented_parameters():
+            parameter = parameter.serialize()
+            if parameter.get("in") in SOURCES and (
+                names is None or parameter["name"] in names
+            ):
+                parameters[parameter["in"]].append(
+                    (parameter["name"], compile_parameter(parameter))
+                )
+
+        # Grouped by location, so that each location is only looked up once
+        # in a request
+        self.locations = tuple(
+            (*SOURCES[location], location, tuple(parsers))
+            for location, parsers in parameters.items()
+        )
+
+    @classmethod
+    def for_handler(cls, operation: OperationBuilder, handler):
+        """
+        The parser of the parameters which a handler takes as keyword
+        arguments.
+        """
+        return cls(operation, _arguments(handler))
+
+    def parse(self, request) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        """
+        The typed values of the parameters of a request, by name, along
+        with their errors. Parameters which were not sent, and have no
+        default, are left out.
+        """
+        values = {}
+        errors = []
+
+        for source, get, location, parsers in self.locations:
+            sent = source(request)
+            for name, parse in parsers:
+                value, found = parse(get(sent, name))
+                if found:
+                    errors.extend(
+                        {
+                            "in": location,
+                            "path": _path(name, *path),
+                            "message": message,
+                        }
+                        for path, message in found
+                    )
+                elif value is not MISSING:
+                    values[name] = value
+
+        return values, errors
+
+
+class RequestValidator:
+    """
+    The compiled checks of the parameters and request body of one
+    operation.
+
+    Arguments:
+        operation: The operation, as documented by the decorators.
+    """
+
+    def __init__(self, operation: OperationBuilder):
+        self.version = operation._version
+        self.parameters = ParameterParser(operation)
+
+        body = getattr(operation, "requestBody", None)
+        body = body.serialize() if body else None
+        self.body = (
+            compile_content(body.get("content") or {}, "is not accepted")
+            if body
+            else None
+        )
+        self.body_required = bool(body and body.get("required"))
+
+    def validate(self, request) -> List[Dict[str, str]]:
+        """
+        The errors of a request, each with where it is (`in`), the path to
+        the invalid value, and a message.
+        """
+        _, errors = self.parameters.parse(request)
+        if self.body is None:
+            return errors
+
+        if not request.body:
+            found = [((), "is required")] if self.body_required else None
+        else:
+            found = self.body(request.content_type, lambda: request.json)
+
+        if found:
+            errors.extend(
+                {"in": "body", "path": _path(*path), "message": message}
+                for path, message in found
+            )
+
+        return errors
+
+
+class ResponseValidator:
+    """
+    The compiled schemas of the documented responses of one operation, by
+    status.
+
+    Arguments:
+        operation: The operation, as documented by the decorators.
+    """
+
+    def __init__(self, operation: OperationBuilder):
+        self.version = operation._version
+        self.responses = {
+            str(status): compile_content(
+                response.serialize().get("content") or {}
+            )
+            for status, response in operation.responses.items()
+        }
+
+    def validate(
+        self, status: int, content_type: str, body: bytes
+    ) -> List[Dict[str, str]]:
+        """
+        The errors of a response, each with the path to the invalid value,
+        and a message.
+        """
+        if not self.responses:
+            return []
+
+        status = str(status)
+        validate = (
+            self.responses.get(status)
+            or self.responses.get(status[0] + "XX")
+            or self.responses.get("default")
+        )
+        if validate is None:
+            return [
+                {
+                    "path": "",
+                    "message": "status {} is not documented".format(status),
+                }
+            ]
+
+        found = validate(content_type, lambda: loads(body))
+        if not found:
+            return []
+
+        return [
+            {"path": _path(*path), "message": message}
+            for path, message in found
+        ]
+
+
+def _handler(request):
+    # The function documented for the route of a request, looking into
+    # class based views
+    route = getattr(request, "route", None)
+    if route is None:
+        return None
+
+    handler = route.handler
+    if hasattr(handler, "view_class"):
+        handler = getattr(handler.view_class, request.method.lower(), None)
+
+    return handler
+
+
+def _arguments(handler) -> Optional[Collection[str]]:
+    # The names of the keyword arguments of a handler, or None when it takes
+    # any of them
+    try:
+        parameters = signature(handler).parameters.values()
+    except (TypeError, ValueError):
+        return ()
+
+    if any(
+        parameter.kind is Parameter.VAR_KEYWORD for parameter in parameters
+    ):
+        return None
+
+    return frozenset(
+        parameter.name
+        for parameter in parameters
+        if parameter.kind
+        in (Parameter.POSITIONAL_OR_KEYWORD, Parameter.KEYWORD_ONLY)
+    )
+
+
+def compile_validators(
+    app, name: str, factory: Callable, skip_prefix: str = "/swagger"
+):
+    """
+    Compiles a validator for each documented operation of an app, keeping
+    those of the operations which did not change since the last time. The
+    factory is given the operation along with its handler, and returns
+    `None` for operations which need no validator.
+
+    The parameters of the path of each route are documented first, as when
+    the specification is built, which may not have happened yet.
+    """
+    validators = app_state(app, name, dict)
+
+    for _, _, parameters, method_handlers in get_all_routes(app, skip_prefix):
+        for method, handler in method_handlers:
+            if hasattr(handler, "view_class"):
+                handler = getattr(handler.view_class, method.lower(), None)
+
+            operation = operations.get(handler)
+            if operation is None or operation._exclude:
+                continue
+
+            operation.path_parameters(parameters)
+            key = (handler, method)
+            validator = validators.get(key)
+            if validator is None or validator.version != operation._version:
+                validator = factory(operation, handler)
+                if validator is None:
+                    validators.pop(key, None)
+                else:
+                    validators[key] = validator
+
+
+def validate_request(request):
+    """
+    Request middleware answering requests which do not match their
+    documented operation with a 400 Bad Request, listing the errors.
+    """
+    validators = app_state(request.app, "request_validators")
+    if not validators:
+        return None
+
+    validator = validators.get((_handler(request), request.method))
+    if validator is None:
+        return None
+
+    errors = validator.validate(request)
+    if errors:
+        return _bad_request(errors)
+
+    return None
+
+
+def inject_parameters(request):
+    """
+    Request middleware passing the typed values of the documented
+    parameters to the handler, as keyword arguments, along with those of
+    the path.
+    """
+    parsers = app_state(request.app, "parameter_parsers")
+    if not parsers:
+        return None
+
+    parser = parsers.get((_handler(request), request.method))
+    if parser is None:
+        return None
+
+    values, errors = parser.parse(request)
+    if errors:
+        return _bad_request(errors)
+
+    # Sanic calls the handler with the match info as keyword arguments
+    request.match_info.update(values)
+    return None
+
+
+def _bad_request(errors: List[Dict[str, str]]):
+    return json(
+        {
+            "description": "Bad Request",
+            "status": 400,
+            "message": "The request does not match its documentation",
+            "errors": errors,
+        },
+        status=400,
+    )
+
+
+def log_response_mismatch(request, status: int, errors: List[Dict[str, str]]):
+    logger.warning(
+        "Response %s to %s %s does not match its documentation: %s",
+        status,
+        request.method,
+        request.path,
+        "; ".join(
+            "{} {}".format(error["path"] or "body", error["message"])
+            for error in errors
+        ),
+    )
+
+
+async def _check_response(request, validator, status, content_type, body):
+    errors = validator.validate(status, content_type, body)
+    if errors:
+        report = (
+            getattr(request.app.config, "API_VALIDATE_RESPONSES_REPORT", None)
+            or log_response_mismatch
+        )
+        report(request, status, errors)
+
+
+def sample_response(request, response):
+    """
+    Response middleware checking a sample of the responses against their
+    documentation, in a task of their own so that the response is not held
+    back.
+    """
+    rate = getattr(request.app.config, "API_VALIDATE_RESPONSES", 0)
+    if not rate or random() >= rate:
+        return
+
+    validators = app_state(request.app, "response_validators")
+    validator = (
+        validators.get((_handler(request), request.method))
+        if validators
+        else None
+    )
+    # Streamed responses have no body to check
+    body = getattr(response, "body", None)
+    if validator is None or body is None:
+        return
+
+    request.app.add_task(
+        _check_response(
+            request, validator, response.status, response.content_type, body
+        )
+    )
+
+
+def require_routed_requests(option: str):
+    """
+    Raises when requests do not know their route, so that an option which
+    needs their operation is not silently ignored.
+
+    Raises:
+        SanicException: Before sanic 21.3.
+    """
+    if not ROUTED_REQUESTS:
+        raise SanicException("{} requires sanic 21.3 or later".format(option))
+
+
+def add_validation(blueprint):
+    """
+    Adds the listener which compiles the validators of an app, for requests
+    when `API_VALIDATE_REQUESTS` is enabled, for a sample of responses when
+    `API_VALIDATE_RESPONSES` is set to the fraction to check, and the
+    parsers of the parameters passed to handlers when
+    `API_INJECT_PARAMETERS` is enabled.
+    """
+
+    @blueprint.listener("before_server_start")
+    def compile_app_validators(app, loop):
+        for option in (
+            "API_VALIDATE_REQUESTS",
+            "API_INJECT_PARAMETERS",
+            "API_VALIDATE_RESPONSES",
+        ):
+            if getattr(app.config, option, False):
+                require_routed_requests(option)
+
+        if getattr(app.config, "API_VALIDATE_REQUESTS", False):
+            compile_validators(
+                app,
+                "request_validators",
+                lambda operation, _: RequestValidator(operation),
+                blueprint.url_prefix,
+            )
+            app.register_middleware(validate_request, "request")
+
+        if getattr(app.config, "API_INJECT_PARAMETERS", False):
+            compile_validators(
+                app,
+                "parameter_parsers",
+                ParameterParser.for_handler,
+                blueprint.url_prefix,
+            )
+            app.register_middleware(inject_parameters, "request")
+
+        if getattr(app.config, "API_VALIDATE_RESPONSES", 0):
+            compile_validators(
+                app,
+                "response_validators",
+                lambda operation, _: ResponseValidator(operation),
+                blueprint.url_prefix,
+            )
+            app.register_middleware(sample_response, "response")
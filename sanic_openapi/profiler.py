@@ -0,0 +1,131 @@
+"""
+Timings of the phases of building a specification, to find out where the
+time goes on startup, and to track regressions.
+
+    from sanic_openapi.profiler import get_profile
+
+    profile = get_profile(app)
+    print(profile.as_dict())
+
+With `API_SPEC_STATS` enabled, the same is served at `/swagger/_stats`.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, Optional
+
+from sanic.exceptions import NotFound
+from sanic.response import json
+
+from .utils import app_state
+
+PHASES = (
+    "blueprint_tags",
+    "routes",
+    "autodoc",
+    "schemas",
+    "build",
+    "serialization",
+)
+
+
+class BuildProfile:
+    """
+    The time spent in each phase of a build, in seconds, along with counts
+    of what was built.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def reset(self):
+        self.timings.clear()
+        self.counts.clear()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += perf_counter() - start
+
+    def timed(self, name: str, func):
+        """
+        Wraps a function, so that the time spent in it counts for a phase.
+        """
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.timings[name] += perf_counter() - start
+
+        return wrapper
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Iterates, counting the time spent producing each item for a phase,
+        but not the time spent by the caller on it.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.timings[name] += perf_counter() - start
+
+            yield item
+
+    def count(self, name: str, value: int = 1):
+        self.counts[name] += value
+
+    def as_dict(self) -> Dict[str, Dict]:
+        return {
+            "timings": {
+                name: round(self.timings.get(name, 0.0) * 1000, 3)
+                for name in PHASES
+            },
+            "counts": dict(self.counts),
+        }
+
+
+def start_profile(app) -> BuildProfile:
+    profile = app_state(app, "profile", BuildProfile)
+    profile.reset()
+    return profile
+
+
+def get_profile(app) -> Optional[BuildProfile]:
+    """
+    The profile of the last build of the specification of an app, or `None`
+    when it was not built by this process.
+    """
+    return app_state(app, "profile")
+
+
+def add_stats_route(blueprint):
+    """
+    Adds the route serving the profile of the last build to a blueprint,
+    which is only found when `API_SPEC_STATS` is enabled.
+    """
+
+    @blueprint.route("/_stats")
+    def stats(request):
+        profile = get_profile(request.app)
+        if (
+            not getattr(request.app.config, "API_SPEC_STATS", False)
+            or profile is None
+        ):
+            raise NotFound("Requested URL {} not found".format(request.path))
+
+        return json(
+            profile.as_dict(), headers={"Cache-Control": "no-cache"}
+        )
@@ -0,0 +1,194 @@
+"""
+Partial specifications, each holding the operations of a single tag, for
+APIs too large for Swagger UI to load at once.
+
+The slices are cut from the serialized specification, so they work the same
+way for OpenAPI 2 and 3: a slice keeps the operations tagged with its tag,
+and the definitions or components they reference, transitively.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from .encoding import EncodedDocument, json_dumps, load_spec_file
+
+OPERATION_KEYS = (
+    "get",
+    "put",
+    "post",
+    "delete",
+    "options",
+    "head",
+    "patch",
+    "trace",
+)
+
+# Top level sections which only hold definitions to be referenced; security
+# schemes are referenced by name rather than with $ref, so are kept whole
+REFERENCED = ("definitions", "parameters", "responses", "components")
+SECURITY = {"components": "securitySchemes"}
+
+
+def spec_tags(document: Dict[str, Any]) -> List[str]:
+    """
+    The tags which are used by at least one operation, in the order of the
+    `tags` section and then of the paths.
+    """
+    used: Dict[str, None] = {}
+    for item in (document.get("paths") or {}).values():
+        for key in OPERATION_KEYS:
+            for tag in (item.get(key) or {}).get("tags") or ():
+                used[tag] = None
+
+    declared = [
+        item["name"]
+        for item in document.get("tags") or ()
+        if item["name"] in used
+    ]
+    return declared + [tag for tag in used if tag not in declared]
+
+
+def tag_slice(document: Dict[str, Any], tag: str) -> Optional[Dict[str, Any]]:
+    """
+    Cuts the part of a serialized specification documenting one tag.
+
+    Returns:
+        A specification of its own, or `None` when no operation has the tag.
+    """
+    paths = {}
+    for path, item in (document.get("paths") or {}).items():
+        operations = {
+            key: item[key]
+            for key in OPERATION_KEYS
+            if tag in ((item.get(key) or {}).get("tags") or ())
+        }
+        if operations:
+            paths[path] = {
+                **{k: v for k, v in item.items() if k not in OPERATION_KEYS},
+                **operations,
+            }
+
+    if not paths:
+        return None
+
+    sliced = {
+        key: value
+        for key, value in document.items()
+        if key not in ("paths", "tags", *REFERENCED)
+    }
+    sliced["tags"] = [
+        item for item in document.get("tags") or () if item["name"] == tag
+    ] or [{"name": tag}]
+    sliced["paths"] = paths
+
+    for section, kept in SECURITY.items():
+        if kept in (document.get(section) or {}):
+            sliced[section] = {kept: document[section][kept]}
+
+    _add_references(document, sliced, paths)
+
+    return sliced
+
+
+def _add_references(document, sliced, value):
+    # Copies every definition which is referenced from the value, directly or
+    # through other definitions, from the document into the slice
+    pending = [value]
+    seen = set()
+
+    while pending:
+        value = pending.pop()
+        if isinstance(value, list):
+            pending.extend(value)
+            continue
+
+        if not isinstance(value, dict):
+            continue
+
+        pending.extend(value.values())
+
+        ref = value.get("$ref")
+        if not isinstance(ref, str) or ref in seen:
+            continue
+
+        seen.add(ref)
+        keys = [
+            key.replace("~1", "/").replace("~0", "~")
+            for key in ref[2:].split("/")
+        ]
+        if not ref.startswith("#/") or keys[0] not in REFERENCED:
+            continue
+
+        target = document
+        try:
+            for key in keys:
+                target = target[key]
+        except (KeyError, TypeError):
+            # Dangling references are left as they are
+            continue
+
+        parent = sliced
+        for key in keys[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[keys[-1]] = target
+
+        pending.append(target)
+
+
+class TagSlices:
+    """
+    The slices of one specification, each encoded the first time it is
+    asked for and then kept.
+
+    Arguments:
+        load: Returns the serialized specification, as decoded JSON.
+    """
+
+    def __init__(self, load: Callable[[], Dict[str, Any]]):
+        self._load = load
+        self._document: Optional[Dict[str, Any]] = None
+        self._slices: Dict[str, Optional[EncodedDocument]] = {}
+
+    @classmethod
+    def of(cls, document: EncodedDocument) -> "TagSlices":
+        return cls(lambda: json.loads(bytes(document.body)))
+
+    @property
+    def document(self) -> Dict[str, Any]:
+        if self._document is None:
+            self._document = self._load()
+
+        return self._document
+
+    def tags(self) -> List[str]:
+        return spec_tags(self.document)
+
+    def get(self, tag: str) -> Optional[EncodedDocument]:
+        if tag not in self._slices:
+            sliced = tag_slice(self.document, tag)
+            self._slices[tag] = (
+                EncodedDocument(json_dumps(sliced)) if sliced else None
+            )
+
+        return self._slices[tag]
+
+
+def tag_urls(slices: TagSlices, url: str = "./swagger.json") -> Dict:
+    """
+    The Swagger UI configuration listing each slice in the dropdown of the
+    top bar, followed by the whole specification.
+    """
+    tags = slices.tags()
+    urls = [
+        {"url": "{}?tag={}".format(url, quote(tag)), "name": tag}
+        for tag in tags
+    ]
+    urls.append({"url": url, "name": "All operations"})
+
+    return {"urls": urls, "urls.primaryName": urls[0]["name"]}
+
+
+@lru_cache(maxsize=None)
+def load_spec_file_slices(path: str) -> TagSlices:
+    return TagSlices.of(load_spec_file(path))
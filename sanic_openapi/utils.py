@@ -1,4 +1,11 @@
+import asyncio
+import os
 import re
+import tempfile
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Optional
+from weakref import WeakKeyDictionary, ref
 
 
 def get_uri_filter(app):
@@ -45,6 +52,161 @@ def remove_nulls_from_kwargs(**kwargs):
     return remove_nulls(kwargs, deep=False)
 
 
+def app_state(app, name: str, factory: Optional[Callable] = None):
+    """
+    State which belongs to one app, like its specification, kept on
+    `app.ctx` (or on the app itself, before sanic 21.3) so that it goes away
+    along with it.
+
+    Arguments:
+        app: The application.
+        name: What the state is.
+        factory: Makes the state, when the app has none yet. Without it,
+                 `None` is returned then.
+    """
+    holder = getattr(app, "ctx", app)
+    attribute = "_sanic_openapi_" + name
+
+    state = getattr(holder, attribute, None)
+    if state is None and factory is not None:
+        state = factory()
+        setattr(holder, attribute, state)
+
+    return state
+
+
+def weak_ref(obj) -> Callable:
+    """
+    A weak reference to an object, or a strong one for objects which cannot
+    be weakly referenced. Either way, calling it returns the object.
+    """
+    try:
+        return ref(obj)
+    except TypeError:
+        return lambda: obj
+
+
+class HandlerRegistry:
+    """
+    What the decorators recorded about each route handler.
+
+    Indexing makes the entry of a handler that has none yet, as the
+    decorators do, while `get()` and `in` only look. Handlers are weakly
+    referenced, so that their entries go away with them; the few which
+    cannot be, like builtins, are kept as they are.
+
+    Arguments:
+        factory: Makes the entry of a handler.
+    """
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self._weak: WeakKeyDictionary = WeakKeyDictionary()
+        self._strong: dict = {}
+
+    def _store(self, handler):
+        try:
+            ref(handler)
+        except TypeError:
+            return self._strong
+
+        return self._weak
+
+    def __getitem__(self, handler):
+        store = self._store(handler)
+        entry = store.get(handler)
+        if entry is None:
+            entry = store[handler] = self.factory()
+
+        return entry
+
+    def get(self, handler, default=None):
+        return self._store(handler).get(handler, default)
+
+    def __contains__(self, handler) -> bool:
+        return handler in self._store(handler)
+
+    def __len__(self) -> int:
+        return len(self._weak) + len(self._strong)
+
+    def items(self):
+        yield from self._weak.items()
+        yield from self._strong.items()
+
+    def values(self):
+        for _, entry in self.items():
+            yield entry
+
+
+class LazyBuild:
+    """
+    Defers building the specification of an app until it is first asked
+    for. Requests which arrive while it is being built wait for that one
+    build instead of each starting their own.
+    """
+
+    def __init__(self):
+        # Sanic apps can't be weakly referenced, but their names are unique
+        self._pending = {}
+        self._locks = {}
+
+    def defer(self, app):
+        self._pending[app.name] = True
+
+    def pending(self, app) -> bool:
+        return self._pending.get(app.name, False)
+
+    async def ensure(self, app, build, in_executor: bool = False):
+        """
+        Runs `build(app)` if the app still has a deferred build.
+
+        Arguments:
+            app: The application being documented.
+            build: The function doing the work.
+            in_executor: Whether to run it in the default thread executor,
+                         to keep the event loop responsive meanwhile.
+        """
+        if not self.pending(app):
+            return
+
+        if app.name not in self._locks:
+            self._locks[app.name] = asyncio.Lock()
+
+        async with self._locks[app.name]:
+            # Another request may have built it while this one waited
+            if not self.pending(app):
+                return
+
+            if in_executor:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, partial(build, app))
+            else:
+                build(app)
+
+            del self._pending[app.name]
+            del self._locks[app.name]
+
+
+@contextmanager
+def finalized_routes(app):
+    """
+    Since sanic 21.3 route parameters are only known once the router is
+    finalized, which each worker does when it starts. Finalizes the router
+    for the duration of the block, for when routes are walked before that,
+    and then resets it so that the server can still finalize it itself.
+    """
+    router = app.router
+    if getattr(router, "finalized", True):
+        yield
+        return
+
+    app.finalize()
+    try:
+        yield
+    finally:
+        router.reset()
+
+
 def get_blueprinted_routes(app):
     for blueprint in app.blueprints.values():
         if not hasattr(blueprint, "routes"):
@@ -144,3 +306,21 @@ def get_all_routes(app, skip_prefix):
                 )
 
             yield uri, route.name, route.parameters, method_handlers.items()
+
+
+def write_once(path: str, produce):
+    """
+    Writes the bytes returned by `produce` to a file, unless it exists.
+    """
+    if os.path.isfile(path):
+        return
+
+    # Several workers may be writing at the same time, so write to a
+    # temporary file and then move it into place
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=".tmp"
+    )
+    with os.fdopen(fd, "wb") as f:
+        f.write(produce())
+
+    os.replace(temp_path, path)
@@ -58,6 +58,8 @@ setup(
         "dev": dev_requires + test_requires + doc_requires,
         "test": test_requires,
         "doc": doc_requires,
+        "brotli": ["brotli"],
+        "orjson": ["orjson"],
     },
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -0,0 +1,136 @@
+import os
+import re
+import tempfile
+
+import pytest
+
+from sanic_openapi.__main__ import main
+from sanic_openapi.assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    UIAssets,
+    default_assets_dir,
+)
+
+
+@pytest.fixture(scope="module")
+def tmp_path(tmp_path_factory):
+    # Building compresses every asset, so share the directory between tests
+    return tmp_path_factory.mktemp("assets")
+
+
+def get_production_app(app, tmp_path, source_maps=True):
+    app.config.SWAGGER_UI_PRODUCTION_ASSETS = True
+    app.config.SWAGGER_UI_ASSETS_DIR = str(tmp_path)
+    app.config.SWAGGER_UI_SOURCE_MAPS = source_maps
+    return app
+
+
+def test_build_writes_fingerprinted_assets(tmp_path):
+    assets = UIAssets(str(tmp_path)).build()
+    bundle = re.search(
+        r"\./_assets/(swagger-ui-bundle\.\w+\.js)", assets.index
+    )
+
+    assert bundle
+    assert (tmp_path / bundle.group(1)).exists()
+    assert (tmp_path / (bundle.group(1) + ".gz")).exists()
+    assert "./swagger-ui-bundle.js" not in assets.index
+    assert "./oauth2-redirect.html" not in assets.index
+
+
+def test_build_is_stable(tmp_path):
+    first = UIAssets(str(tmp_path)).build()
+    mtimes = {path: path.stat().st_mtime_ns for path in tmp_path.iterdir()}
+    second = UIAssets(str(tmp_path)).build()
+
+    assert first.index == second.index
+    assert first.assets == second.assets
+    assert mtimes == {
+        path: path.stat().st_mtime_ns for path in tmp_path.iterdir()
+    }
+
+
+def test_source_maps_rewritten(tmp_path):
+    assets = UIAssets(str(tmp_path)).build()
+    css = next(name for name in assets.assets if name.endswith(".css"))
+    body = (tmp_path / css).read_bytes()
+
+    reference = re.search(rb"sourceMappingURL=(\S+?)\*/", body).group(1)
+    assert reference.decode() in assets.assets
+
+
+def test_source_maps_disabled(tmp_path):
+    assets = UIAssets(str(tmp_path), source_maps=False).build()
+
+    assert not any(name.endswith(".map") for name in assets.assets)
+    for name in assets.assets:
+        assert b"sourceMappingURL" not in (tmp_path / name).read_bytes()
+
+
+def test_production_index(app3, tmp_path):
+    get_production_app(app3, tmp_path)
+    _, response = app3.test_client.get("/swagger/")
+
+    assert response.status == 200
+    assert response.headers["cache-control"] == "no-cache"
+    assert "./_assets/swagger-ui-bundle." in response.text
+
+
+def test_production_asset(app, tmp_path):
+    get_production_app(app, tmp_path)
+    _, response = app.test_client.get("/swagger/")
+    name = re.search(r"\./_assets/([^\"]+\.css)", response.text).group(1)
+
+    _, response = app.test_client.get(
+        "/swagger/_assets/" + name, headers={"accept-encoding": "gzip"}
+    )
+
+    assert response.status == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert b".swagger-ui" in response.body
+
+
+def test_production_asset_not_found(app3, tmp_path):
+    get_production_app(app3, tmp_path)
+    _, response = app3.test_client.get("/swagger/_assets/nope.js")
+
+    assert response.status == 404
+
+
+def test_assets_disabled_by_default(app3):
+    _, response = app3.test_client.get("/swagger/")
+    assert "./swagger-ui-bundle.js" in response.text
+
+    _, response = app3.test_client.get("/swagger/_assets/nope.js")
+    assert response.status == 404
+
+
+def test_source_map_hidden(app3, tmp_path):
+    get_production_app(app3, tmp_path, source_maps=False)
+    _, response = app3.test_client.get("/swagger/swagger-ui.css.map")
+
+    assert response.status == 404
+
+
+def test_assets_command(tmp_path, capsys):
+    main(["assets", "--out", str(tmp_path)])
+    names = capsys.readouterr().out.split()
+
+    assert any(name.startswith("swagger-ui-bundle.") for name in names)
+    assert all((tmp_path / name).exists() for name in names)
+
+
+def test_default_assets_dir_is_private(tmp_path_factory, monkeypatch):
+    temp = str(tmp_path_factory.mktemp("temp"))
+    monkeypatch.setattr(tempfile, "tempdir", temp)
+    path = default_assets_dir()
+
+    assert path.startswith(temp)
+    assert os.stat(path).st_mode & 0o777 == 0o700
+
+    # Another user could have written files there
+    os.chmod(path, 0o777)
+    with pytest.raises(RuntimeError):
+        default_assets_dir()
@@ -53,3 +53,30 @@ def test_autodoc():
         parser = autodoc.YamlStyleParametersParser(t["doc"])
         assert parser.to_openAPI_2() == t["expects"]
         assert parser.to_openAPI_3() == t["expects"]
+
+
+def test_docstring_cache(tmp_path, monkeypatch):
+    cache = autodoc.DocstringCache(str(tmp_path))
+    monkeypatch.setattr(autodoc, "docstring_cache", cache)
+
+    for t in tests:
+        parser = autodoc.YamlStyleParametersParser(t["doc"])
+        assert parser.to_openAPI_3() == t["expects"]
+        assert parser.to_openAPI_2() == t["expects"]
+
+    assert cache.info() == (len(tests), len(tests))
+
+    # What callers get can be changed without affecting the cache
+    parser = autodoc.YamlStyleParametersParser(tests[-1]["doc"])
+    parser.to_openAPI_2()["summary"] = "changed"
+    assert parser.to_openAPI_2() == tests[-1]["expects"]
+
+    # Another process finds them in the directory
+    cache = autodoc.DocstringCache(str(tmp_path))
+    monkeypatch.setattr(autodoc, "docstring_cache", cache)
+
+    for t in tests:
+        parser = autodoc.YamlStyleParametersParser(t["doc"])
+        assert parser.to_openAPI_3() == t["expects"]
+
+    assert cache.info() == (0, len(tests))
@@ -0,0 +1,124 @@
+import itertools
+import json
+import os
+import sys
+
+import pytest
+import yaml
+
+from sanic_openapi.__main__ import main
+
+module_ID = itertools.count()
+
+APP_SOURCE = """
+from sanic import Sanic
+from sanic.response import text
+
+from sanic_openapi import doc, openapi, {blueprint}
+
+app = Sanic("{name}")
+app.blueprint({blueprint})
+
+
+@app.get("/built")
+@openapi.summary("Built offline")
+@doc.summary("Built offline")
+def built(request):
+    return text("ok")
+"""
+
+
+def write_app(tmp_path, blueprint):
+    name = "cli_app_{}".format(next(module_ID))
+    (tmp_path / "{}.py".format(name)).write_text(
+        APP_SOURCE.format(name=name, blueprint=blueprint)
+    )
+    sys.path.insert(0, str(tmp_path))
+    return name
+
+
+@pytest.mark.parametrize(
+    "blueprint,version_key",
+    [("openapi2_blueprint", "swagger"), ("openapi3_blueprint", "openapi")],
+)
+def test_build(tmp_path, blueprint, version_key):
+    name = write_app(tmp_path, blueprint)
+    out = tmp_path / "openapi.json"
+
+    main(["build", "{}:app".format(name), "--out", str(out)])
+    spec = json.loads(out.read_text())
+
+    assert version_key in spec
+    assert spec["paths"]["/built"]["get"]["summary"] == "Built offline"
+
+
+def test_build_yaml(tmp_path):
+    name = write_app(tmp_path, "openapi3_blueprint")
+    out = tmp_path / "openapi.yaml"
+
+    main(["build", "{}.app".format(name), "--out", str(out)])
+    spec = yaml.safe_load(out.read_text())
+
+    assert spec["paths"]["/built"]["get"]["summary"] == "Built offline"
+
+
+@pytest.mark.parametrize("suffix", [".json", ".yaml"])
+def test_serve_spec_file(app3, tmp_path, suffix):
+    spec_file = tmp_path / ("prebuilt" + suffix)
+    spec_file.write_text(
+        json.dumps({"openapi": "3.0.0", "paths": {"/prebuilt": {}}})
+    )
+    app3.config.API_SPEC_FILE = str(spec_file)
+
+    @app3.get("/introspected")
+    def handler(request):
+        ...
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+
+    assert response.json["paths"] == {"/prebuilt": {}}
+
+
+def test_serve_spec_file_oas2(app, tmp_path):
+    spec_file = tmp_path / "prebuilt.json"
+    spec_file.write_text(json.dumps({"swagger": "2.0", "paths": {}}))
+    app.config.API_SPEC_FILE = str(spec_file)
+
+    _, response = app.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "gzip"}
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json == {"swagger": "2.0", "paths": {}}
+
+
+@pytest.mark.parametrize("fixture", ["app", "app3"])
+def test_build_in_main_process(request, fixture):
+    app = request.getfixturevalue(fixture)
+    app.config.API_SPEC_MAIN_PROCESS = True
+
+    @app.get("/main/<item_id:int>")
+    def main_process(request, item_id):
+        ...
+
+    for listener in app.listeners["main_process_start"]:
+        listener(app, None)
+
+    spec_file = app.config.API_SPEC_FILE
+    assert os.environ["SANIC_API_SPEC_FILE"] == spec_file
+
+    # Workers serve the shared file, without walking the routes themselves
+    @app.get("/worker")
+    def worker(request):
+        ...
+
+    _, response = app.test_client.get("/swagger/swagger.json")
+
+    assert "/main/{item_id}" in response.json["paths"]
+    assert "/worker" not in response.json["paths"]
+
+    for listener in app.listeners["main_process_stop"]:
+        listener(app, None)
+
+    assert not os.path.exists(spec_file)
+    assert "SANIC_API_SPEC_FILE" not in os.environ
@@ -0,0 +1,168 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from sanic_openapi.encoding import (
+    COMPRESSORS,
+    EncodedDocument,
+    etag_matches,
+    iter_json_object,
+    negotiate,
+    send_chunked,
+)
+
+AVAILABLE = ("identity", "gzip", "br")
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("", "identity"),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "br"),
+        ("br;q=0, *;q=0.1", "gzip"),
+        ("deflate", "identity"),
+        ("GZIP;q=0.8", "gzip"),
+        ("gzip;q=abc", "identity"),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, AVAILABLE) == expected
+
+
+def test_negotiate_only_available():
+    assert negotiate("br", ("identity", "gzip")) == "identity"
+
+
+def test_variants_are_encoded_once():
+    document = EncodedDocument(b'{"hello":"world"}' * 100)
+
+    compressed = document.encode("gzip")
+
+    assert document.encode("gzip") is compressed
+    assert gzip.decompress(compressed) == document.body
+    assert document.encode("identity") is document.body
+
+
+def test_spec_content_encoding(app3):
+    _, plain = app3.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "identity"}
+    )
+    _, compressed = app3.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "gzip"}
+    )
+
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.json == plain.json
+
+
+@pytest.mark.skipif("br" not in COMPRESSORS, reason="brotli not installed")
+def test_spec_brotli(app):
+    _, response = app.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "gzip, br"}
+    )
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.json["swagger"] == "2.0"
+
+
+def test_etag_per_variant():
+    document = EncodedDocument(b'{"hello":"world"}')
+
+    assert document.etag().startswith('"')
+    assert document.etag("gzip") != document.etag()
+    assert EncodedDocument(b"{}").etag() != document.etag()
+
+
+@pytest.mark.parametrize(
+    "if_none_match,matches",
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+        ("", False),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, '"abc"') is matches
+
+
+@pytest.mark.parametrize(
+    "path", ["/swagger/swagger.json", "/swagger/swagger-config"]
+)
+def test_conditional_get(app3, path):
+    _, response = app3.test_client.get(path)
+    etag = response.headers["etag"]
+
+    assert response.headers["cache-control"] == "no-cache"
+
+    _, response = app3.test_client.get(path, headers={"if-none-match": etag})
+
+    assert response.status == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+
+
+def test_conditional_get_oas2(app):
+    app.config.API_SPEC_CACHE_CONTROL = "public, max-age=60"
+    _, response = app.test_client.get("/swagger/swagger.json")
+    etag = response.headers["etag"]
+
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    _, response = app.test_client.get(
+        "/swagger/swagger.json", headers={"if-none-match": etag}
+    )
+
+    assert response.status == 304
+
+    _, response = app.test_client.get(
+        "/swagger/swagger.json", headers={"if-none-match": '"stale"'}
+    )
+
+    assert response.status == 200
+    assert response.json["swagger"] == "2.0"
+
+
+def test_iter_json_object():
+    document = {
+        "swagger": "2.0",
+        "paths": {"/a": {"get": {}}, "/b": {"post": {"tags": ["b"]}}},
+        "empty": {},
+        200: None,
+    }
+
+    fragments = list(iter_json_object(document.items()))
+
+    assert len(fragments) == 10
+    assert json.loads(b"".join(fragments)) == json.loads(json.dumps(document))
+
+
+def test_send_chunked_without_request_respond():
+    # Sanic before 21.3 has no request.respond
+    class Request:
+        headers = {"accept-encoding": "gzip"}
+
+    class Response:
+        def __init__(self):
+            self.chunks = []
+
+        async def write(self, data):
+            self.chunks.append(data)
+
+    fragments = [b'{"a":', b"1}"]
+    response = asyncio.run(send_chunked(Request(), iter(fragments)))
+    assert response.headers["Content-Encoding"] == "gzip"
+
+    written = Response()
+    asyncio.run(response.streaming_fn(written))
+    assert gzip.decompress(b"".join(written.chunks)) == b'{"a":1}'
@@ -1,13 +1,17 @@
 from collections import defaultdict
 
+from sanic import Sanic
 from sanic.blueprints import Blueprint
 
-from sanic_openapi import openapi, openapi3
-from sanic_openapi.openapi3.blueprint import blueprint_factory
+from sanic_openapi import openapi, openapi3, openapi3_blueprint
+from sanic_openapi.openapi3 import get_specification, operations
+from sanic_openapi.openapi3.blueprint import blueprint_factory, build_spec
 from sanic_openapi.openapi3.builders import (
     OperationBuilder,
     SpecificationBuilder,
 )
+from sanic_openapi.profiler import PHASES, get_profile
+from sanic_openapi.utils import finalized_routes
 
 
 def test_exclude_entire_blueprint(app3):
@@ -65,3 +69,234 @@ def test_exclude_single_blueprint_route(app3):
     assert "/ok" in response.json["paths"]
     assert len(response.json["paths"]) == path_count + 1
     assert len(response.json["tags"]) == tag_count + 1
+
+
+def test_lazy_spec(app3):
+    app3.config.API_SPEC_LAZY = True
+    app3.config.API_SPEC_BUILD_IN_EXECUTOR = True
+
+    @app3.get("/lazy")
+    def lazy(_):
+        ...
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+
+    assert "/lazy" in response.json["paths"]
+
+
+def test_rebuild_after_adding_blueprint(app3):
+    @app3.get("/first/<item_id:int>")
+    @openapi.parameter("item_id", int, "path")
+    def first(_, item_id):
+        """
+        First
+
+        openapi:
+        ---
+        tags:
+          - first
+        """
+
+    specification = get_specification(app3)
+    with finalized_routes(app3):
+        build_spec(app3)
+    before = specification.build().serialize()
+
+    bp = Blueprint("second")
+
+    @bp.get("/second/<name>")
+    def second(_, name):
+        ...
+
+    app3.blueprint(bp)
+    with finalized_routes(app3):
+        build_spec(app3)
+    after = specification.build()
+
+    # The unchanged path is reused as it was built, and nothing is duplicated
+    assert after.fields["paths"]["/first/{item_id}"] is (
+        specification._built_paths["/first/{item_id}"]
+    )
+    after = after.serialize()
+    assert after["paths"]["/first/{item_id}"] == (
+        before["paths"]["/first/{item_id}"]
+    )
+    assert len(after["paths"]["/first/{item_id}"]["get"]["parameters"]) == 1
+    assert len(after["paths"]["/second/{name}"]["get"]["parameters"]) == 1
+    assert [tag["name"] for tag in after["tags"]].count("second") == 1
+
+    # Operations changed after being documented are built again
+    operations[first].deprecate()
+    with finalized_routes(app3):
+        build_spec(app3)
+
+    assert specification.build().serialize()["paths"]["/first/{item_id}"][
+        "get"
+    ]["deprecated"]
+
+
+def test_streamed_spec(app3):
+    @app3.get("/items/<item_id:int>")
+    def item(_, item_id):
+        ...
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+    expected = response.json
+
+    app3.config.API_SPEC_STREAM = True
+    _, response = app3.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "identity"}
+    )
+
+    assert response.headers["transfer-encoding"] == "chunked"
+    assert "etag" not in response.headers
+    assert response.json == expected
+
+    _, response = app3.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "gzip"}
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json == expected
+
+
+def test_tag_slices(app3):
+    app3.config.SWAGGER_UI_TAG_URLS = True
+
+    @app3.get("/slices/orders")
+    @openapi.tag("slice-orders")
+    def orders(_):
+        ...
+
+    @app3.get("/slices/users")
+    @openapi.tag("slice-users")
+    def users(_):
+        ...
+
+    _, response = app3.test_client.get(
+        "/swagger/swagger.json", params={"tag": "slice-orders"}
+    )
+
+    assert list(response.json["paths"]) == ["/slices/orders"]
+    assert response.json["tags"] == [{"name": "slice-orders"}]
+    assert response.headers["etag"]
+
+    _, response = app3.test_client.get("/swagger/swagger.json?tag=missing")
+
+    assert response.status == 404
+
+    _, response = app3.test_client.get("/swagger/swagger-config")
+
+    assert {
+        "url": "./swagger.json?tag=slice-users",
+        "name": "slice-users",
+    } in response.json["urls"]
+    assert response.json["urls"][-1]["url"] == "./swagger.json"
+
+
+def test_build_stats(app3):
+    @app3.get("/stats/<item_id:int>")
+    def item(_, item_id):
+        """
+        Get an item
+        """
+
+    _, response = app3.test_client.get("/swagger/_stats")
+
+    assert response.status == 404
+
+    # The specification is only encoded once it is first asked for
+    _, response = app3.test_client.get("/swagger/swagger.json")
+
+    assert get_profile(app3).counts["bytes"] == len(response.body)
+
+    app3.config.API_SPEC_STATS = True
+    _, response = app3.test_client.get("/swagger/_stats")
+
+    assert set(response.json["timings"]) == set(PHASES)
+    assert response.json["counts"]["routes"] >= 1
+    assert response.json["counts"]["operations"] >= 1
+
+
+def test_build_stats_count_the_models_of_the_spec(app3):
+    class Address:
+        city: str
+
+    class Customer:
+        address: Address
+
+    class Unused:
+        name: str
+
+    # Made for another app, or an earlier build
+    openapi.Object.make(Unused)
+
+    @app3.get("/customer")
+    @openapi.response(200, {"application/json": Customer})
+    @openapi.body({"application/json": Address})
+    def customer(_):
+        ...
+
+    app3.test_client.get("/swagger/swagger.json")
+    assert get_profile(app3).counts["schemas"] == 2
+
+    app3.config.API_SCHEMA_COMPONENTS = True
+    _, response = app3.test_client.get("/swagger/swagger.json")
+    assert len(response.json["components"]["schemas"]) == 2
+    assert get_profile(app3).counts["schemas"] == 2
+
+
+def test_undocumented_handlers_are_not_registered(app3):
+    bp = Blueprint("plain")
+
+    @bp.get("/plain/<item_id:int>")
+    def plain(_, item_id):
+        ...
+
+    app3.blueprint(bp)
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+
+    assert plain not in operations
+    assert response.json["paths"]["/plain/{item_id}"]["get"]["tags"] == [
+        "plain"
+    ]
+
+    specification = get_specification(app3)
+    operation = specification.handled_by("/plain/{item_id}", "GET", plain)
+    assert operation is not None
+
+    with finalized_routes(app3):
+        build_spec(app3)
+
+    assert specification.handled_by("/plain/{item_id}", "GET", plain) is (
+        operation
+    )
+
+
+def test_apps_are_documented_separately(app3):
+    admin = Sanic("test_admin3")
+    admin.blueprint(openapi3_blueprint)
+    admin.config.API_TITLE = "Admin"
+
+    @app3.get("/public")
+    def public(_):
+        ...
+
+    @admin.get("/admin")
+    @openapi.tag("admin")
+    def users(_):
+        ...
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+
+    assert "/public" in response.json["paths"]
+    assert "/admin" not in response.json["paths"]
+    assert response.json["info"]["title"] != "Admin"
+
+    _, response = admin.test_client.get("/swagger/swagger.json")
+
+    assert list(response.json["paths"]) == ["/admin"]
+    assert "admin" in [tag["name"] for tag in response.json["tags"]]
+    assert response.json["info"]["title"] == "Admin"
+    assert get_specification(admin) is not get_specification(app3)
@@ -0,0 +1,262 @@
+import pytest
+from sanic.exceptions import SanicException
+from sanic.response import json
+
+from sanic_openapi import openapi
+from sanic_openapi.openapi3 import cache, operations
+from sanic_openapi.openapi3.cache import CacheBackend, LRUCache
+
+
+def test_lru_cache(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache, "monotonic", lambda: now[0])
+    lru = LRUCache(maxsize=2)
+
+    lru.set("a", (200, None, (), b"a"), 10)
+    lru.set("b", (200, None, (), b"b"), 20)
+    assert lru.get("a") == (200, None, (), b"a")
+
+    # "b" is the least recently used
+    lru.set("c", (200, None, (), b"c"), 10)
+    assert lru.get("b") is None
+    assert len(lru) == 2
+
+    now[0] = 10
+    assert lru.get("a") is None
+    assert lru.get("c") is None
+    assert len(lru) == 0
+
+
+def test_responses_are_cached(app3):
+    calls = []
+
+    @app3.get("/items/<shop:int>")
+    @openapi.cache(ttl=30, vary=["page"])
+    @openapi.parameter("page", openapi.Integer(default=1))
+    @openapi.parameter("trace", str)
+    def items(request, shop):
+        calls.append(request.query_string)
+        return json({"shop": shop, "calls": len(calls)})
+
+    _, response = app3.test_client.get("/items/1?page=01")
+    assert response.json == {"shop": 1, "calls": 1}
+    assert response.content_type == "application/json"
+
+    for url in ("/items/1?page=1", "/items/1", "/items/1?trace=x&junk=y"):
+        _, response = app3.test_client.get(url)
+        assert response.json == {"shop": 1, "calls": 1}
+
+    _, response = app3.test_client.get("/items/1?page=2")
+    assert response.json == {"shop": 1, "calls": 2}
+
+    _, response = app3.test_client.get("/items/2?page=2")
+    assert response.json == {"shop": 2, "calls": 3}
+
+    # Invalid parameters are not cached
+    _, response = app3.test_client.get("/items/1?page=x")
+    _, response = app3.test_client.get("/items/1?page=x")
+    assert response.json == {"shop": 1, "calls": 5}
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+    assert response.json["paths"]["/items/{shop}"]["get"]["x-cache"] == {
+        "ttl": 30,
+        "vary": ["page"],
+    }
+
+
+def test_cache_backend(app3):
+    class Backend(CacheBackend):
+        def __init__(self):
+            self.entries = {}
+
+        async def get(self, key):
+            return self.entries.get(key)
+
+        async def set(self, key, entry, ttl):
+            self.entries[key] = entry
+
+    backend = Backend()
+    app3.config.API_CACHE_BACKEND = backend
+
+    @app3.get("/")
+    @openapi.cache(ttl=5)
+    @openapi.parameter("page", int)
+    def handler(request):
+        return json({"page": request.args.get("page")})
+
+    app3.test_client.get("/?page=3")
+    [key] = backend.entries
+    assert key.startswith("GET ") and key.endswith(".handler?page=3")
+
+    backend.entries[key] = (200, "text/plain", (), b"hit")
+    _, response = app3.test_client.get("/?page=3")
+    assert response.text == "hit"
+
+
+def test_cache_varies_on_documented_parameters():
+    def handler(request): ...
+
+    openapi.parameter("page", int)(handler)
+    openapi.cache(ttl=5)(handler)
+    assert operations[handler].caching() == (5, ("page",))
+
+    openapi.cache(ttl=5, vary=["size"])(handler)
+    with pytest.raises(SanicException):
+        operations[handler].build()
+
+
+def test_cache_backends_implement_both_methods():
+    class Backend(CacheBackend):
+        def get(self, key):
+            ...
+
+    with pytest.raises(TypeError):
+        Backend()
+
+
+def test_responses_vary_on_path_parameters(app3):
+    calls = []
+
+    @app3.get("/shops/<shop:int>")
+    @openapi.cache(ttl=30, vary=["shop"])
+    @openapi.parameter("page", int)
+    def shop(request, shop):
+        calls.append(shop)
+        return json({"shop": shop, "calls": len(calls)})
+
+    @app3.get("/owners/<owner>")
+    @openapi.cache(ttl=30)
+    def owner(request, owner):
+        return json({"owner": owner})
+
+    _, response = app3.test_client.get("/shops/1?page=1")
+    _, response = app3.test_client.get("/shops/1?page=2")
+    assert response.json == {"shop": 1, "calls": 1}
+
+    _, response = app3.test_client.get("/shops/2")
+    assert response.json == {"shop": 2, "calls": 2}
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+    assert response.json["paths"]["/owners/{owner}"]["get"]["x-cache"] == {
+        "ttl": 30,
+        "vary": ["owner"],
+    }
+
+
+def test_private_responses_are_not_cached(app3):
+    calls = []
+
+    @app3.get("/session")
+    @openapi.cache(ttl=30)
+    def session(request):
+        calls.append(1)
+        response = json({"calls": len(calls)})
+        response.cookies["session"] = "secret-{}".format(len(calls))
+        return response
+
+    @app3.get("/private")
+    @openapi.cache(ttl=30)
+    @openapi.parameter("control", str)
+    def private(request):
+        calls.append(1)
+        return json(
+            {"calls": len(calls)},
+            headers={"Cache-Control": request.args.get("control")},
+        )
+
+    _, response = app3.test_client.get("/session")
+    _, response = app3.test_client.get("/session")
+    assert response.json == {"calls": 2}
+    assert response.cookies["session"] == "secret-2"
+
+    for control in ("private", "no-store", "private, max-age=60"):
+        _, first = app3.test_client.get("/private?control=" + control)
+        _, second = app3.test_client.get("/private?control=" + control)
+        assert second.json["calls"] == first.json["calls"] + 1
+
+
+def test_requests_with_credentials_bypass_the_cache(app3):
+    calls = []
+
+    @app3.get("/me")
+    @openapi.cache(ttl=30)
+    def me(request):
+        calls.append(1)
+        return json(
+            {
+                "user": request.headers.get("authorization"),
+                "calls": len(calls),
+            }
+        )
+
+    @app3.get("/token")
+    @openapi.cache(ttl=30, vary=["Authorization"])
+    @openapi.parameter("Authorization", str, "header")
+    def token(request):
+        calls.append(1)
+        return json({"user": request.headers.get("authorization")})
+
+    @app3.get("/theme")
+    @openapi.cache(ttl=30)
+    @openapi.parameter("theme", str, "cookie")
+    def theme(request):
+        calls.append(1)
+        return json({"theme": request.cookies.get("theme")})
+
+    # Not cached for Alice, nor served from the cache to Bob
+    _, response = app3.test_client.get("/me")
+    _, alice = app3.test_client.get("/me", headers={"Authorization": "alice"})
+    _, bob = app3.test_client.get("/me", headers={"Cookie": "session=bob"})
+    assert alice.json == {"user": "alice", "calls": 2}
+    assert bob.json == {"user": None, "calls": 3}
+
+    _, response = app3.test_client.get("/me")
+    assert response.json == {"user": None, "calls": 1}
+
+    # Unless the responses vary on them
+    for user in ("alice", "bob", "alice"):
+        _, response = app3.test_client.get(
+            "/token", headers={"Authorization": user}
+        )
+        assert response.json == {"user": user}
+    assert len(calls) == 5
+
+    for value in ("dark", "light", "dark"):
+        _, response = app3.test_client.get(
+            "/theme", headers={"Cookie": "theme=" + value}
+        )
+        assert response.json == {"theme": value}
+    assert len(calls) == 7
+
+
+def test_responses_with_typed_path_parameters_are_cached(app3):
+    calls = []
+
+    class Backend(CacheBackend):
+        def __init__(self):
+            self.entries = {}
+
+        def get(self, key):
+            return self.entries.get(key)
+
+        def set(self, key, entry, ttl):
+            self.entries[key] = entry
+
+    backend = Backend()
+    app3.config.API_CACHE_BACKEND = backend
+
+    @app3.get("/orders/<order_id:uuid>/<day:ymd>")
+    @openapi.cache(ttl=30)
+    def order(request, order_id, day):
+        calls.append(order_id)
+        return json({"calls": len(calls)})
+
+    url = "/orders/12345678-1234-5678-1234-567812345678/2021-01-31"
+    for _ in range(3):
+        _, response = app3.test_client.get(url)
+        assert response.json == {"calls": 1}
+
+    [key] = backend.entries
+    assert key.endswith(
+        "?day=2021-01-31&order_id=12345678-1234-5678-1234-567812345678"
+    )
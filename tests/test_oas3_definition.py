@@ -188,3 +188,13 @@ def test_def_response(app3, status, media, value):
     assert responses[f"{status}"]["content"][media] == {
         "schema": _serialize(Schema.make(User))
     }
+
+
+def test_allowed_fields_are_inherited():
+    class Custom(Schema):
+        custom: str
+
+    schema = Custom(custom="a", type="string", unknown="b", **{"x-c": "d"})
+
+    assert Custom.__allowed__ > Schema.__allowed__
+    assert schema.fields == {"custom": "a", "type": "string", "x-c": "d"}
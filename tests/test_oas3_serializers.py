@@ -0,0 +1,214 @@
+import json
+import uuid
+from datetime import date, datetime
+from typing import List
+
+import pytest
+from sanic.exceptions import SanicException
+from sanic.views import HTTPMethodView
+
+from sanic_openapi import openapi
+from sanic_openapi.openapi3 import operations, serializers
+from sanic_openapi.openapi3.serializers import Serializer, compile_converter
+from sanic_openapi.openapi3.types import Schema
+
+ORDER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
+
+class Line:
+    sku: str
+    quantity: int
+
+
+class Error:
+    message: str
+
+
+class Order:
+    id: uuid.UUID
+    placed: date
+    lines: List[Line]
+    note: str
+
+    def __init__(self, note="", **kwargs):
+        self.id = ORDER_ID
+        self.placed = date(2021, 1, 31)
+        self.lines = [Line(), Line()]
+        self.note = note
+        for line, sku in zip(self.lines, ("a", "b")):
+            line.sku = sku
+            line.quantity = 1
+            line.secret = "not documented"
+        self.__dict__.update(kwargs)
+
+
+def test_compile_converter(monkeypatch):
+    monkeypatch.setattr(serializers, "orjson", None)
+    convert = compile_converter(Schema.make(Order))
+
+    assert convert(Order(internal=True)) == {
+        "id": str(ORDER_ID),
+        "placed": "2021-01-31",
+        "lines": [{"sku": "a", "quantity": 1}, {"sku": "b", "quantity": 1}],
+        "note": "",
+    }
+    assert convert(
+        {"placed": datetime(2021, 1, 31, 12), "lines": None, "extra": 1}
+    ) == {"placed": "2021-01-31T12:00:00", "lines": None}
+
+    assert compile_converter(Schema.make(int)) is None
+    assert compile_converter(Schema.make([int])) is None
+
+
+def test_serializer_with_orjson():
+    pytest.importorskip("orjson")
+
+    class Invoice:
+        id: int
+        created: datetime
+
+        def total(self):
+            ...
+
+        @property
+        def paid(self):
+            ...
+
+    invoice = Invoice()
+    invoice.id = 1
+    invoice.created = datetime(2021, 1, 31, 12)
+    serializer = Serializer(Schema.make(Invoice))
+
+    assert set(serializer.schema.fields["properties"]) == {"id", "created"}
+    assert json.loads(serializer(invoice)) == {
+        "id": 1,
+        "created": "2021-01-31T12:00:00",
+    }
+
+    # Too large for orjson, so encoded by the encoder it falls back on
+    assert json.loads(
+        serializer({"id": 2**70, "created": datetime(2021, 1, 31, 12)})
+    ) == {"id": 2**70, "created": "2021-01-31T12:00:00"}
+
+
+def test_serialize(app3):
+    @app3.get("/order")
+    @openapi.response(200, {"application/json": Order})
+    @openapi.response(404, {"application/json": Error})
+    def order(request):
+        if request.args.get("missing"):
+            return openapi.serialize(
+                order, {"message": "Not found", "order": 1}, 404
+            )
+
+        return openapi.serialize(order, Order(internal=True))
+
+    _, response = app3.test_client.get("/order")
+    assert response.status == 200
+    assert response.content_type == "application/json"
+    assert response.json == {
+        "id": str(ORDER_ID),
+        "placed": "2021-01-31",
+        "lines": [{"sku": "a", "quantity": 1}, {"sku": "b", "quantity": 1}],
+        "note": "",
+    }
+
+    _, response = app3.test_client.get("/order?missing=1")
+    assert response.status == 404
+    assert response.json == {"message": "Not found"}
+
+
+def test_serialize_views_and_undocumented_handlers(app3):
+    class OrderView(HTTPMethodView):
+        @openapi.response(200, {"application/json": Line})
+        def get(self, request):
+            return openapi.serialize(self.get, {"sku": "a", "secret": 1})
+
+    def undocumented(request):
+        return openapi.serialize(undocumented, {"sku": "a", "secret": 1})
+
+    app3.add_route(OrderView.as_view(), "/view")
+    app3.add_route(undocumented, "/undocumented")
+
+    _, response = app3.test_client.get("/view")
+    assert response.json == {"sku": "a"}
+
+    _, response = app3.test_client.get("/undocumented")
+    assert response.json == {"sku": "a", "secret": 1}
+
+
+def test_serializers_follow_the_documentation():
+    def handler(request):
+        ...
+
+    openapi.response(200, {"application/json": Line})(handler)
+    serializer = operations[handler].serializer(200)
+    assert operations[handler].serializer(200) is serializer
+    assert json.loads(serializer({"sku": "a", "note": ""})) == {"sku": "a"}
+
+    openapi.response(200, {"application/json": Order})(handler)
+    assert operations[handler].serializer(200) is not serializer
+    assert json.loads(operations[handler].serializer(200)({"note": ""})) == {
+        "note": ""
+    }
+
+
+def test_fieldsets(app3):
+    @app3.get("/orders")
+    @openapi.fieldset()
+    @openapi.response(200, {"application/json": [Order]})
+    def orders(request):
+        return openapi.serialize(orders, [Order(), Order()], request=request)
+
+    _, response = app3.test_client.get("/orders?fields=note,id")
+    assert response.json == [{"id": str(ORDER_ID), "note": ""}] * 2
+
+    _, response = app3.test_client.get("/orders?fields=id&fields=lines")
+    assert response.json[0] == {
+        "id": str(ORDER_ID),
+        "lines": [{"sku": "a", "quantity": 1}, {"sku": "b", "quantity": 1}],
+    }
+
+    _, response = app3.test_client.get("/orders")
+    assert len(response.json[0]) == 4
+
+    _, response = app3.test_client.get("/orders?fields=id,secret")
+    assert response.status == 400
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+    assert response.json["paths"]["/orders"]["get"]["parameters"] == [
+        {
+            "name": "fields",
+            "in": "query",
+            "description": "Comma separated fields of the response to "
+            "return, instead of all of them",
+            "explode": False,
+            "schema": {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "enum": ["id", "placed", "lines", "note"],
+                },
+            },
+        }
+    ]
+
+
+def test_fieldsets_are_checked_against_the_schema():
+    def handler(request):
+        ...
+
+    openapi.fieldset(fields=["sku", "secret"])(handler)
+    with pytest.raises(SanicException):
+        operations[handler].build()
+
+    openapi.response(200, {"application/json": Line})(handler)
+    with pytest.raises(SanicException):
+        operations[handler].build()
+
+    openapi.fieldset(fields=["sku"], name="only")(handler)
+    assert operations[handler].fieldset_fields() == ("only", ("sku",))
+
+    serializer = operations[handler].serializer(200, "sku")
+    assert serializer is operations[handler].serializer(200, "sku ")
+    assert json.loads(serializer({"sku": "a", "quantity": 1})) == {"sku": "a"}
@@ -1,8 +1,17 @@
+import json
+import tracemalloc
 from pathlib import Path
 
 import yaml
 
-from sanic_openapi import specification
+from sanic_openapi import openapi, specification
+from sanic_openapi.openapi3.builders import (
+    ModelComponents,
+    OperationBuilder,
+    SpecificationBuilder,
+)
+from sanic_openapi.openapi3.definitions import Tag
+from sanic_openapi.openapi3.types import Definition, Schema, _primitives
 
 
 def test_apply_describe(app3):
@@ -46,3 +55,224 @@ def test_raw(app3):
         x in {x["name"] for x in response.json["tags"]}
         for x in ["one", "two", "pets"]
     )
+
+
+def test_serialized_is_cached():
+    builder = SpecificationBuilder()
+    builder.describe("Cached", "1.0.0")
+
+    first = builder.serialized()
+    second = builder.serialized()
+
+    assert first is second
+    assert json.loads(first)["info"]["title"] == "Cached"
+    assert builder.cache_info() == (1, 1, len(first))
+
+
+def test_mutation_invalidates_cache():
+    builder = SpecificationBuilder()
+    builder.describe("Cached", "1.0.0")
+    builder.serialized()
+
+    builder.operation("/path", "GET", OperationBuilder())
+    builder.tag("extra")
+    builder.url("http://foobar")
+    spec = json.loads(builder.serialized())
+
+    assert "/path" in spec["paths"]
+    assert "extra" in [tag["name"] for tag in spec["tags"]]
+    assert builder.cache_info().misses == 2
+
+
+def test_build_does_not_duplicate_servers():
+    builder = SpecificationBuilder()
+    builder.describe("Servers", "1.0.0")
+    builder.url("http://foobar")
+
+    builder.build()
+    spec = builder.build().serialize()
+
+    assert len(spec["servers"]) == 1
+
+
+class Address:
+    street: str
+    city: str
+
+
+class Customer:
+    name: str
+    address: Address
+
+
+def test_model_schemas_are_made_once():
+    assert Schema.make(Customer) is Schema.make(Customer)
+    assert Schema.make(Customer, description="x") is not Schema.make(Customer)
+
+
+def test_schema_components(app3):
+    app3.config.API_SCHEMA_COMPONENTS = True
+
+    @app3.get("/customers")
+    @openapi.response(200, {"application/json": [Customer]})
+    def customers(_):
+        ...
+
+    @app3.post("/customers")
+    @openapi.body({"application/json": Customer})
+    @openapi.response(201, {"application/json": Customer})
+    def create_customer(_):
+        ...
+
+    _, response = app3.test_client.get("/swagger/swagger.json")
+
+    schemas = response.json["components"]["schemas"]
+    customer = {"$ref": "#/components/schemas/Customer"}
+    assert schemas["Customer"]["properties"]["address"] == {
+        "$ref": "#/components/schemas/Address"
+    }
+    assert schemas["Address"]["properties"]["city"]["type"] == "string"
+
+    operations = response.json["paths"]["/customers"]
+    assert (
+        operations["get"]["responses"]["200"]["content"]["application/json"][
+            "schema"
+        ]["items"]
+        == customer
+    )
+    assert (
+        operations["post"]["requestBody"]["content"]["application/json"][
+            "schema"
+        ]
+        == customer
+    )
+
+
+def test_schema_components_keep_the_base_components():
+    base = SpecificationBuilder()
+    base.add_component(
+        "securitySchemes", "token", {"type": "http", "scheme": "bearer"}
+    )
+    base.add_component("schemas", "Error", {"type": "object"})
+
+    builder = SpecificationBuilder(base)
+    builder.model_components()
+    operation = OperationBuilder()
+    operation.response(200, {"application/json": Customer})
+    builder.operation("/customers", "get", operation)
+
+    components = builder.build().serialize()["components"]
+
+    assert components["securitySchemes"] == {
+        "token": {"type": "http", "scheme": "bearer"}
+    }
+    assert set(components["schemas"]) == {"Error", "Customer", "Address"}
+
+
+def test_schema_components_name_clash():
+    class Address:
+        zip_code: str
+
+    components = ModelComponents()
+    first = components.reference(Schema.make(globals()["Address"]))
+    second = components.reference(Schema.make(Address))
+
+    assert first.serialize() == {"$ref": "#/components/schemas/Address"}
+    assert second.serialize() == {
+        "$ref": "#/components/schemas/{}."
+        "test_schema_components_name_clash._locals_.Address".format(
+            Address.__module__
+        )
+    }
+    assert len(components.schemas) == 2
+
+
+def test_definitions_are_compact():
+    assert Schema.make(str) is Schema.make(str)
+    assert Schema.make(str, description="x") is not Schema.make(str)
+
+    for definition in (Schema.make(int), Schema.make(Customer), Tag("a")):
+        assert not hasattr(definition, "__dict__")
+
+
+class DictLayout:
+    # How definitions were kept before they had slots: an instance dict
+    # holding a dict of their fields
+    def __init__(self, **fields):
+        self.fields = fields
+
+
+def dict_layout(value, memo):
+    # The same tree of definitions in the previous layout, with the model
+    # schemas shared as before, but not the primitive ones
+    if isinstance(value, Definition):
+        if id(value) not in memo or value in _primitives.values():
+            memo[id(value)] = DictLayout(
+                **{k: dict_layout(v, memo) for k, v in value.fields.items()}
+            )
+        return memo[id(value)]
+
+    if isinstance(value, dict):
+        return {k: dict_layout(v, memo) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [dict_layout(v, memo) for v in value]
+
+    return value
+
+
+def test_build_memory():
+    def build():
+        builder = SpecificationBuilder()
+        builder.describe("API", "1.0.0")
+        for i in range(200):
+            operation = OperationBuilder()
+            operation.tag("customers")
+            operation.parameter("customer_id", int, "path")
+            operation.parameter("limit", int)
+            operation.body({"application/json": Customer})
+            operation.response(
+                200, {"application/json": {"customer": Customer, "n": int}}
+            )
+            builder.operation(
+                "/customers/{}/{{customer_id}}".format(i), "get", operation
+            )
+
+        return builder.build()
+
+    def allocated(make):
+        # The memory kept by what make returns
+        start, _ = tracemalloc.get_traced_memory()
+        value = make()
+        end, _ = tracemalloc.get_traced_memory()
+        return value, end - start
+
+    tracemalloc.start()
+    try:
+        document, slotted = allocated(build)
+        _, unslotted = allocated(lambda: dict_layout(document, {}))
+    finally:
+        tracemalloc.stop()
+
+    assert slotted < unslotted * 0.8
+
+
+def test_to_json_bytes():
+    with open(Path(__file__).parent / "samples" / "petstore.yaml", "r") as f:
+        data = yaml.safe_load(f)
+
+    builder = SpecificationBuilder()
+    builder.raw(data)
+
+    operation = OperationBuilder()
+    operation.parameter("customer_id", int, "path", description="")
+    operation.body({"application/json": Customer})
+    operation.response(200, {"application/json": [Customer]}, "Customers")
+    operation.response(404, None, "Missing")
+    builder.operation("/customers/{customer_id}", "get", operation)
+
+    document = builder.build()
+
+    assert json.loads(document.to_json_bytes()) == json.loads(
+        json.dumps(document.serialize())
+    )
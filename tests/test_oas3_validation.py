@@ -0,0 +1,339 @@
+import pytest
+from sanic.exceptions import SanicException
+from sanic.response import json, text
+from sanic.views import HTTPMethodView
+
+from sanic_openapi import openapi
+from sanic_openapi.openapi3 import validation
+from sanic_openapi.openapi3.builders import OperationBuilder
+from sanic_openapi.openapi3.validation import (
+    MISSING,
+    ResponseValidator,
+    compile_parameter,
+    compile_schema,
+)
+
+
+class Address:
+    city: str
+    zip: int
+
+
+class User:
+    name: openapi.String(required=True, minLength=2)
+    age: openapi.Integer(minimum=0)
+    address: Address
+
+
+def test_compile_schema():
+    validate = compile_schema(
+        {
+            "type": "object",
+            "required": ["tags"],
+            "properties": {
+                "tags": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["a", "b"]},
+                },
+                "when": {"type": "string", "format": "date"},
+                "score": {"type": "number", "nullable": True},
+            },
+        }
+    )
+
+    valid = {"tags": ["a"], "when": "2021-01-31", "score": None}
+    assert validate(valid) is None
+    assert validate({}) == [(("tags",), "is required")]
+    assert validate({"tags": ["a", "c"]}) == [
+        (("tags", 1), "must be one of a, b")
+    ]
+    assert validate({"tags": [], "when": "yesterday"}) == [
+        (("when",), "must be a valid date")
+    ]
+    assert validate([]) == [((), "must be an object")]
+
+
+def test_compile_parameter():
+    parse = compile_parameter(
+        {"name": "page", "in": "query", "schema": {"type": "integer"}}
+    )
+    assert parse(["2"]) == (2, None)
+    assert parse(["two"]) == ("two", [((), "must be an integer")])
+    assert parse(None) == (MISSING, None)
+
+    parse = compile_parameter(
+        {
+            "name": "ids",
+            "in": "query",
+            "required": True,
+            "explode": False,
+            "schema": {"type": "array", "items": {"type": "integer"}},
+        }
+    )
+    assert parse(["1,2", "3"]) == ([1, 2, 3], None)
+    assert parse(None) == (MISSING, [((), "is required")])
+
+
+def test_invalid_requests_are_rejected(app3):
+    app3.config.API_VALIDATE_REQUESTS = True
+
+    @app3.post("/users/<group:int>")
+    @openapi.parameter("notify", bool)
+    @openapi.parameter("limit", openapi.Integer(maximum=10), required=True)
+    @openapi.body({"application/json": User}, required=True)
+    def create(request, group):
+        return text("ok")
+
+    _, response = app3.test_client.post(
+        "/users/1?limit=5&notify=true", json={"name": "Ann", "age": 3}
+    )
+    assert response.status == 200
+
+    _, response = app3.test_client.post(
+        "/users/1?limit=20&notify=maybe",
+        json={"name": "A", "address": {"zip": "x"}},
+    )
+    assert response.status == 400
+    assert response.json["errors"] == [
+        {"in": "query", "path": "limit", "message": "must be at most 10"},
+        {"in": "query", "path": "notify", "message": "must be a boolean"},
+        {
+            "in": "body",
+            "path": "name",
+            "message": "must be at least 2 characters long",
+        },
+        {"in": "body", "path": "address.zip", "message": "must be an integer"},
+    ]
+
+    _, response = app3.test_client.post("/users/1?limit=1")
+    assert response.status == 400
+    assert response.json["errors"] == [
+        {"in": "body", "path": "", "message": "is required"}
+    ]
+
+    _, response = app3.test_client.post(
+        "/users/1?limit=1",
+        data="name=Ann",
+        headers={"content-type": "application/x-www-form-urlencoded"},
+    )
+    assert response.json["errors"] == [
+        {
+            "in": "body",
+            "path": "",
+            "message": "content type application/x-www-form-urlencoded "
+            "is not accepted",
+        }
+    ]
+
+
+def test_typed_path_parameters_are_validated(app3):
+    app3.config.API_VALIDATE_REQUESTS = True
+
+    @app3.get("/orders/<order_id:uuid>")
+    def order(request, order_id):
+        return text(str(order_id))
+
+    @app3.get("/days/<day:ymd>")
+    @openapi.parameter("limit", openapi.Integer(maximum=10))
+    def day(request, day):
+        return text(day.isoformat())
+
+    @app3.get("/pages/<page:int>")
+    @openapi.parameter("page", openapi.Integer(maximum=10), "path")
+    def page(request, page):
+        return text(str(page))
+
+    order_id = "12345678-1234-5678-1234-567812345678"
+    _, response = app3.test_client.get("/orders/" + order_id)
+    assert response.status == 200
+    assert response.text == order_id
+
+    _, response = app3.test_client.get("/days/2021-01-31?limit=5")
+    assert response.status == 200
+    assert response.text == "2021-01-31"
+
+    _, response = app3.test_client.get("/days/2021-01-31?limit=50")
+    assert response.status == 400
+
+    # Values the router typed are still checked against their own schema
+    _, response = app3.test_client.get("/pages/20")
+    assert response.status == 400
+    assert response.json["errors"] == [
+        {"in": "path", "path": "page", "message": "must be at most 10"}
+    ]
+
+
+def test_class_based_views_are_validated(app3):
+    app3.config.API_VALIDATE_REQUESTS = True
+
+    class View(HTTPMethodView):
+        @openapi.parameter("limit", int)
+        def get(self, request):
+            return text("ok")
+
+        def post(self, request):
+            return text("ok")
+
+    app3.add_route(View.as_view(), "/view")
+
+    _, response = app3.test_client.get("/view?limit=x")
+    assert response.status == 400
+
+    _, response = app3.test_client.post("/view?limit=x")
+    assert response.status == 200
+
+
+def test_validation_is_opt_in(app3):
+    @app3.get("/")
+    @openapi.parameter("limit", int)
+    def handler(request):
+        return text("ok")
+
+    _, response = app3.test_client.get("/?limit=x")
+    assert response.status == 200
+
+
+def test_response_validator():
+    operation = OperationBuilder()
+    operation.response(200, {"application/json": Address})
+    operation.response("4XX", {"text/plain": str})
+    validator = ResponseValidator(operation)
+
+    assert validator.validate(200, "application/json", b'{"zip": 1}') == []
+    assert validator.validate(200, "application/json", b'{"zip": ""}') == [
+        {"path": "zip", "message": "must be an integer"}
+    ]
+    assert validator.validate(200, "application/json", b"{") == [
+        {"path": "", "message": "is not valid JSON"}
+    ]
+    assert validator.validate(200, "text/html", b"") == [
+        {"path": "", "message": "content type text/html is not documented"}
+    ]
+    assert validator.validate(404, "text/plain; charset=utf-8", b"") == []
+    assert validator.validate(500, "text/plain", b"") == [
+        {"path": "", "message": "status 500 is not documented"}
+    ]
+
+
+def test_responses_are_sampled(app3):
+    mismatches = []
+    app3.config.API_VALIDATE_RESPONSES = 1
+    app3.config.API_VALIDATE_RESPONSES_REPORT = (
+        lambda request, status, errors: mismatches.append(
+            (request.path, status, errors)
+        )
+    )
+
+    @app3.get("/address/<zip:int>")
+    @openapi.response(200, {"application/json": Address})
+    def address(request, zip):
+        return json({"city": "Paris", "zip": str(zip) if zip else zip})
+
+    _, response = app3.test_client.get("/address/0")
+    assert response.status == 200
+    assert mismatches == []
+
+    _, response = app3.test_client.get("/address/1")
+    assert response.status == 200
+    assert mismatches == [
+        (
+            "/address/1",
+            200,
+            [{"path": "zip", "message": "must be an integer"}],
+        )
+    ]
+
+    app3.config.API_VALIDATE_RESPONSES = 0
+    _, response = app3.test_client.get("/address/2")
+    assert len(mismatches) == 1
+
+
+def test_parameters_are_injected(app3):
+    app3.config.API_INJECT_PARAMETERS = True
+
+    @app3.get("/items/<shop>")
+    @openapi.parameter("shop", int, location="path")
+    @openapi.parameter("limit", openapi.Integer(default=10))
+    @openapi.parameter("order", openapi.String(enum=["asc", "desc"]))
+    @openapi.parameter("tags", [int], explode=False)
+    @openapi.parameter("X-Trace", str, location="header")
+    def items(request, shop, limit, tags=None, order="asc"):
+        return json(
+            {"shop": shop, "limit": limit, "tags": tags, "order": order}
+        )
+
+    _, response = app3.test_client.get(
+        "/items/3?tags=1,2&tags=3", headers={"X-Trace": "abc"}
+    )
+    assert response.json == {
+        "shop": 3,
+        "limit": 10,
+        "tags": [1, 2, 3],
+        "order": "asc",
+    }
+
+    _, response = app3.test_client.get("/items/3?limit=5&order=desc")
+    assert response.json["limit"] == 5
+    assert response.json["order"] == "desc"
+
+    _, response = app3.test_client.get("/items/3?order=up&tags=1,x")
+    assert response.status == 400
+    assert response.json["errors"] == [
+        {"in": "query", "path": "tags.1", "message": "must be an integer"},
+        {
+            "in": "query",
+            "path": "order",
+            "message": "must be one of asc, desc",
+        },
+    ]
+
+
+def test_parameters_are_injected_into_views(app3):
+    app3.config.API_INJECT_PARAMETERS = True
+
+    class View(HTTPMethodView):
+        @openapi.parameter("limit", int)
+        def get(self, request, **kwargs):
+            return json(kwargs)
+
+    app3.add_route(View.as_view(), "/view")
+
+    _, response = app3.test_client.get("/view?limit=2")
+    assert response.json == {"limit": 2}
+
+
+def test_typed_path_parameters_are_injected(app3):
+    app3.config.API_INJECT_PARAMETERS = True
+
+    @app3.get("/orders/<order_id:uuid>/<day:ymd>")
+    @openapi.parameter("limit", openapi.Integer(default=10))
+    def order(request, order_id, day, limit):
+        return json(
+            {
+                "order_id": str(order_id),
+                "type": type(order_id).__name__,
+                "day": day.isoformat(),
+                "limit": limit,
+            }
+        )
+
+    order_id = "12345678-1234-5678-1234-567812345678"
+    _, response = app3.test_client.get(
+        "/orders/{}/2021-01-31".format(order_id)
+    )
+    assert response.status == 200
+    assert response.json == {
+        "order_id": order_id,
+        "type": "UUID",
+        "day": "2021-01-31",
+        "limit": 10,
+    }
+
+
+def test_validation_requires_routed_requests(monkeypatch):
+    validation.require_routed_requests("API_INJECT_PARAMETERS")
+
+    # As before sanic 21.3, where requests do not know their route
+    monkeypatch.setattr(validation, "ROUTED_REQUESTS", False)
+    with pytest.raises(SanicException, match="API_INJECT_PARAMETERS"):
+        validation.require_routed_requests("API_INJECT_PARAMETERS")
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import yaml
+
+from sanic_openapi.slices import TagSlices, spec_tags, tag_slice, tag_urls
+
+with open(Path(__file__).parent / "samples" / "petstore.yaml", "r") as f:
+    PETSTORE = yaml.safe_load(f)
+
+PETSTORE["paths"]["/owners"] = {"get": {"tags": ["owners"], "responses": {}}}
+PETSTORE["components"]["schemas"]["Owner"] = {"type": "object"}
+PETSTORE["components"]["securitySchemes"] = {"token": {"type": "http"}}
+
+
+def test_spec_tags():
+    assert spec_tags(PETSTORE) == ["pets", "owners"]
+
+
+def test_tag_slice():
+    sliced = tag_slice(PETSTORE, "pets")
+
+    assert sliced["info"] == PETSTORE["info"]
+    assert sliced["tags"] == [{"name": "pets"}]
+    assert set(sliced["paths"]) == {"/pets", "/pets/{petId}"}
+    # Pet is only referenced through Pets
+    assert set(sliced["components"]["schemas"]) == {"Pet", "Pets", "Error"}
+    assert sliced["components"]["securitySchemes"] == {
+        "token": {"type": "http"}
+    }
+
+
+def test_tag_slice_without_references():
+    sliced = tag_slice(PETSTORE, "owners")
+
+    assert list(sliced["paths"]) == ["/owners"]
+    assert "schemas" not in sliced["components"]
+    assert tag_slice(PETSTORE, "missing") is None
+
+
+def test_tag_slice_oas2():
+    document = {
+        "swagger": "2.0",
+        "paths": {
+            "/a": {
+                "get": {
+                    "tags": ["a"],
+                    "responses": {
+                        "200": {"schema": {"$ref": "#/definitions/A"}}
+                    },
+                },
+                "post": {"tags": ["b"]},
+            }
+        },
+        "definitions": {"A": {"type": "object"}, "B": {"type": "object"}},
+    }
+
+    sliced = tag_slice(document, "a")
+
+    assert list(sliced["paths"]["/a"]) == ["get"]
+    assert sliced["definitions"] == {"A": {"type": "object"}}
+
+
+def test_tag_urls():
+    slices = TagSlices(lambda: PETSTORE)
+
+    assert tag_urls(slices) == {
+        "urls": [
+            {"url": "./swagger.json?tag=pets", "name": "pets"},
+            {"url": "./swagger.json?tag=owners", "name": "owners"},
+            {"url": "./swagger.json", "name": "All operations"},
+        ],
+        "urls.primaryName": "pets",
+    }
+    assert slices.get("pets") is slices.get("pets")
+    assert slices.get("missing") is None
@@ -1,9 +1,12 @@
 import pytest
-from sanic import Blueprint
+from sanic import Blueprint, Sanic
 from sanic.constants import HTTP_METHODS
 from sanic.response import text
 from sanic.views import HTTPMethodView
 
+from sanic_openapi import doc, openapi2_blueprint
+from sanic_openapi.profiler import PHASES
+
 METHODS = [method.lower() for method in HTTP_METHODS]
 
 
@@ -319,3 +322,163 @@ def test_route_filter_slash(app):
     swagger_json = response.json
     assert "/test" in swagger_json["paths"]
     assert "/test/" not in swagger_json["paths"]
+
+
+def test_lazy_spec(app):
+    app.config.API_SPEC_LAZY = True
+
+    @app.get("/lazy")
+    def lazy(_):
+        ...
+
+    _, response = app.test_client.get("/swagger/swagger.json")
+
+    assert "/lazy" in response.json["paths"]
+
+
+def test_rebuild_reuses_endpoints(app):
+    from sanic_openapi.openapi2.blueprint import build_spec
+    from sanic_openapi.utils import finalized_routes
+
+    @app.get("/first")
+    def first(_):
+        ...
+
+    endpoints = {}
+    with finalized_routes(app):
+        before = build_spec(app, endpoints=endpoints).as_dict
+
+    bp = Blueprint("second")
+
+    @bp.get("/second")
+    def second(_):
+        ...
+
+    app.blueprint(bp)
+    with finalized_routes(app):
+        after = build_spec(app, endpoints=endpoints).as_dict
+
+    assert after["paths"]["/first"]["get"] is before["paths"]["/first"]["get"]
+    assert after["paths"]["/second"]["get"]["tags"] == ["second"]
+
+    doc.summary("Changed")(first)
+    doc.tag("changed")(second)
+    with finalized_routes(app):
+        changed = build_spec(app, endpoints=endpoints).as_dict
+
+    assert changed["paths"]["/first"]["get"]["summary"] == "Changed"
+    assert changed["paths"]["/second"]["get"]["tags"] == ["changed"]
+
+    with finalized_routes(app):
+        again = build_spec(app, endpoints=endpoints).as_dict
+
+    assert (
+        again["paths"]["/first"]["get"] is changed["paths"]["/first"]["get"]
+    )
+
+
+def test_streamed_spec(app):
+    @app.get("/items/<item_id:int>")
+    def item(_, item_id):
+        ...
+
+    app.config.API_SPEC_STREAM = True
+    _, response = app.test_client.get(
+        "/swagger/swagger.json", headers={"accept-encoding": "gzip"}
+    )
+
+    assert response.headers["transfer-encoding"] == "chunked"
+    assert response.headers["content-encoding"] == "gzip"
+    assert "/items/{item_id}" in response.json["paths"]
+
+
+def test_tag_slices(app):
+    @app.get("/slices/orders")
+    @doc.tag("slice-orders")
+    def orders(_):
+        ...
+
+    @app.get("/slices/users")
+    @doc.tag("slice-users")
+    def users(_):
+        ...
+
+    _, response = app.test_client.get("/swagger/swagger.json?tag=slice-users")
+
+    assert list(response.json["paths"]) == ["/slices/users"]
+
+    _, response = app.test_client.get("/swagger/swagger.json?tag=missing")
+
+    assert response.status == 404
+
+
+def test_build_stats(app):
+    @app.get("/stats/<item_id:int>")
+    def item(_, item_id):
+        """
+        Get an item
+        """
+
+    _, response = app.test_client.get("/swagger/_stats")
+
+    assert response.status == 404
+
+    app.config.API_SPEC_STATS = True
+    _, response = app.test_client.get("/swagger/_stats")
+
+    assert set(response.json["timings"]) == set(PHASES)
+    assert response.json["counts"]["routes"] == 1
+    assert response.json["counts"]["operations"] == 1
+    assert response.json["counts"]["docstrings_parsed"] <= 1
+    assert response.json["counts"]["bytes"] > 0
+
+
+def test_undocumented_handlers_are_not_registered(app):
+    bp = Blueprint("plain")
+
+    @bp.get("/plain")
+    def plain(_):
+        ...
+
+    app.blueprint(bp)
+
+    _, response = app.test_client.get("/swagger/swagger.json")
+
+    assert plain not in doc.route_specs
+    assert response.json["paths"]["/plain"]["get"]["tags"] == ["plain"]
+    assert {"name": "plain"} in response.json["tags"]
+
+
+def test_apps_are_documented_separately(app):
+    class Account:
+        name: str
+
+    class Item:
+        title: str
+
+    admin = Sanic("test_admin2")
+    admin.blueprint(openapi2_blueprint)
+
+    @app.get("/items")
+    @doc.tag("items")
+    @doc.produces(Item)
+    def items(_):
+        ...
+
+    @admin.get("/accounts")
+    @doc.tag("accounts")
+    @doc.produces(Account)
+    def accounts(_):
+        ...
+
+    _, response = app.test_client.get("/swagger/swagger.json")
+
+    assert list(response.json["paths"]) == ["/items"]
+    assert list(response.json["definitions"]) == ["Item"]
+    assert response.json["tags"] == [{"name": "items"}]
+
+    _, response = admin.test_client.get("/swagger/swagger.json")
+
+    assert list(response.json["paths"]) == ["/accounts"]
+    assert list(response.json["definitions"]) == ["Account"]
+    assert response.json["tags"] == [{"name": "accounts"}]
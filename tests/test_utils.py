@@ -0,0 +1,81 @@
+import asyncio
+import gc
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from sanic_openapi.utils import HandlerRegistry, LazyBuild
+
+
+@pytest.mark.parametrize("in_executor", [False, True])
+def test_lazy_build_single_flight(in_executor):
+    app = SimpleNamespace(name="lazy")
+    lazy = LazyBuild()
+    calls = []
+
+    def build(_app):
+        calls.append(threading.current_thread())
+
+    async def run():
+        lazy.defer(app)
+        assert lazy.pending(app)
+
+        await asyncio.gather(
+            *[lazy.ensure(app, build, in_executor) for _ in range(10)]
+        )
+        await lazy.ensure(app, build, in_executor)
+
+    asyncio.run(run())
+
+    assert len(calls) == 1
+    assert (calls[0] is threading.main_thread()) is not in_executor
+    assert not lazy.pending(app)
+
+
+def test_lazy_build_retries_after_failure():
+    app = SimpleNamespace(name="lazy")
+    lazy = LazyBuild()
+    calls = []
+
+    def build(_app):
+        calls.append(_app)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    async def run():
+        lazy.defer(app)
+        with pytest.raises(RuntimeError):
+            await lazy.ensure(app, build)
+        await lazy.ensure(app, build)
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+    assert not lazy.pending(app)
+
+
+def test_handler_registry():
+    registry = HandlerRegistry(list)
+
+    def handler(request):
+        ...
+
+    assert registry.get(handler) is None
+    assert handler not in registry
+    assert len(registry) == 0
+
+    registry[handler].append("documented")
+
+    assert registry.get(handler) == ["documented"]
+    assert registry[handler] is registry.get(handler)
+
+    # Builtins cannot be weakly referenced, so are kept as they are
+    registry[len].append("builtin")
+
+    assert list(registry.values()) == [["documented"], ["builtin"]]
+
+    del handler
+    gc.collect()
+
+    assert len(registry) == 1